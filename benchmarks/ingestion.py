@@ -0,0 +1,214 @@
+"""End-to-end throughput of `nyc_open_data_source`, offline.
+
+Runs the source against the stand-in Socrata server of `socrata_server.py`
+(started in a subprocess), or replays the responses recorded in a directory
+of cassettes, and loads the rows into a DuckDB file in a temporary directory.
+Reports the time of the extract, normalize and load steps, the rows per second
+and the MB per second (of JSON bodies, before compression).
+
+Usage:
+    python benchmarks/ingestion.py
+    python benchmarks/ingestion.py --rows 1000000 --partition-by day
+    python benchmarks/ingestion.py --arrow
+    python benchmarks/ingestion.py --partition-by hour --throttle 20 --requests-per-second 15
+    python benchmarks/ingestion.py --record assets/data/cassettes
+    python benchmarks/ingestion.py --replay assets/data/cassettes
+
+A replay sends no request at all, so it measures the pipeline without any
+network latency. To replay a run, record it with the same options.
+"""
+
+import argparse
+import base64
+import glob
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Dict, Optional
+from urllib.request import urlopen
+
+import dlt
+import duckdb
+
+# Add the ingestion directory to the system path so that I can import the socrata package.
+sys.path.append(
+    os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "ingestion"))
+)
+from socrata import nyc_open_data_source
+
+SERVER_SCRIPT = os.path.join(os.path.dirname(__file__), "socrata_server.py")
+
+
+def start_server(args: argparse.Namespace, port: int) -> subprocess.Popen:
+    server = subprocess.Popen(
+        [
+            sys.executable,
+            SERVER_SCRIPT,
+            f"--port={port}",
+            f"--rows={args.rows}",
+            f"--start={args.start}",
+            f"--days={args.days}",
+            f"--latency-ms={args.latency_ms}",
+            f"--mb-per-second={args.mb_per_second}",
+            f"--max-requests-per-second={args.throttle}",
+        ],
+        stdout=subprocess.DEVNULL,
+    )
+    # the synthetic tables are created before the server listens
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        try:
+            server_stats(port)
+            return server
+        except OSError:
+            time.sleep(0.2)
+    server.kill()
+    raise TimeoutError(f"The stand-in Socrata server did not start on port {port}")
+
+
+def server_stats(port: int) -> Dict[str, int]:
+    with urlopen(f"http://127.0.0.1:{port}/stats") as response:
+        return json.load(response)
+
+
+def recorded_body_bytes(cassette_dir: str) -> int:
+    size = 0
+    for path in glob.glob(f"{cassette_dir}/*.json"):
+        with open(path, "r", encoding="utf-8") as f:
+            size += len(base64.b64decode(json.load(f)["body"]))
+    return size
+
+
+def run(args: argparse.Namespace, base_url: str, pipelines_dir: str) -> Dict[str, Any]:
+    cassette_dir = args.replay or args.record
+    source = nyc_open_data_source(
+        created_date_start=args.start,
+        created_date_stop=args.stop,
+        partition_by=args.partition_by,
+        pagination=args.pagination,
+        stream=args.stream,
+        arrow=args.arrow,
+        # a page size that adapts to latency can't be replayed
+        adaptive_limit=not cassette_dir,
+        # a benchmark downloads everything on every run
+        response_cache=False,
+        checkpoint=False,
+        base_url=base_url,
+        cassette_dir=cassette_dir,
+        cassette_mode="replay" if args.replay else "record",
+        requests_per_second=args.requests_per_second,
+        socrata_application_token="benchmark",
+    )
+    db_file_path = os.path.join(pipelines_dir, "ingestion_benchmark.duckdb")
+    # dlt looks for a missing DuckDB file in the current directory
+    duckdb.connect(db_file_path).close()
+    pipeline = dlt.pipeline(
+        pipeline_name="ingestion_benchmark",
+        pipelines_dir=pipelines_dir,
+        destination=dlt.destinations.duckdb(db_file_path),
+        dataset_name="landing_zone",
+    )
+
+    timings = {}
+    t0 = time.perf_counter()
+    pipeline.extract(source)
+    timings["extract"] = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    normalize_info = pipeline.normalize()
+    timings["normalize"] = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    pipeline.load()
+    timings["load"] = time.perf_counter() - t0
+
+    rows = sum(
+        count
+        for table_name, count in normalize_info.row_counts.items()
+        if not table_name.startswith("_dlt")
+    )
+    return {"rows": rows, "timings": timings}
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "--port",
+        type=int,
+        default=8765,
+        help="port of the stand-in server (the same when recording and replaying)",
+    )
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--start", default="2024-08-01")
+    parser.add_argument("--stop", default="2024-08-08")
+    parser.add_argument("--days", type=int, default=7)
+    parser.add_argument("--latency-ms", type=float, default=150)
+    parser.add_argument("--mb-per-second", type=float, default=10)
+    parser.add_argument("--partition-by", default=None)
+    parser.add_argument("--pagination", default="keyset")
+    parser.add_argument("--stream", action="store_true")
+    parser.add_argument("--arrow", action="store_true")
+    parser.add_argument(
+        "--throttle",
+        type=int,
+        default=0,
+        help="the stand-in server replies 429 over this many requests per second",
+    )
+    parser.add_argument(
+        "--requests-per-second",
+        type=float,
+        default=0,
+        help="pace the requests of the source (0: as fast as possible)",
+    )
+    recordings = parser.add_mutually_exclusive_group()
+    recordings.add_argument(
+        "--record", help="record the responses of the stand-in server here"
+    )
+    recordings.add_argument(
+        "--replay", help="replay the responses recorded here, without any server"
+    )
+    return parser.parse_args()
+
+
+def report(result: Dict[str, Any], body_bytes: Optional[int]) -> None:
+    timings = result["timings"]
+    total = sum(timings.values())
+    rows = result["rows"]
+    for step, seconds in timings.items():
+        print(f"{step:<10} {seconds:8.2f} s")
+    print(f"{'total':<10} {total:8.2f} s")
+    print(f"rows:      {rows} ({rows / total:,.0f} rows/s end-to-end)")
+    print(f"extract:   {rows / timings['extract']:,.0f} rows/s")
+    if body_bytes is not None:
+        mb = body_bytes / 1e6
+        print(f"bodies:    {mb:.1f} MB ({mb / timings['extract']:.1f} MB/s extract)")
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    with tempfile.TemporaryDirectory(prefix="ingestion_benchmark_") as pipelines_dir:
+        if args.replay:
+            print(f"Replaying the responses recorded in {args.replay}")
+            # replayed requests never reach the server
+            result = run(args, f"http://127.0.0.1:{args.port}/resource/", pipelines_dir)
+            report(result, recorded_body_bytes(args.replay))
+        else:
+            port = args.port
+            print(
+                f"Stand-in Socrata server on port {port}: {args.rows} rows, "
+                f"{args.latency_ms} ms latency, {args.mb_per_second} MB/s"
+            )
+            server = start_server(args, port)
+            try:
+                result = run(args, f"http://127.0.0.1:{port}/resource/", pipelines_dir)
+                stats = server_stats(port)
+                report(result, stats["body_bytes"])
+                print(
+                    f"throttled: {stats['throttled']} of {stats['requests']} requests"
+                )
+            finally:
+                server.terminate()
+                server.wait()
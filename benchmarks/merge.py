@@ -0,0 +1,196 @@
+"""Cost of merging a batch into `service_requests_311` as the table grows.
+
+For each size in `--sizes`, creates a `service_requests_311` table with the
+columns of `TABLE_COLUMNS` in a DuckDB file, in a temporary directory. The
+table is created by a dlt pipeline, and then filled with that many synthetic
+rows, in `created_date` order (between 2010 and 2024, like the 311 Service
+Requests dataset). Then, for each merge strategy of `duckdb_merge`, it merges
+a batch of `--batch-rows` rows, a few times: the rows of the most recent
+`created_date`, where 90% of the keys are already in the table (the rows that
+an incremental run loads again because of its lookback), and 10% are new.
+
+The batch is loaded to the staging dataset once, and the SQL of the merge job
+of each strategy runs against it, like the loader runs it (the load step of
+dlt also waits for its jobs, in steps of about a second). Reports the time of
+the first merge (e.g. the `upsert` strategy builds its index) and the median
+time of the merges that follow. The time of the `partition` and `upsert`
+merges should not grow with the size of the table.
+
+Usage:
+    python benchmarks/merge.py
+    python benchmarks/merge.py --sizes 1000000 10000000 30000000 --batch-rows 50000
+    python benchmarks/merge.py --strategies delete-insert partition
+"""
+
+import argparse
+import datetime
+import os
+import statistics
+import sys
+import tempfile
+import time
+from typing import Dict, List
+
+import dlt
+import duckdb
+import pyarrow as pa
+
+# Add the ingestion directory to the system path so that I can import the socrata package.
+sys.path.append(
+    os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "ingestion"))
+)
+from duckdb_merge import MERGE_STRATEGIES, DuckDbMergeJob, duckdb_merge
+from socrata import TABLE_COLUMNS
+from socrata.arrow import arrow_schema
+
+TABLE_NAME = "service_requests_311"
+START = datetime.datetime(2010, 1, 1, tzinfo=datetime.timezone.utc)
+STOP = datetime.datetime(2024, 8, 1, tzinfo=datetime.timezone.utc)
+# the first unique_key of the synthetic rows (the real ones have 8 digits)
+FIRST_KEY = 10_000_000
+
+
+def seconds_per_row(size: int) -> float:
+    return (STOP - START).total_seconds() / size
+
+
+def batch(first: int, stop: int, size: int, status: str) -> "pa.Table":
+    """The rows `first` to `stop` of a table of `size` rows, as an Arrow
+    table with the types of `TABLE_COLUMNS`."""
+    columns = TABLE_COLUMNS[TABLE_NAME]
+    step = datetime.timedelta(seconds=seconds_per_row(size))
+    rows = [
+        {
+            "unique_key": str(FIRST_KEY + i),
+            "created_date": START + i * step,
+            "closed_date": START + i * step + datetime.timedelta(days=1),
+            "agency": "NYPD",
+            "complaint_type": "Noise - Residential",
+            "descriptor": "Loud Music/Party",
+            "borough": "BROOKLYN",
+            "status": status,
+        }
+        for i in range(first, stop)
+    ]
+    return pa.Table.from_pylist(rows, schema=arrow_schema(columns, list(columns)))
+
+
+def resource(data: "pa.Table") -> dlt.sources.DltResource:
+    return dlt.resource(
+        data,
+        name=TABLE_NAME,
+        write_disposition="merge",
+        primary_key="unique_key",
+        columns=TABLE_COLUMNS[TABLE_NAME],
+    )
+
+
+def fill(db_file_path: str, dataset_name: str, size: int) -> None:
+    """Appends the rows 1 to `size` of the table, in `created_date` order."""
+    connection = duckdb.connect(db_file_path)
+    connection.execute(f"""
+        INSERT INTO {dataset_name}.{TABLE_NAME} BY NAME
+        SELECT
+            (i + {FIRST_KEY})::VARCHAR AS unique_key,
+            to_timestamp({START.timestamp()} + i * {seconds_per_row(size)}) AS created_date,
+            created_date + INTERVAL 1 DAY AS closed_date,
+            'NYPD' AS agency,
+            'Noise - Residential' AS complaint_type,
+            'Loud Music/Party' AS descriptor,
+            'BROOKLYN' AS borough,
+            'Closed' AS status,
+            'benchmark' AS _dlt_load_id,
+            i::VARCHAR AS _dlt_id
+        FROM range(1, {size}) AS r(i)
+        """)
+    connection.execute("CHECKPOINT")
+    connection.close()
+
+
+def merge_seconds(pipeline: dlt.Pipeline, merge_strategy: str) -> float:
+    """Runs the SQL of the merge job of `merge_strategy`, like the loader
+    does, with the rows in the staging dataset, and returns its time."""
+    table_chain = [pipeline.default_schema.get_table(TABLE_NAME)]
+    with pipeline.sql_client() as sql_client:
+        t0 = time.perf_counter()
+        sql = DuckDbMergeJob.generate_sql(
+            table_chain, sql_client, {"merge_strategy": merge_strategy}
+        )
+        sql_client.execute_sql("\n".join(sql))
+        return time.perf_counter() - t0
+
+
+def run(args: argparse.Namespace, size: int) -> Dict[str, Dict[str, float]]:
+    timings = {}
+    with tempfile.TemporaryDirectory(prefix="merge_benchmark_") as pipelines_dir:
+        db_file_path = os.path.join(pipelines_dir, "merge_benchmark.duckdb")
+        # dlt looks for a missing DuckDB file in the current directory
+        duckdb.connect(db_file_path).close()
+        pipeline = dlt.pipeline(
+            pipeline_name="merge_benchmark",
+            pipelines_dir=pipelines_dir,
+            destination=duckdb_merge(db_file_path, merge_strategy="partition"),
+            dataset_name="landing_zone",
+        )
+
+        t0 = time.perf_counter()
+        pipeline.run(resource(batch(0, 1, size, "Closed")))
+        fill(db_file_path, "landing_zone", size)
+        print(f"{size} rows created in {time.perf_counter() - t0:.1f} s")
+
+        # the staging dataset keeps the rows of the last load
+        updated = int(args.batch_rows * 0.9)
+        new = args.batch_rows - updated
+        pipeline.run(resource(batch(size - updated, size + new, size, "Updated")))
+
+        for strategy in args.strategies:
+            seconds = [
+                merge_seconds(pipeline, strategy) for _ in range(1 + args.repeat)
+            ]
+            timings[strategy] = {
+                "first": seconds[0],
+                "median": statistics.median(seconds[1:]),
+            }
+
+        with pipeline.sql_client() as sql_client:
+            [(rows, keys)] = sql_client.execute_sql(
+                f"SELECT count(*), count(DISTINCT unique_key) FROM {TABLE_NAME}"
+            )
+        if rows != keys or rows != size + new:
+            raise ValueError(f"{rows} rows and {keys} keys after the merges")
+    return timings
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "--sizes", type=int, nargs="+", default=[1_000_000, 10_000_000, 30_000_000]
+    )
+    parser.add_argument("--batch-rows", type=int, default=20_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument(
+        "--strategies", nargs="+", choices=MERGE_STRATEGIES, default=MERGE_STRATEGIES
+    )
+    return parser.parse_args()
+
+
+def report(
+    sizes: List[int], timings: Dict[int, Dict[str, Dict[str, float]]], strategies
+) -> None:
+    print(f"{'rows':>12} {'strategy':<14} {'first merge':>12} {'merge':>10}")
+    for size in sizes:
+        for strategy in strategies:
+            t = timings[size][strategy]
+            print(
+                f"{size:>12} {strategy:<14} {t['first']:>10.2f} s {t['median']:>8.2f} s"
+            )
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    print(
+        f"Merge {args.batch_rows} rows into tables of {args.sizes} rows, "
+        f"{args.repeat} times per strategy"
+    )
+    timings = {size: run(args, size) for size in args.sizes}
+    report(args.sizes, timings, args.strategies)
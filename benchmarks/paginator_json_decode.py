@@ -0,0 +1,102 @@
+"""Per-page CPU time of `SocrataPaginator.update_state`.
+
+Compares the paginator counting the items that `RESTClient.paginate` has
+already extracted from the page, with the paginator decoding the response body
+a second time.
+
+Usage:
+    python benchmarks/paginator_json_decode.py
+"""
+
+import os
+import sys
+import time
+
+from dlt.common.json import json
+from requests import PreparedRequest, Response
+
+# Add the ingestion directory to the system path so that I can import the socrata package.
+sys.path.append(
+    os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "ingestion"))
+)
+from socrata.paginators import SocrataPaginator
+
+
+def fake_service_request(i: int) -> dict:
+    """A row that looks like one of the dataset "311 Service Requests"."""
+    return {
+        "unique_key": str(60_000_000 + i),
+        "created_date": "2024-08-01T00:00:00.000",
+        "closed_date": "2024-08-02T00:00:00.000",
+        "agency": "NYPD",
+        "agency_name": "New York City Police Department",
+        "complaint_type": "Noise - Residential",
+        "descriptor": "Loud Music/Party",
+        "location_type": "Residential Building/House",
+        "incident_zip": "11201",
+        "incident_address": f"{i} MAIN STREET",
+        "street_name": "MAIN STREET",
+        "cross_street_1": "FIRST AVENUE",
+        "cross_street_2": "SECOND AVENUE",
+        "address_type": "ADDRESS",
+        "city": "BROOKLYN",
+        "status": "Closed",
+        "resolution_description": "The Police Department responded to the complaint and with the information available observed no evidence of the violation at that time.",
+        "resolution_action_updated_date": "2024-08-02T00:00:00.000",
+        "community_board": "02 BROOKLYN",
+        "bbl": "3001230001",
+        "borough": "BROOKLYN",
+        "x_coordinate_state_plane": "987654",
+        "y_coordinate_state_plane": "192837",
+        "open_data_channel_type": "ONLINE",
+        "park_facility_name": "Unspecified",
+        "park_borough": "BROOKLYN",
+        "latitude": "40.6940",
+        "longitude": "-73.9903",
+    }
+
+
+def fake_page(limit: int) -> Response:
+    request = PreparedRequest()
+    request.prepare(
+        method="GET",
+        url="https://data.cityofnewyork.us/resource/erm2-nwe9.json",
+        params={"$limit": limit, "$offset": 0},
+    )
+    response = Response()
+    response.status_code = 200
+    response.encoding = "utf-8"
+    response.request = request
+    response._content = json.dumps(
+        [fake_service_request(i) for i in range(limit)]
+    ).encode("utf-8")
+    return response
+
+
+def cpu_time_per_page(pages: int, limit: int, reuse_data: bool) -> float:
+    response = fake_page(limit)
+    total = 0.0
+    for _ in range(pages):
+        paginator = SocrataPaginator(
+            limit=limit, offset=0, total_path=None, maximum_offset=limit * 10
+        )
+        t0 = time.process_time()
+        # this is what `RESTClient.paginate` does with every page
+        data = response.json()
+        paginator.update_state(response, data if reuse_data else None)
+        total += time.process_time() - t0
+    return total / pages
+
+
+if __name__ == "__main__":
+    pages = 20
+    limit = 10_000
+    print(
+        f"Socrata page of {limit} rows ({len(fake_page(limit).content) / 1e6:.1f} MB)"
+    )
+
+    double_decode = cpu_time_per_page(pages, limit, reuse_data=False)
+    single_decode = cpu_time_per_page(pages, limit, reuse_data=True)
+    print(f"decode twice: {double_decode * 1000:.1f} ms CPU per page")
+    print(f"decode once:  {single_decode * 1000:.1f} ms CPU per page")
+    print(f"saving:       {(1 - single_decode / double_decode) * 100:.0f}%")
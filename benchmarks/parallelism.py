@@ -0,0 +1,113 @@
+"""Wall-clock gain of the parallel steps of the ingestion pipeline, offline.
+
+Runs `nyc_open_data_source` against the stand-in Socrata server of
+`socrata_server.py` twice, with the steps of `run_pipelines.run_steps`: once
+with one worker for each step (serial), and once with the workers of
+`get_ingestion_config` (by default, what fits the cores of this host). Each run
+loads into its own DuckDB file, in a temporary directory. Reports the time of
+the extract, normalize and load steps of both runs, and the speedup.
+
+Usage:
+    python benchmarks/parallelism.py
+    python benchmarks/parallelism.py --partition-by hour --latency-ms 300
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from typing import Dict
+
+import dlt
+import duckdb
+from ingestion import start_server
+
+# Add the ingestion directory to the system path so that I can import the socrata package.
+sys.path.append(
+    os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "ingestion"))
+)
+from run_pipelines import run_steps
+from socrata import nyc_open_data_source
+
+# run_pipelines adds the root of the repository to the system path
+from common import get_ingestion_config
+
+SERIAL = {"extract_workers": 1, "normalize_workers": 1, "load_workers": 1}
+
+
+def run(
+    args: argparse.Namespace, base_url: str, workers: Dict[str, int]
+) -> Dict[str, float]:
+    source = nyc_open_data_source(
+        created_date_start=args.start,
+        created_date_stop=args.stop,
+        partition_by=args.partition_by,
+        # a benchmark downloads everything on every run
+        response_cache=False,
+        checkpoint=False,
+        # the stand-in server never throttles
+        requests_per_second=None,
+        base_url=base_url,
+        socrata_application_token="benchmark",
+    )
+    with tempfile.TemporaryDirectory(prefix="parallelism_benchmark_") as pipelines_dir:
+        db_file_path = os.path.join(pipelines_dir, "parallelism_benchmark.duckdb")
+        # dlt looks for a missing DuckDB file in the current directory
+        duckdb.connect(db_file_path).close()
+        pipeline = dlt.pipeline(
+            pipeline_name="parallelism_benchmark",
+            pipelines_dir=pipelines_dir,
+            destination=dlt.destinations.duckdb(db_file_path),
+            dataset_name="landing_zone",
+        )
+        t0 = time.perf_counter()
+        run_steps(pipeline, source, workers)
+        timings = {"total": time.perf_counter() - t0}
+        for step in pipeline.last_trace.steps:
+            if step.step in ("extract", "normalize", "load"):
+                timings[step.step] = (
+                    step.finished_at - step.started_at
+                ).total_seconds()
+    return timings
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--start", default="2024-08-01")
+    parser.add_argument("--stop", default="2024-08-08")
+    parser.add_argument("--days", type=int, default=7)
+    parser.add_argument("--latency-ms", type=float, default=150)
+    parser.add_argument("--mb-per-second", type=float, default=10)
+    parser.add_argument("--partition-by", default="day")
+    return parser.parse_args()
+
+
+def report(serial: Dict[str, float], parallel: Dict[str, float]) -> None:
+    print(f"{'':<10} {'serial':>10} {'parallel':>10} {'speedup':>8}")
+    for step in ("extract", "normalize", "load", "total"):
+        speedup = serial[step] / parallel[step] if parallel[step] else float("nan")
+        print(
+            f"{step:<10} {serial[step]:>8.2f} s {parallel[step]:>8.2f} s {speedup:>7.2f}x"
+        )
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    workers = get_ingestion_config()
+    print(
+        f"Stand-in Socrata server on port {args.port}: {args.rows} rows, "
+        f"{args.latency_ms} ms latency, {args.mb_per_second} MB/s"
+    )
+    print(f"{os.cpu_count()} cores, parallel workers: {workers}")
+    server = start_server(args, args.port)
+    try:
+        base_url = f"http://127.0.0.1:{args.port}/resource/"
+        serial = run(args, base_url, SERIAL)
+        parallel = run(args, base_url, workers)
+    finally:
+        server.terminate()
+        server.wait()
+    report(serial, parallel)
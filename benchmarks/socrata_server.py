@@ -0,0 +1,372 @@
+"""A local stand-in for the Socrata Open Data API.
+
+Serves the datasets of `nyc_open_data_source` at
+`http://127.0.0.1:<port>/resource/<dataset id>.json` (or `.csv`), with synthetic rows, or
+with the rows of responses recorded by `rest_api.transport`. Each dataset is a
+DuckDB table, and the SoQL parameters used by the source (`$select`,
+`$where`, `$order`, `$limit`, `$offset`, `count(*)`) are translated to SQL.
+
+Every response is delayed by a fixed latency, plus the time to send its body
+at a fixed bandwidth, and is gzipped if the client accepts it. With
+`--max-requests-per-second`, the server throttles like Socrata: a request over
+that many in the last second gets `429 Too Many Requests` with a `Retry-After`
+of one second. `GET /stats` returns the number of requests served, the
+requests throttled, and the bytes of their bodies, before (`body_bytes`) and
+after compression (`wire_bytes`).
+
+Usage:
+    python benchmarks/socrata_server.py --rows 200000 --latency-ms 150
+    python benchmarks/socrata_server.py --recordings assets/data/cassettes
+"""
+
+import argparse
+import base64
+import collections
+import csv
+import glob
+import gzip
+import io
+import json
+import re
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+from urllib.parse import parse_qs, urlparse
+
+import duckdb
+
+SERVICE_REQUESTS_311 = "erm2-nwe9"
+FILM_PERMITS = "tg4x-b46p"
+FERRY_RIDERSHIP = "6eng-46dm"
+DATASETS = [SERVICE_REQUESTS_311, FILM_PERMITS, FERRY_RIDERSHIP]
+
+# https://dev.socrata.com/docs/system-fields
+SYSTEM_FIELDS = [":id", ":created_at", ":updated_at"]
+
+# a SoQL string literal, where a single quote is escaped by another one
+STRING_LITERAL = r"'(?:[^']|'')*'"
+SYSTEM_FIELD = r":[a-z_]+"
+
+
+def quote_system_fields(soql: str) -> str:
+    """Quotes the system fields (e.g. `:id`) of a SoQL expression, so that it
+    can be used as a DuckDB SQL expression. String literals are left as they
+    are."""
+    pattern = re.compile(f"({STRING_LITERAL})|({SYSTEM_FIELD})")
+    return pattern.sub(lambda m: m.group(1) if m.group(1) else f'"{m.group(2)}"', soql)
+
+
+def synthetic_tables(
+    connection: duckdb.DuckDBPyConnection, rows: int, start: str, days: int
+) -> None:
+    """Creates a table for each dataset, with `rows` service requests created
+    between `start` and `start` + `days`. Like in Socrata, all values are
+    strings, and timestamps are floating timestamps without a time zone."""
+    seconds = days * 24 * 3600
+    connection.execute(f"""
+        CREATE TABLE "{SERVICE_REQUESTS_311}" AS
+        WITH requests AS (
+            SELECT
+                i,
+                TIMESTAMP '{start}' + to_seconds(CAST(i * {seconds} / {max(rows, 1)} AS BIGINT)) AS created_at
+            FROM range({rows}) AS t(i)
+        )
+        SELECT
+            printf('row-%09d', i) AS ":id",
+            strftime(created_at, '%Y-%m-%dT%H:%M:%S.000Z') AS ":created_at",
+            strftime(created_at + INTERVAL 2 DAY, '%Y-%m-%dT%H:%M:%S.000Z') AS ":updated_at",
+            CAST(60000000 + i AS VARCHAR) AS unique_key,
+            strftime(created_at, '%Y-%m-%dT%H:%M:%S.000') AS created_date,
+            strftime(created_at + INTERVAL 1 DAY, '%Y-%m-%dT%H:%M:%S.000') AS closed_date,
+            ['NYPD', 'HPD', 'DSNY', 'DOT', 'DEP'][i % 5 + 1] AS agency,
+            ['Noise - Residential', 'Illegal Parking', 'HEAT/HOT WATER', 'Blocked Driveway', 'Street Condition'][i % 5 + 1] AS complaint_type,
+            ['Loud Music/Party', 'Blocked Hydrant', 'ENTIRE BUILDING', 'No Access', 'Pothole'][i % 5 + 1] AS descriptor,
+            ['BROOKLYN', 'QUEENS', 'MANHATTAN', 'BRONX', 'STATEN ISLAND'][i % 5 + 1] AS borough,
+            ['Closed', 'Open', 'In Progress'][i % 3 + 1] AS status,
+            printf('%d MAIN STREET', i) AS incident_address,
+            printf('%05d', 10000 + i % 500) AS incident_zip,
+            'The Police Department responded to the complaint and with the information available observed no evidence of the violation at that time.' AS resolution_description,
+            CAST(round(40.5 + (i % 1000) / 2000.0, 6) AS VARCHAR) AS latitude,
+            CAST(round(-74.2 + (i % 1000) / 2000.0, 6) AS VARCHAR) AS longitude
+        FROM requests
+        """)
+    connection.execute(f"""
+        CREATE TABLE "{FILM_PERMITS}" AS
+        SELECT
+            printf('row-%09d', i) AS ":id",
+            '2024-01-01T00:00:00.000Z' AS ":created_at",
+            '2024-01-01T00:00:00.000Z' AS ":updated_at",
+            CAST(100000 + i AS VARCHAR) AS eventid,
+            ['Shooting Permit', 'Theater Load in and Load Outs', 'Rigging Permit'][i % 3 + 1] AS eventtype,
+            strftime(TIMESTAMP '2023-01-01' + to_hours(i), '%Y-%m-%dT%H:%M:%S.000') AS startdatetime,
+            strftime(TIMESTAMP '2023-01-01' + to_hours(i + 12), '%Y-%m-%dT%H:%M:%S.000') AS enddatetime,
+            strftime(TIMESTAMP '2022-12-01' + to_hours(i), '%Y-%m-%dT%H:%M:%S.000') AS enteredon,
+            'Mayor''s Office of Media & Entertainment' AS eventagency,
+            ['Brooklyn', 'Queens', 'Manhattan', 'Bronx', 'Staten Island'][i % 5 + 1] AS borough,
+            ['Television', 'Film', 'Commercial'][i % 3 + 1] AS category,
+            'United States of America' AS country,
+            printf('%05d', 10000 + i % 500) AS zipcode_s
+        FROM range(7144) AS t(i)
+        """)
+    connection.execute(f"""
+        CREATE TABLE "{FERRY_RIDERSHIP}" AS
+        SELECT
+            printf('row-%09d', i) AS ":id",
+            '2024-01-01T00:00:00.000Z' AS ":created_at",
+            '2024-01-01T00:00:00.000Z' AS ":updated_at",
+            strftime(DATE '2019-01-01' + CAST(i AS INTEGER), '%Y-%m-%dT00:00:00.000') AS date,
+            CAST(40000 + i % 20000 AS VARCHAR) AS ridership
+        FROM range(2077) AS t(i)
+        """)
+
+
+def recorded_tables(connection: duckdb.DuckDBPyConnection, recordings: str) -> None:
+    """Creates a table for each dataset with the rows found in the responses
+    recorded in `recordings`, de-duplicated on `:id` when it was selected."""
+    rows: Dict[str, Dict[str, Dict[str, Any]]] = {dataset: {} for dataset in DATASETS}
+    for path in glob.glob(f"{recordings}/*.json"):
+        with open(path, "r", encoding="utf-8") as f:
+            cassette = json.load(f)
+        dataset = urlparse(cassette["url"]).path.split("/")[-1].removesuffix(".json")
+        if dataset not in rows or cassette["status"] != 200:
+            continue
+        body = json.loads(base64.b64decode(cassette["body"]))
+        for row in body:
+            if "count" in row and len(row) == 1:
+                # a count(*) probe
+                continue
+            key = row.get(":id") or json.dumps(row, sort_keys=True)
+            rows[dataset][key] = row
+
+    for dataset, dataset_rows in rows.items():
+        columns = sorted({c for row in dataset_rows.values() for c in row} | {":id"})
+        with tempfile.NamedTemporaryFile("w", suffix=".jsonl") as f:
+            for row in dataset_rows.values():
+                f.write(json.dumps(row) + "\n")
+            f.flush()
+            # all values are strings, like in the recorded responses
+            types = ", ".join(f"'{c}': 'VARCHAR'" for c in columns)
+            connection.execute(
+                f'CREATE TABLE "{dataset}" AS SELECT * FROM '
+                f"read_json('{f.name}', format='newline_delimited', columns={{{types}}})"
+            )
+        print(f"{dataset}: {len(dataset_rows)} recorded rows")
+
+
+def soql_to_sql(dataset: str, columns: List[str], params: Dict[str, str]) -> str:
+    """Translates the SoQL query parameters of a request to DuckDB SQL."""
+    select = params.get("$select", "*")
+    items = []
+    for item in (s.strip() for s in select.split(",")):
+        if item == "*":
+            items.extend(f'"{c}"' for c in columns if c not in SYSTEM_FIELDS)
+        elif item == ":*":
+            items.extend(f'"{c}"' for c in columns)
+        else:
+            items.append(quote_system_fields(item))
+    sql = f'SELECT {", ".join(items)} FROM "{dataset}"'
+    if "$where" in params:
+        sql += f" WHERE {quote_system_fields(params['$where'])}"
+    if "$order" in params:
+        sql += f" ORDER BY {quote_system_fields(params['$order'])}"
+    if "$limit" in params:
+        sql += f" LIMIT {int(params['$limit'])}"
+    if "$offset" in params:
+        sql += f" OFFSET {int(params['$offset'])}"
+    return sql
+
+
+class SocrataServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(
+        self,
+        port: int,
+        connection: duckdb.DuckDBPyConnection,
+        latency: float,
+        bandwidth: float,
+        max_requests_per_second: int = 0,
+    ) -> None:
+        super().__init__(("127.0.0.1", port), SocrataRequestHandler)
+        self.connection = connection
+        self.latency = latency
+        self.bandwidth = bandwidth
+        self.max_requests_per_second = max_requests_per_second
+        # the times of the requests served in the last second
+        self.recent_requests: collections.deque = collections.deque()
+        self.columns = {
+            dataset: [
+                row[0] for row in connection.execute(f'DESCRIBE "{dataset}"').fetchall()
+            ]
+            for dataset in DATASETS
+        }
+        self.stats = {"requests": 0, "throttled": 0, "body_bytes": 0, "wire_bytes": 0}
+        self.lock = threading.Lock()
+
+
+class SocrataRequestHandler(BaseHTTPRequestHandler):
+    server: SocrataServer
+
+    def do_GET(self) -> None:
+        url = urlparse(self.path)
+        if url.path == "/stats":
+            self.send_body(200, json.dumps(self.server.stats).encode("utf-8"))
+            return
+
+        dataset, _, extension = url.path.split("/")[-1].partition(".")
+        if (
+            not url.path.startswith("/resource/")
+            or dataset not in DATASETS
+            or extension not in ("json", "csv")
+        ):
+            self.send_body(404, b'{"error": true, "message": "not found"}')
+            return
+
+        if self.throttled():
+            body = b'{"error": true, "message": "Too many requests"}'
+            self.send_body(429, body, {"Retry-After": "1"})
+            return
+
+        # the datasets never change while the server is running
+        etag = f'"{dataset}-{id(self.server)}"'
+        if self.headers.get("If-None-Match") == etag:
+            self.send_body(304, b"", {"ETag": etag})
+            return
+
+        params = {k: v[0] for k, v in parse_qs(url.query).items()}
+        sql = soql_to_sql(dataset, self.server.columns[dataset], params)
+        try:
+            # a cursor is a connection that can be used by this thread
+            result = self.server.connection.cursor().execute(sql)
+            names = [d[0] for d in result.description]
+            if extension == "csv":
+                # like the CSV export of Socrata, every value is quoted, and
+                # nulls are empty strings
+                f = io.StringIO()
+                writer = csv.writer(f, quoting=csv.QUOTE_ALL, lineterminator="\n")
+                writer.writerow(names)
+                for values in result.fetchall():
+                    writer.writerow(["" if v is None else str(v) for v in values])
+                body = f.getvalue().encode("utf-8")
+                self.send_body(200, body, {"ETag": etag}, "text/csv;charset=utf-8")
+                return
+            # like Socrata, all values are strings (count(*) too), and nulls
+            # are left out
+            rows = [
+                {n: str(v) for n, v in zip(names, values) if v is not None}
+                for values in result.fetchall()
+            ]
+        except duckdb.Error as ex:
+            body = {"error": True, "message": str(ex), "query": sql}
+            self.send_body(400, json.dumps(body).encode("utf-8"))
+            return
+
+        body = json.dumps(rows).encode("utf-8")
+        self.send_body(200, body, {"ETag": etag})
+
+    def throttled(self) -> bool:
+        limit = self.server.max_requests_per_second
+        if not limit:
+            return False
+        now = time.monotonic()
+        with self.server.lock:
+            recent = self.server.recent_requests
+            while recent and now - recent[0] > 1:
+                recent.popleft()
+            if len(recent) >= limit:
+                self.server.stats["throttled"] += 1
+                return True
+            recent.append(now)
+            return False
+
+    def send_body(
+        self,
+        status: int,
+        body: bytes,
+        headers: Optional[Dict[str, str]] = None,
+        content_type: str = "application/json;charset=utf-8",
+    ) -> None:
+        wire_body = body
+        if body and "gzip" in self.headers.get("Accept-Encoding", ""):
+            wire_body = gzip.compress(body, compresslevel=5)
+        if self.path != "/stats":
+            time.sleep(self.server.latency + len(wire_body) / self.server.bandwidth)
+            with self.server.lock:
+                self.server.stats["requests"] += 1
+                self.server.stats["body_bytes"] += len(body)
+                self.server.stats["wire_bytes"] += len(wire_body)
+
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        if wire_body is not body:
+            self.send_header("Content-Encoding", "gzip")
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(wire_body)))
+        self.end_headers()
+        self.wfile.write(wire_body)
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument(
+        "--rows", type=int, default=200_000, help="synthetic 311 service requests"
+    )
+    parser.add_argument(
+        "--start",
+        default="2024-08-01",
+        help="created_date of the first synthetic 311 service request",
+    )
+    parser.add_argument(
+        "--days",
+        type=int,
+        default=7,
+        help="days between the first and the last synthetic 311 service request",
+    )
+    parser.add_argument(
+        "--recordings",
+        help="serve the rows of the responses recorded in this directory instead",
+    )
+    parser.add_argument(
+        "--latency-ms", type=float, default=150, help="delay of every response"
+    )
+    parser.add_argument(
+        "--mb-per-second",
+        type=float,
+        default=10,
+        help="bandwidth of every response (after compression)",
+    )
+    parser.add_argument(
+        "--max-requests-per-second",
+        type=int,
+        default=0,
+        help="reply 429 to the requests over this many in the last second (0: never)",
+    )
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    connection = duckdb.connect()
+    if args.recordings:
+        recorded_tables(connection, args.recordings)
+    else:
+        synthetic_tables(connection, args.rows, args.start, args.days)
+
+    server = SocrataServer(
+        args.port,
+        connection,
+        latency=args.latency_ms / 1000,
+        bandwidth=args.mb_per_second * 1e6,
+        max_requests_per_second=args.max_requests_per_second,
+    )
+    print(
+        f"Socrata stand-in server listening on http://127.0.0.1:{args.port}/resource/"
+    )
+    server.serve_forever()
@@ -0,0 +1,144 @@
+"""Startup time of the dbt package of the transformation, cold and warm.
+
+Copies the dbt package (`DBT_PACKAGE_PATH`, without its `target` and
+`dbt_packages` directories) to a temporary directory, and times the steps that
+a transformation run goes through before any SQL runs, with the vars of
+`transformation/run_pipelines.py`:
+
+- `dlt`: `dlt.dbt.get_venv`, `dbt deps` and a parse of the whole project
+  (`dbt parse --no-partial-parse`), like the runs before `package_cache.py`;
+- `cold`: `get_venv` and `ensure_deps` of `package_cache.py`, and `dbt parse`,
+  with their caches removed (the fingerprints and
+  `target/partial_parse.msgpack`), like the first run after a change of the
+  requirements or of the packages;
+- `warm`: the same, with the caches of the run before.
+
+The virtual environment is the one of the `nyc_open_data_transformation`
+pipeline, in its dlt directory, so it's created only once. `dbt deps` clones the
+packages of `packages.yml`, so it needs the network. Reports the median time of
+each step.
+
+Usage:
+    python benchmarks/transformation_startup.py
+    python benchmarks/transformation_startup.py --repeat 5
+"""
+
+import argparse
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from typing import Dict, List
+
+import dlt
+import duckdb
+from dlt.common.pipeline import get_dlt_pipelines_dir
+
+# Add the transformation directory to the system path so that I can import package_cache.py.
+sys.path.append(
+    os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "transformation"))
+)
+from package_cache import (
+    FINGERPRINT_FILE,
+    PARTIAL_PARSE_FILE,
+    StartupTimings,
+    ensure_deps,
+    get_venv,
+)
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from common import DBT_PACKAGE_PATH, LAKE_ROOT
+
+MODES = ("dlt", "cold", "warm")
+STEPS = ("venv", "deps", "parse")
+DBT_VARS = {"landing_zone": "duckdb", "lake_root": LAKE_ROOT}
+
+
+def clear_caches(package_path: str, venv_dir: str) -> None:
+    for path in (
+        os.path.join(venv_dir, FINGERPRINT_FILE),
+        os.path.join(package_path, "dbt_packages", FINGERPRINT_FILE),
+        os.path.join(package_path, PARTIAL_PARSE_FILE),
+    ):
+        if os.path.isfile(path):
+            os.remove(path)
+
+
+def start(
+    pipeline: dlt.Pipeline, package_path: str, venv_dir: str, mode: str
+) -> Dict[str, float]:
+    timings = StartupTimings()
+    with timings.step("venv"):
+        if mode == "dlt":
+            venv = dlt.dbt.get_venv(pipeline, venv_path=venv_dir)
+        else:
+            venv, _ = get_venv(pipeline, venv_path=venv_dir)
+    dbt = dlt.dbt.package(pipeline, package_path, venv=venv)
+    package_vars = dbt._get_package_vars(DBT_VARS, "silver_layer")
+    with timings.step("deps"):
+        if mode == "dlt":
+            dbt._run_dbt_command("deps")
+        else:
+            ensure_deps(dbt)
+    with timings.step("parse"):
+        command_args = ["--no-partial-parse"] if mode == "dlt" else []
+        dbt._run_dbt_command("parse", command_args, package_vars)
+    return {name: s["seconds"] for name, s in timings.steps.items()}
+
+
+def run(args: argparse.Namespace) -> Dict[str, List[Dict[str, float]]]:
+    # the virtual environment of the transformation pipeline
+    venv_dir = os.path.join(
+        get_dlt_pipelines_dir(), "nyc_open_data_transformation", "dbt"
+    )
+    timings: Dict[str, List[Dict[str, float]]] = {mode: [] for mode in MODES}
+    with tempfile.TemporaryDirectory(prefix="dbt_startup_benchmark_") as pipelines_dir:
+        package_path = os.path.join(pipelines_dir, "nyc_open_data")
+        shutil.copytree(
+            DBT_PACKAGE_PATH,
+            package_path,
+            ignore=shutil.ignore_patterns("target", "dbt_packages", "logs"),
+        )
+        db_file_path = os.path.join(pipelines_dir, "dbt_startup_benchmark.duckdb")
+        # dlt looks for a missing DuckDB file in the current directory
+        duckdb.connect(db_file_path).close()
+        pipeline = dlt.pipeline(
+            pipeline_name="dbt_startup_benchmark",
+            pipelines_dir=pipelines_dir,
+            destination=dlt.destinations.duckdb(db_file_path),
+        )
+        t0 = time.perf_counter()
+        get_venv(pipeline, venv_path=venv_dir)
+        print(f"virtual environment ready in {time.perf_counter() - t0:.1f} s")
+
+        for mode in MODES:
+            for _ in range(args.repeat):
+                if mode != "warm":
+                    clear_caches(package_path, venv_dir)
+                timings[mode].append(start(pipeline, package_path, venv_dir, mode))
+    return timings
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--repeat", type=int, default=3)
+    return parser.parse_args()
+
+
+def report(timings: Dict[str, List[Dict[str, float]]]) -> None:
+    print(f"{'mode':<6}" + "".join(f"{step:>10}" for step in (*STEPS, "total")))
+    for mode in MODES:
+        medians = [statistics.median(t[step] for t in timings[mode]) for step in STEPS]
+        print(
+            f"{mode:<6}"
+            + "".join(f"{s:>8.2f} s" for s in medians)
+            + f"{statistics.median(sum(t.values()) for t in timings[mode]):>8.2f} s"
+        )
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    print(f"Start the dbt package {args.repeat} times in each mode: {', '.join(MODES)}")
+    report(run(args))
@@ -1,4 +1,5 @@
 import os
+from typing import Dict
 
 import dlt
 from dlt.common.configuration.inject import with_config
@@ -6,14 +7,46 @@ from dlt.common.configuration.inject import with_config
 REPO_ROOT = os.path.abspath(os.path.join(__file__, "..", ".."))
 DATA_ROOT = os.path.join(REPO_ROOT, "assets", "data")
 SCHEMAS_ROOT = os.path.join(REPO_ROOT, "assets", "schemas")
+METRICS_ROOT = os.path.join(DATA_ROOT, "metrics")
+BULK_ROOT = os.path.join(DATA_ROOT, "bulk")
+LAKE_ROOT = os.path.join(DATA_ROOT, "lake")
 
 APP_NAME = "Open Data Projects"
 DB_NAME = "nyc_open_data"
 DB_FILE_PATH = os.path.join(DATA_ROOT, f"{DB_NAME}.duckdb")
+LANDING_ZONES = ("duckdb", "lake")
 DBT_PACKAGE_PATH = os.path.join(REPO_ROOT, "transformation", "nyc_open_data")
 TEST_DLT_PIPELINE_NAME = "test_pipeline"
 
 
+def default_workers() -> Dict[str, int]:
+    """Workers of each step of a pipeline, for the cores of this host.
+
+    Extraction is mostly waiting for HTTP responses, so it gets a few more
+    threads than cores (the default of `ThreadPoolExecutor`). Normalization is
+    CPU bound, so it gets a process per core, and so does loading.
+    """
+    cpus = os.cpu_count() or 1
+    return {
+        "extract_workers": min(32, cpus + 4),
+        "normalize_workers": cpus,
+        "load_workers": cpus,
+    }
+
+
+@with_config(sections=("ingestion"))
+def get_ingestion_config(config=None):
+    """The `[ingestion.config]` section of config.toml, where each key that is
+    not set falls back to `default_workers`, and `landing_zone` to "duckdb"."""
+    config = {**default_workers(), "landing_zone": "duckdb", **(config or {})}
+    if config["landing_zone"] not in LANDING_ZONES:
+        raise ValueError(
+            f"landing_zone must be one of {', '.join(LANDING_ZONES)}. "
+            f"Found: {config['landing_zone']}"
+        )
+    return config
+
+
 @with_config(sections=("telegram"))
 def get_telegram_config(config=dlt.config.value):
     return {"parse_mode": config["parse_mode"]}
@@ -27,7 +60,10 @@ def get_telegram_credentials(credentials=dlt.secrets.value):
 if __name__ == "__main__":
     telegram_config = get_telegram_config()
     telegram_credentials = get_telegram_credentials()
-    print("Telegram config")
+    print("Ingestion config")
+    print(get_ingestion_config())
+
+    print("\nTelegram config")
     print(telegram_config)
 
     print("\nTelegram credentials")
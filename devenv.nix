@@ -24,12 +24,15 @@
       dbt-core>=1.8.5,<2.0
       dbt-duckdb>=1.8.2,<2.0
       debugpy>=1.8.5
-      dlt>=0.5.2
+      dlt>=0.5.4
       # dlt-init-openapi causes a dependency conflict
       # dlt-init-openapi
       fire>=0.6,<1.0
+      httpx>=0.27
+      ijson>=3.2
       ipython>=8.26.0
       loguru>=0.7
+      pyarrow>=16
       pytest
       streamlit>=1.37
     '';
@@ -83,6 +86,7 @@
     docs-build.exec = "pushd . && cd transformation/nyc_open_data && dbt docs generate && popd";
     docs-serve.exec = "cd transformation/nyc_open_data && dbt docs serve";
     ingestion.exec = "python ingestion/run_pipelines.py";
+    ingestion-backfill.exec = "python ingestion/run_backfill.py";
     pipeline-failed.exec = "dlt pipeline $DLT_PIPELINE failed-jobs";
     pipeline-info.exec = "dlt pipeline $DLT_PIPELINE info";
     pipeline-list.exec = "dlt pipeline --list-pipelines";
@@ -0,0 +1,323 @@
+"""Merge strategies of the DuckDB destination, for tables that grow large.
+
+Every resource of `nyc_open_data_source` is merged on `unique_key`. dlt loads
+the rows of a package to a staging dataset, and then merges them with a
+`delete-insert`: it deletes the rows of the target table that have a key in
+the staging table (`DELETE ... WHERE EXISTS (...)`), and inserts the staging
+rows. DuckDB runs that delete as a join that scans the whole target table, so
+the cost of a merge grows with the table (e.g. `service_requests_311`, tens of
+millions of rows), and not with the rows that are merged.
+
+`duckdb_merge` is the DuckDB destination of dlt with a `merge_strategy`:
+
+- `delete-insert`: the merge of dlt, which scans the whole table.
+- `partition`: the same delete, restricted to the calendar months of
+  `partition_column` (`created_date`) found in the staging table. The months
+  are written in the SQL as constants, so DuckDB skips the row groups of the
+  other months with their min/max statistics (zonemaps). The rows of the table
+  are loaded in `created_date` order, so a merge reads only the row groups of
+  its own months. It assumes that the `created_date` of a row never changes.
+- `upsert`: an ART index on the primary key (a unique index, created by the
+  first merge, in `O(table)`), and an `INSERT OR REPLACE` of the staging rows,
+  which looks up each key in the index. The index is kept in memory while it's
+  used, and it slows down every insert a bit.
+
+A table that the strategy can't merge (with nested tables, a `merge_key` or a
+`hard_delete` column, or without `partition_column`) is merged by dlt.
+
+DuckDB checks unique indexes eagerly: a delete and an insert of the same key
+in a transaction violate the index. So the `delete-insert` and `partition`
+merges drop the index that an `upsert` merge created.
+
+https://duckdb.org/docs/guides/performance/indexing
+https://duckdb.org/docs/sql/statements/insert#insert-or-replace
+"""
+
+from typing import Any, List, Optional, Sequence, Tuple, Type, Union
+
+from dlt.common.configuration import configspec
+from dlt.common.configuration.exceptions import ConfigurationValueError
+from dlt.common.destination.reference import FollowupJobRequest
+from dlt.common.schema.typing import TTableSchema
+from dlt.common.schema.utils import (
+    DEFAULT_MERGE_STRATEGY,
+    get_columns_names_with_prop,
+    get_dedup_sort_tuple,
+)
+from dlt.destinations import duckdb
+from dlt.destinations.impl.duckdb.configuration import (
+    DuckDbClientConfiguration,
+    DuckDbCredentials,
+)
+from dlt.destinations.impl.duckdb.duck import DuckDbClient
+from dlt.destinations.sql_client import SqlClientBase
+from dlt.destinations.sql_jobs import SqlJobParams, SqlMergeFollowupJob
+
+MERGE_STRATEGIES = ("delete-insert", "partition", "upsert")
+PARTITION_COLUMN = "created_date"
+PARTITION_DATA_TYPES = ("timestamp", "date")
+
+
+@configspec
+class DuckDbMergeClientConfiguration(DuckDbClientConfiguration):
+    merge_strategy: str = "delete-insert"
+    partition_column: str = PARTITION_COLUMN
+
+    def __init__(
+        self,
+        *,
+        credentials: Union[DuckDbCredentials, str, Any] = None,
+        create_indexes: bool = False,
+        merge_strategy: str = "delete-insert",
+        partition_column: str = PARTITION_COLUMN,
+        destination_name: str = None,
+        environment: str = None,
+    ) -> None:
+        super().__init__(
+            credentials=credentials,
+            create_indexes=create_indexes,
+            destination_name=destination_name,
+            environment=environment,
+        )
+        self.merge_strategy = merge_strategy
+        self.partition_column = partition_column
+
+    def on_resolved(self) -> None:
+        if self.merge_strategy not in MERGE_STRATEGIES:
+            raise ConfigurationValueError(
+                f"merge_strategy must be one of {', '.join(MERGE_STRATEGIES)}. "
+                f"Found: {self.merge_strategy}"
+            )
+
+
+def _execute_sql(sql_client: SqlClientBase[Any], query: str, *args: Any) -> Any:
+    # the loader creates the merge jobs with a client that is not open
+    if sql_client.native_connection is None:
+        with sql_client:
+            return sql_client.execute_sql(query, *args)
+    return sql_client.execute_sql(query, *args)
+
+
+class DuckDbMergeJobParams(SqlJobParams, total=False):
+    merge_strategy: str
+    partition_column: str
+
+
+class DuckDbMergeJob(SqlMergeFollowupJob):
+    """Generates the SQL of the `merge_strategy` in `params`."""
+
+    @classmethod
+    def generate_sql(
+        cls,
+        table_chain: Sequence[TTableSchema],
+        sql_client: SqlClientBase[Any],
+        params: Optional[DuckDbMergeJobParams] = None,
+    ) -> List[str]:
+        params = params or {}
+        root_table = table_chain[0]
+        if (
+            root_table.get("x-merge-strategy", DEFAULT_MERGE_STRATEGY)
+            != "delete-insert"
+        ):
+            # e.g. scd2
+            return super().generate_sql(table_chain, sql_client, params)
+
+        strategy = params.get("merge_strategy", "delete-insert")
+        mergeable = (
+            len(table_chain) == 1
+            and get_columns_names_with_prop(root_table, "primary_key")
+            and not get_columns_names_with_prop(root_table, "merge_key")
+            and not get_columns_names_with_prop(root_table, "hard_delete")
+        )
+        if strategy == "upsert" and mergeable:
+            return cls.gen_upsert_index_sql(root_table, sql_client)
+
+        sql = cls.gen_drop_index_sql(root_table, sql_client)
+        partition_column = params.get("partition_column", PARTITION_COLUMN)
+        column = root_table["columns"].get(partition_column, {})
+        if (
+            strategy == "partition"
+            and mergeable
+            and column.get("data_type") in PARTITION_DATA_TYPES
+        ):
+            return sql + cls.gen_partition_merge_sql(
+                root_table, sql_client, partition_column
+            )
+        return sql + cls.gen_merge_sql(table_chain, sql_client)
+
+    @classmethod
+    def _index_name(cls, table: TTableSchema) -> str:
+        # DuckDB creates an index in the schema of its table
+        return f"{table['name']}__primary_key"
+
+    @classmethod
+    def has_index(cls, table: TTableSchema, sql_client: SqlClientBase[Any]) -> bool:
+        rows = _execute_sql(
+            sql_client,
+            "SELECT 1 FROM duckdb_indexes()"
+            " WHERE schema_name = ? AND table_name = ? AND index_name = ?",
+            sql_client.dataset_name,
+            table["name"],
+            cls._index_name(table),
+        )
+        return bool(rows)
+
+    @classmethod
+    def gen_drop_index_sql(
+        cls, table: TTableSchema, sql_client: SqlClientBase[Any]
+    ) -> List[str]:
+        if not cls.has_index(table, sql_client):
+            return []
+        index_name = sql_client.make_qualified_table_name(cls._index_name(table))
+        return [f"DROP INDEX {index_name};"]
+
+    @classmethod
+    def _gen_insert_sql(
+        cls,
+        table: TTableSchema,
+        sql_client: SqlClientBase[Any],
+        insert: str = "INSERT",
+    ) -> str:
+        """Inserts the staging rows in the table, one row per primary key."""
+        escape_id = sql_client.escape_column_name
+        table_name, staging_table_name = sql_client.get_qualified_table_names(
+            table["name"]
+        )
+        primary_keys = cls._escape_list(
+            get_columns_names_with_prop(table, "primary_key"), escape_id
+        )
+        columns = cls._escape_list(
+            get_columns_names_with_prop(table, "name"), escape_id
+        )
+        select_sql = cls.gen_select_from_dedup_sql(
+            staging_table_name,
+            primary_keys,
+            columns,
+            get_dedup_sort_tuple(table),
+            "1 = 1",
+        )
+        return f"{insert} INTO {table_name}({', '.join(columns)}) {select_sql};"
+
+    @classmethod
+    def gen_upsert_index_sql(
+        cls, table: TTableSchema, sql_client: SqlClientBase[Any]
+    ) -> List[str]:
+        sql = []
+        # DuckDB builds the whole index before it checks `IF NOT EXISTS`
+        if not cls.has_index(table, sql_client):
+            escape_id = sql_client.escape_column_name
+            table_name = sql_client.make_qualified_table_name(table["name"])
+            primary_keys = cls._escape_list(
+                get_columns_names_with_prop(table, "primary_key"), escape_id
+            )
+            sql.append(
+                f"CREATE UNIQUE INDEX {escape_id(cls._index_name(table))}"
+                f" ON {table_name}({', '.join(primary_keys)});"
+            )
+        sql.append(cls._gen_insert_sql(table, sql_client, insert="INSERT OR REPLACE"))
+        return sql
+
+    @classmethod
+    def staging_months(
+        cls, table: TTableSchema, sql_client: SqlClientBase[Any], column: str
+    ) -> List[Tuple[Any, Any]]:
+        """The months of `column` in the staging table, as `[start, stop)`
+        ranges where consecutive months are merged. A `None` start is a row
+        without a value."""
+        _, staging_table_name = sql_client.get_qualified_table_names(table["name"])
+        month = f"date_trunc('month', {sql_client.escape_column_name(column)})"
+        query = (
+            f"SELECT DISTINCT {month}, {month} + INTERVAL 1 MONTH"
+            f" FROM {staging_table_name} ORDER BY 1 NULLS FIRST"
+        )
+        ranges: List[List[Any]] = []
+        for start, stop in _execute_sql(sql_client, query):
+            if ranges and ranges[-1][1] == start:
+                ranges[-1][1] = stop
+            else:
+                ranges.append([start, stop])
+        return [(start, stop) for start, stop in ranges]
+
+    @classmethod
+    def gen_partition_merge_sql(
+        cls, table: TTableSchema, sql_client: SqlClientBase[Any], column: str
+    ) -> List[str]:
+        escape_id = sql_client.escape_column_name
+        escape_lit = sql_client.capabilities.escape_literal
+        table_name, staging_table_name = sql_client.get_qualified_table_names(
+            table["name"]
+        )
+        months = cls.staging_months(table, sql_client, column)
+        if not months:
+            return []
+        if months[0][0] is None:
+            # a row without a value may replace a row of any month
+            partition_cond = "1 = 1"
+        else:
+            partition_cond = " OR ".join(
+                f"(d.{escape_id(column)} >= {escape_lit(start)}"
+                f" AND d.{escape_id(column)} < {escape_lit(stop)})"
+                for start, stop in months
+            )
+        key_cond = " AND ".join(
+            f"d.{key} = s.{key}"
+            for key in cls._escape_list(
+                get_columns_names_with_prop(table, "primary_key"), escape_id
+            )
+        )
+        return [
+            f"DELETE FROM {table_name} AS d WHERE ({partition_cond})"
+            f" AND EXISTS (SELECT 1 FROM {staging_table_name} AS s WHERE {key_cond});",
+            cls._gen_insert_sql(table, sql_client),
+        ]
+
+
+class DuckDbMergeClient(DuckDbClient):
+    config: DuckDbMergeClientConfiguration
+
+    def _create_merge_followup_jobs(
+        self, table_chain: Sequence[TTableSchema]
+    ) -> List[FollowupJobRequest]:
+        params: DuckDbMergeJobParams = {
+            "merge_strategy": self.config.merge_strategy,
+            "partition_column": self.config.partition_column,
+        }
+        return [DuckDbMergeJob.from_table_chain(table_chain, self.sql_client, params)]
+
+
+class duckdb_merge(duckdb):
+    spec = DuckDbMergeClientConfiguration
+
+    @property
+    def client_class(self) -> Type[DuckDbMergeClient]:
+        return DuckDbMergeClient
+
+    def __init__(
+        self,
+        credentials: Union[DuckDbCredentials, str, Any] = None,
+        merge_strategy: Optional[str] = None,
+        partition_column: Optional[str] = None,
+        create_indexes: bool = False,
+        destination_name: Optional[str] = None,
+        environment: Optional[str] = None,
+        **kwargs: Any,
+    ) -> None:
+        """The DuckDB destination, merged with `merge_strategy` (see the
+        docstring of this module).
+
+        It's configured in the `[destination.duckdb]` section, like the DuckDB
+        destination of dlt. The arguments that are set supersede the config.
+        """
+        if merge_strategy is not None:
+            kwargs["merge_strategy"] = merge_strategy
+        if partition_column is not None:
+            kwargs["partition_column"] = partition_column
+        super().__init__(
+            credentials=credentials,
+            create_indexes=create_indexes,
+            # the config and the state of the pipelines that load to the
+            # DuckDB destination of dlt apply to this one
+            destination_name=destination_name or "duckdb",
+            environment=environment,
+            **kwargs,
+        )
@@ -0,0 +1,179 @@
+"""A Parquet lake for the landing zone, partitioned by month.
+
+`filesystem_lake` is the filesystem destination of dlt, that writes the tables
+of a pipeline as Parquet files in `bucket_url` (by default `LAKE_ROOT`, on the
+local disk), one directory per table:
+
+    <bucket_url>/landing_zone/service_requests_311/year=2024/month=8/<load_id>.<file_id>.0.parquet
+    <bucket_url>/landing_zone/film_permits/<load_id>.<file_id>.parquet
+
+The layout of dlt places a file according to its table and its load package,
+but not to its rows. So the load job of a table that has `partition_column`
+(`created_date`) splits each file by the year and month of that column, and
+writes each part to its Hive partition (`year=/month=`). DuckDB reads them
+with `read_parquet(..., hive_partitioning = true)`, and skips the partitions
+that a filter on `year` and `month` excludes, without opening their files.
+The rows without a `created_date` are in `year=0/month=0`.
+The other tables are written with the layout of dlt.
+
+The filesystem destination only appends: a row that is loaded again (e.g.
+because of the lookback of the incremental load) is written again, in a newer
+load package. The dbt sources keep the row of the last load of each key (see
+the `landing_zone_source` macro of the dbt package). The `created_date` of a
+row never changes, so all the versions of a row are in the same partition.
+
+https://dlthub.com/docs/dlt-ecosystem/destinations/filesystem
+https://duckdb.org/docs/data/partitioning/hive_partitioning
+"""
+
+import os
+import posixpath
+from typing import Any, Optional, Type
+
+import dlt
+from dlt.common.configuration import configspec, resolve_type
+from dlt.common.destination import DestinationCapabilitiesContext
+from dlt.common.destination.reference import CredentialsConfiguration, LoadJob
+from dlt.common.exceptions import MissingDependencyException
+from dlt.common.schema.typing import TTableSchema
+from dlt.destinations import filesystem, path_utils
+from dlt.destinations.impl.filesystem.configuration import (
+    FilesystemDestinationClientConfiguration,
+)
+from dlt.destinations.impl.filesystem.filesystem import (
+    FilesystemClient,
+    FilesystemLoadJob,
+)
+from duckdb_merge import PARTITION_COLUMN, PARTITION_DATA_TYPES
+
+try:
+    import pyarrow.compute as pc
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+    from pyarrow.fs import FSSpecHandler, PyFileSystem
+except ModuleNotFoundError:
+    raise MissingDependencyException("filesystem lake", ["pyarrow"])
+
+PARTITIONS = ["year", "month"]
+
+
+@configspec
+class FilesystemLakeClientConfiguration(FilesystemDestinationClientConfiguration):
+    partition_column: str = PARTITION_COLUMN
+
+    # configspec collects the type resolvers of a class, not of its bases
+    @resolve_type("credentials")
+    def resolve_credentials_type(self) -> Type[CredentialsConfiguration]:
+        return super().resolve_credentials_type()
+
+
+class HivePartitionedLoadJob(FilesystemLoadJob):
+    """Writes the rows of a Parquet file to the `year=/month=` partitions of
+    `partition_column`, in the directory of its table."""
+
+    def __init__(self, file_path: str, partition_column: str) -> None:
+        super().__init__(file_path)
+        self.partition_column = partition_column
+
+    def make_remote_path(self) -> str:
+        """Returns the path of the file in the layout of dlt, like
+        `FilesystemLoadJob.make_remote_path`, that works only once the `run` of
+        `FilesystemLoadJob` has started."""
+        client = self._job_client
+        destination_file_name = path_utils.create_path(
+            client.config.layout,
+            self._file_name,
+            client.schema.name,
+            self._load_id,
+            current_datetime=client.config.current_datetime,
+            load_package_timestamp=dlt.current.load_package()["state"]["created_at"],
+            extra_placeholders=client.config.extra_placeholders,
+        )
+        pathlib = os.path if client.config.is_local_filesystem else posixpath
+        return pathlib.join(
+            client.dataset_path,
+            path_utils.normalize_path_sep(pathlib, destination_file_name),
+        )
+
+    def run(self) -> None:
+        client = self._job_client
+        remote_path = self.make_remote_path()
+        pathlib = os.path if client.config.is_local_filesystem else posixpath
+        table_dir = pathlib.dirname(remote_path)
+        # e.g. <load_id>.<file_id>.{i}.parquet, where {i} counts the files of a
+        # partition (one, unless it has more than max_rows_per_file rows)
+        stem, ext = pathlib.splitext(pathlib.basename(remote_path))
+
+        table = pq.read_table(self._file_path)
+        column = table.column(self.partition_column)
+        # the rows without a value go to year=0/month=0, so that the partition
+        # columns stay integers (pyarrow would name it __HIVE_DEFAULT_PARTITION__)
+        table = table.append_column(PARTITIONS[0], pc.fill_null(pc.year(column), 0))
+        table = table.append_column(PARTITIONS[1], pc.fill_null(pc.month(column), 0))
+        ds.write_dataset(
+            table,
+            table_dir,
+            format="parquet",
+            filesystem=PyFileSystem(FSSpecHandler(client.fs_client)),
+            partitioning=PARTITIONS,
+            partitioning_flavor="hive",
+            basename_template=f"{stem}.{{i}}{ext}",
+            # the other files of a partition are left as they are
+            existing_data_behavior="overwrite_or_ignore",
+        )
+
+
+class FilesystemLakeClient(FilesystemClient):
+    config: FilesystemLakeClientConfiguration
+
+    def create_load_job(
+        self, table: TTableSchema, file_path: str, load_id: str, restore: bool = False
+    ) -> LoadJob:
+        job = super().create_load_job(table, file_path, load_id, restore)
+        if (
+            type(job) is FilesystemLoadJob
+            and file_path.endswith(".parquet")
+            and table["columns"].get(self.config.partition_column, {}).get("data_type")
+            in PARTITION_DATA_TYPES
+        ):
+            return HivePartitionedLoadJob(file_path, self.config.partition_column)
+        return job
+
+
+class filesystem_lake(filesystem):
+    spec = FilesystemLakeClientConfiguration
+
+    def _raw_capabilities(self) -> DestinationCapabilitiesContext:
+        caps = super()._raw_capabilities()
+        # only Parquet files can be split by partition
+        caps.preferred_loader_file_format = "parquet"
+        return caps
+
+    @property
+    def client_class(self) -> Type[FilesystemLakeClient]:
+        return FilesystemLakeClient
+
+    def __init__(
+        self,
+        bucket_url: Optional[str] = None,
+        partition_column: Optional[str] = None,
+        destination_name: Optional[str] = None,
+        environment: Optional[str] = None,
+        **kwargs: Any,
+    ) -> None:
+        """The filesystem destination, with the tables that have
+        `partition_column` partitioned by month (see the docstring of this
+        module).
+
+        It's configured in the `[destination.filesystem]` section, like the
+        filesystem destination of dlt. The arguments that are set supersede the
+        config.
+        """
+        if partition_column is not None:
+            kwargs["partition_column"] = partition_column
+        super().__init__(
+            bucket_url=bucket_url,
+            destination_name=destination_name or "filesystem",
+            environment=environment,
+            **kwargs,
+        )
@@ -1,6 +1,8 @@
 """Generic API Source"""
 
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from copy import deepcopy
+from datetime import date, datetime, timedelta
 from typing import Type, Any, Dict, List, Optional, Generator, Callable, cast, Union
 import graphlib  # type: ignore[import,unused-ignore]
 from requests.auth import AuthBase
@@ -36,14 +38,19 @@ from .typing import (
     ParamBindType,
 )
 from .config_setup import (
+    EndpointResourceSetup,
     IncrementalParam,
+    LaggedCursor,
     create_auth,
     create_paginator,
+    create_response_cache,
+    create_session,
     build_resource_dependency_graph,
     process_parent_data_item,
     setup_incremental_object,
     create_response_hooks,
 )
+from .instrumentation import instrument_hooks, instrument_pages
 from .utils import check_connection, exclude_keys  # noqa: F401
 
 PARAM_TYPES: List[ParamBindType] = ["incremental", "resolve"]
@@ -215,43 +222,52 @@ def create_resources(
     resolved_param_map: Dict[str, Optional[ResolvedParam]],
 ) -> Dict[str, DltResource]:
     resources = {}
+    # all resources and transformers of the client share one pool of connections
+    session = create_session(client_config.get("session"))
+    response_cache = create_response_cache(client_config.get("response_cache"))
 
     for resource_name in dependency_graph.static_order():
         resource_name = cast(str, resource_name)
         endpoint_resource = endpoint_resource_map[resource_name]
-        endpoint_config = cast(Endpoint, endpoint_resource["endpoint"])
-        request_params = endpoint_config.get("params", {})
-        request_json = endpoint_config.get("json", None)
-        paginator = create_paginator(endpoint_config.get("paginator"))
-
         resolved_param: ResolvedParam = resolved_param_map[resource_name]
-
-        include_from_parent: List[str] = endpoint_resource.get(
-            "include_from_parent", []
-        )
-        if not resolved_param and include_from_parent:
-            raise ValueError(
-                f"Resource {resource_name} has include_from_parent but is not "
-                "dependent on another resource"
-            )
-        _validate_param_type(request_params)
         (
+            endpoint_config,
+            request_params,
+            paginator,
+            include_from_parent,
             incremental_object,
             incremental_param,
             incremental_cursor_transform,
-        ) = setup_incremental_object(request_params, endpoint_config.get("incremental"))
+            lagged_cursor,
+            hooks,
+            resource_kwargs,
+        ) = _setup_endpoint_resource(resource_name, endpoint_resource, resolved_param)
+        request_json = endpoint_config.get("json", None)
+
+        max_concurrency: int = endpoint_resource.get("max_concurrency") or 1
+        preserve_order: bool = endpoint_resource.get("preserve_order", True)
+        if endpoint_config.get("stream") and endpoint_config.get("checkpoint"):
+            raise ValueError(
+                f"Resource {resource_name} is streamed and can't be checkpointed"
+            )
+        if endpoint_config.get("cache"):
+            if response_cache is None:
+                raise ValueError(
+                    f"Resource {resource_name} is cached, but the client has no "
+                    "response_cache"
+                )
+            if endpoint_config.get("stream") or endpoint_config.get("checkpoint"):
+                raise ValueError(
+                    f"Resource {resource_name} is cached and can't be streamed "
+                    "nor checkpointed"
+                )
 
         client = RESTClient(
             base_url=client_config["base_url"],
             headers=client_config.get("headers"),
             auth=create_auth(client_config.get("auth")),
             paginator=create_paginator(client_config.get("paginator")),
-        )
-
-        hooks = create_response_hooks(endpoint_config.get("response_actions"))
-
-        resource_kwargs = exclude_keys(
-            endpoint_resource, {"endpoint", "include_from_parent"}
+            session=session,
         )
 
         if resolved_param is None:
@@ -264,30 +280,94 @@ def create_resources(
                 paginator: Optional[BasePaginator],
                 data_selector: Optional[jsonpath.TJsonPath],
                 hooks: Optional[Dict[str, Any]],
+                stream: bool = False,
+                stream_batch_size: Optional[int] = None,
+                checkpoint: bool = False,
+                max_pages_per_run: Optional[int] = None,
+                backfill_id: Optional[str] = None,
+                cache: bool = False,
+                page_transform: Optional[Callable[[List[Any]], Any]] = None,
+                resource_name: str = resource_name,
                 client: RESTClient = client,
                 incremental_object: Optional[Incremental[Any]] = incremental_object,
                 incremental_param: Optional[IncrementalParam] = incremental_param,
                 incremental_cursor_transform: Optional[
                     Callable[..., Any]
                 ] = incremental_cursor_transform,
+                lagged_cursor: Optional[LaggedCursor] = lagged_cursor,
             ) -> Generator[Any, None, None]:
-                if incremental_object:
+                if incremental_object or lagged_cursor:
                     params = _set_incremental_params(
                         params,
-                        incremental_object,
+                        incremental_object or lagged_cursor,
                         incremental_param,
                         incremental_cursor_transform,
                     )
 
-                yield from client.paginate(
-                    method=method,
-                    path=path,
-                    params=params,
-                    json=json,
-                    paginator=paginator,
-                    data_selector=data_selector,
-                    hooks=hooks,
-                )
+                hooks = instrument_hooks(resource_name, hooks)
+                if stream:
+                    from .streaming import DEFAULT_STREAM_BATCH_SIZE, paginate_streaming
+
+                    pages = paginate_streaming(
+                        client,
+                        method=method,
+                        path=path,
+                        params=params,
+                        json=json,
+                        paginator=paginator,
+                        data_selector=data_selector,
+                        hooks=hooks,
+                        batch_size=stream_batch_size or DEFAULT_STREAM_BATCH_SIZE,
+                    )
+                elif checkpoint:
+                    from .checkpoints import paginate_checkpointed
+
+                    pages = paginate_checkpointed(
+                        client,
+                        resource_name,
+                        max_pages=max_pages_per_run,
+                        backfill_id=backfill_id,
+                        method=method,
+                        path=path,
+                        params=params,
+                        json=json,
+                        paginator=paginator,
+                        data_selector=data_selector,
+                        hooks=hooks,
+                    )
+                elif cache:
+                    from .cache import paginate_cached
+
+                    pages = paginate_cached(
+                        client,
+                        response_cache,
+                        resource_name,
+                        method=method,
+                        path=path,
+                        params=params,
+                        json=json,
+                        paginator=paginator,
+                        data_selector=data_selector,
+                        hooks=hooks,
+                    )
+                else:
+                    pages = client.paginate(
+                        method=method,
+                        path=path,
+                        params=params,
+                        json=json,
+                        paginator=paginator,
+                        data_selector=data_selector,
+                        hooks=hooks,
+                    )
+
+                if lagged_cursor:
+                    pages = lagged_cursor.track(pages)
+                if page_transform is None:
+                    yield from instrument_pages(resource_name, pages)
+                    return
+                for page in instrument_pages(resource_name, pages):
+                    yield page_transform(page)
 
             resources[resource_name] = dlt.resource(
                 paginate_resource,
@@ -300,9 +380,32 @@ def create_resources(
                 paginator=paginator,
                 data_selector=endpoint_config.get("data_selector"),
                 hooks=hooks,
+                stream=endpoint_config.get("stream", False),
+                stream_batch_size=endpoint_config.get("stream_batch_size"),
+                checkpoint=endpoint_config.get("checkpoint", False),
+                max_pages_per_run=endpoint_config.get("max_pages_per_run"),
+                backfill_id=endpoint_config.get("backfill_id"),
+                cache=endpoint_config.get("cache", False),
+                page_transform=endpoint_config.get("page_transform"),
             )
 
         else:
+            if endpoint_config.get("stream"):
+                raise ValueError(
+                    f"Resource {resource_name} is a dependent resource and can't be streamed"
+                )
+            if endpoint_config.get("checkpoint"):
+                raise ValueError(
+                    f"Resource {resource_name} is a dependent resource and can't be checkpointed"
+                )
+            if endpoint_config.get("cache"):
+                raise ValueError(
+                    f"Resource {resource_name} is a dependent resource and can't be cached"
+                )
+            if endpoint_config.get("page_transform"):
+                raise ValueError(
+                    f"Resource {resource_name} is a dependent resource and can't transform its pages"
+                )
             predecessor = resources[resolved_param.resolve_config["resource"]]
 
             base_params = exclude_keys(request_params, {resolved_param.param_name})
@@ -315,9 +418,12 @@ def create_resources(
                 paginator: Optional[BasePaginator],
                 data_selector: Optional[jsonpath.TJsonPath],
                 hooks: Optional[Dict[str, Any]],
+                resource_name: str = resource_name,
                 client: RESTClient = client,
                 resolved_param: ResolvedParam = resolved_param,
                 include_from_parent: List[str] = include_from_parent,
+                max_concurrency: int = max_concurrency,
+                preserve_order: bool = preserve_order,
                 incremental_object: Optional[Incremental[Any]] = incremental_object,
                 incremental_param: Optional[IncrementalParam] = incremental_param,
                 incremental_cursor_transform: Optional[
@@ -332,23 +438,41 @@ def create_resources(
                         incremental_cursor_transform,
                     )
 
-                for item in items:
-                    formatted_path, parent_record = process_parent_data_item(
-                        path, item, resolved_param, include_from_parent
-                    )
-
-                    for child_page in client.paginate(
+                hooks = instrument_hooks(resource_name, hooks)
+                if max_concurrency > 1:
+                    pages = _paginate_children_concurrently(
+                        items,
+                        max_concurrency=max_concurrency,
+                        preserve_order=preserve_order,
+                        client=client,
                         method=method,
-                        path=formatted_path,
+                        path=path,
                         params=params,
                         paginator=paginator,
                         data_selector=data_selector,
                         hooks=hooks,
-                    ):
-                        if parent_record:
-                            for child_record in child_page:
-                                child_record.update(parent_record)
-                        yield child_page
+                        resolved_param=resolved_param,
+                        include_from_parent=include_from_parent,
+                    )
+                else:
+                    pages = (
+                        child_page
+                        for item in items
+                        for child_page in _paginate_child(
+                            item,
+                            client=client,
+                            method=method,
+                            path=path,
+                            params=params,
+                            paginator=paginator,
+                            data_selector=data_selector,
+                            hooks=hooks,
+                            resolved_param=resolved_param,
+                            include_from_parent=include_from_parent,
+                        )
+                    )
+
+                yield from instrument_pages(resource_name, pages)
 
             resources[resource_name] = dlt.resource(  # type: ignore[call-overload]
                 paginate_dependent_resource,
@@ -366,6 +490,123 @@ def create_resources(
     return resources
 
 
+def _setup_endpoint_resource(
+    resource_name: str,
+    endpoint_resource: EndpointResource,
+    resolved_param: Optional[ResolvedParam],
+) -> EndpointResourceSetup:
+    """Validates the config of an endpoint resource, and sets up its paginator,
+    incremental, response hooks and resource hints (see `EndpointResourceSetup`)."""
+    endpoint_config = cast(Endpoint, endpoint_resource["endpoint"])
+    request_params = endpoint_config.get("params", {})
+
+    include_from_parent: List[str] = endpoint_resource.get("include_from_parent", [])
+    if not resolved_param and include_from_parent:
+        raise ValueError(
+            f"Resource {resource_name} has include_from_parent but is not "
+            "dependent on another resource"
+        )
+    if not resolved_param and (endpoint_resource.get("max_concurrency") or 1) > 1:
+        raise ValueError(
+            f"Resource {resource_name} has max_concurrency but is not "
+            "dependent on another resource"
+        )
+    _validate_param_type(request_params)
+    (
+        incremental_object,
+        incremental_param,
+        incremental_cursor_transform,
+    ) = setup_incremental_object(request_params, endpoint_config.get("incremental"))
+    lagged_cursor = None
+    if incremental_param and incremental_param.lag:
+        if resolved_param:
+            raise ValueError(
+                f"Resource {resource_name} is a dependent resource and its "
+                "incremental can't have a lag"
+            )
+        lagged_cursor = LaggedCursor(resource_name, incremental_object)
+        incremental_object = None
+
+    return EndpointResourceSetup(
+        endpoint_config=endpoint_config,
+        request_params=request_params,
+        paginator=create_paginator(endpoint_config.get("paginator")),
+        include_from_parent=include_from_parent,
+        incremental_object=incremental_object,
+        incremental_param=incremental_param,
+        incremental_cursor_transform=incremental_cursor_transform,
+        lagged_cursor=lagged_cursor,
+        hooks=create_response_hooks(endpoint_config.get("response_actions")),
+        resource_kwargs=exclude_keys(
+            endpoint_resource,
+            {"endpoint", "include_from_parent", "max_concurrency", "preserve_order"},
+        ),
+    )
+
+
+def _paginate_child(
+    item: Dict[str, Any],
+    client: RESTClient,
+    method: HTTPMethodBasic,
+    path: str,
+    params: Dict[str, Any],
+    paginator: Optional[BasePaginator],
+    data_selector: Optional[jsonpath.TJsonPath],
+    hooks: Optional[Dict[str, Any]],
+    resolved_param: ResolvedParam,
+    include_from_parent: List[str],
+) -> Generator[Any, None, None]:
+    formatted_path, parent_record = process_parent_data_item(
+        path, item, resolved_param, include_from_parent
+    )
+
+    for child_page in client.paginate(
+        method=method,
+        path=formatted_path,
+        params=params,
+        paginator=paginator,
+        data_selector=data_selector,
+        hooks=hooks,
+    ):
+        if parent_record:
+            for child_record in child_page:
+                child_record.update(parent_record)
+        yield child_page
+
+
+def _paginate_children_concurrently(
+    items: List[Dict[str, Any]],
+    max_concurrency: int,
+    preserve_order: bool,
+    **child_kwargs: Any,
+) -> Generator[Any, None, None]:
+    """Paginates the children of `items` in a pool of `max_concurrency` threads.
+
+    All pages of a child are yielded together. When `preserve_order` is False,
+    children are yielded as soon as they complete, instead of in the order of
+    their parents.
+    """
+    params: Dict[str, Any] = child_kwargs.pop("params")
+    paginator: Optional[BasePaginator] = child_kwargs.pop("paginator")
+
+    def fetch_child(item: Dict[str, Any]) -> List[Any]:
+        # paginators and request params are mutated while paginating, so each
+        # child gets its own copies
+        return list(
+            _paginate_child(
+                item,
+                params=dict(params),
+                paginator=deepcopy(paginator),
+                **child_kwargs,
+            )
+        )
+
+    with ThreadPoolExecutor(max_workers=max_concurrency) as executor:
+        futures = [executor.submit(fetch_child, item) for item in items]
+        for future in futures if preserve_order else as_completed(futures):
+            yield from future.result()
+
+
 def _validate_config(config: RESTAPIConfig) -> None:
     c = deepcopy(config)
     client_config = c.get("client")
@@ -414,7 +655,7 @@ def _mask_secret(secret: Optional[str]) -> str:
 
 def _set_incremental_params(
     params: Dict[str, Any],
-    incremental_object: Incremental[Any],
+    incremental_object: Union[Incremental[Any], LaggedCursor],
     incremental_param: IncrementalParam,
     transform: Optional[Callable[..., Any]],
 ) -> Dict[str, Any]:
@@ -423,14 +664,34 @@ def _set_incremental_params(
 
     if transform is None:
         transform = identity_func
-    params[incremental_param.start] = transform(incremental_object.last_value)
+    start_value = incremental_object.last_value
+    # there's nothing to fetch again on the first run
+    if incremental_param.lag and start_value != incremental_object.initial_value:
+        start_value = _lag_value(start_value, incremental_param.lag)
+    params[incremental_param.start] = transform(start_value)
     if incremental_param.end:
         params[incremental_param.end] = transform(incremental_object.end_value)
     return params
 
 
+def _lag_value(value: Any, lag: float) -> Any:
+    if value is None:
+        return value
+    if isinstance(value, datetime):
+        return value - timedelta(seconds=lag)
+    if isinstance(value, date):
+        return value - timedelta(days=lag // 86_400)
+    if isinstance(value, str):
+        # e.g. ISO timestamps, that are compared as strings
+        lagged = datetime.fromisoformat(value) - timedelta(seconds=lag)
+        if "." in value:
+            return lagged.isoformat(timespec="milliseconds")
+        return lagged.isoformat()
+    return value - lag
+
+
 def _validate_param_type(
-    request_params: Dict[str, Union[ResolveParamConfig, IncrementalParamConfig, Any]]
+    request_params: Dict[str, Union[ResolveParamConfig, IncrementalParamConfig, Any]],
 ) -> None:
     for _, value in request_params.items():
         if isinstance(value, dict) and value.get("type") not in PARAM_TYPES:
@@ -456,3 +717,6 @@ def _register_source(source_func: Callable[..., DltSource]) -> None:
 
 
 _register_source(rest_api_source)
+
+# imported last, since the async engine reuses the helpers of this module
+from .async_engine import async_rest_api_resources  # noqa: E402, F401
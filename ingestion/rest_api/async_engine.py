@@ -0,0 +1,500 @@
+"""Async engine for rest_api resources.
+
+`async_rest_api_resources` takes the same `RESTAPIConfig` as
+`rest_api_resources`, but its resources are async generators and its
+dependent resources are async transformers. dlt evaluates them on one event
+loop, so all the requests of all the resources (and of the children of each
+parent page) are in flight at the same time, without a thread per request.
+
+Requests are still built with `requests` (so auth classes and paginators work
+unchanged), sent with `httpx`, and converted back to `requests.Response`
+before they reach response hooks, response actions and paginators.
+"""
+
+import asyncio
+from copy import deepcopy
+from typing import (
+    Any,
+    AsyncGenerator,
+    Callable,
+    Dict,
+    List,
+    Optional,
+    cast,
+)
+from urllib.parse import urlparse
+
+import dlt
+from dlt.common import jsonpath, logger
+from dlt.common.configuration import resolve_configuration
+from dlt.common.configuration.specs import RunConfiguration
+from dlt.common.exceptions import MissingDependencyException
+from dlt.extract.incremental import Incremental
+from dlt.extract.source import DltResource
+from dlt.sources.helpers.requests import Response
+from dlt.sources.helpers.requests.retry import (
+    DEFAULT_RETRY_EXCEPTIONS,
+    DEFAULT_RETRY_STATUS,
+    retry_if_status,
+    wait_exponential_retry_after,
+)
+from dlt.sources.helpers.rest_client import RESTClient
+from dlt.sources.helpers.rest_client.exceptions import IgnoreResponseException
+from dlt.sources.helpers.rest_client.paginators import BasePaginator
+from dlt.sources.helpers.rest_client.typing import HTTPMethodBasic
+from requests import ConnectionError, PreparedRequest, Request, Timeout
+from requests.hooks import dispatch_hook
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+from tenacity import (
+    AsyncRetrying,
+    retry_any,
+    retry_if_exception_type,
+    stop_after_attempt,
+)
+
+import graphlib  # type: ignore[import,unused-ignore]
+
+from . import _set_incremental_params, _setup_endpoint_resource, _validate_config
+from .config_setup import (
+    IncrementalParam,
+    LaggedCursor,
+    build_resource_dependency_graph,
+    create_auth,
+    create_paginator,
+    create_rate_limiter,
+    create_session,
+    process_parent_data_item,
+)
+from .typing import (
+    ClientConfig,
+    EndpointResource,
+    RESTAPIConfig,
+    ResolvedParam,
+    SessionConfig,
+)
+from .utils import exclude_keys
+
+DEFAULT_MAX_REQUESTS_PER_HOST = 8
+# the features of the sync engine that the async engine does not implement
+UNSUPPORTED_ENDPOINT_KEYS = (
+    "stream",
+    "stream_batch_size",
+    "checkpoint",
+    "max_pages_per_run",
+    "backfill_id",
+    "cache",
+    "page_transform",
+)
+
+
+class AsyncTransport:
+    """Sends prepared requests with one `httpx.AsyncClient`, shared by all the
+    resources of a client.
+
+    At most `max_requests_per_host` requests are in flight to the same host at
+    any time. Failed requests are retried like in the default session of
+    `RESTClient` (429, 5xx, timeouts and connection errors), using the
+    `request_*` settings of the `[runtime]` section. With a `rate_limit`, the
+    requests to each host are also paced by its token bucket.
+
+    The `httpx.AsyncClient` is created on the event loop of the first request,
+    and closed when the last resource that uses the transport is exhausted.
+    """
+
+    def __init__(self, session_config: Optional[SessionConfig] = None) -> None:
+        session_config = session_config or {}
+        self.max_requests_per_host = (
+            session_config.get("max_requests_per_host") or DEFAULT_MAX_REQUESTS_PER_HOST
+        )
+        self.run_config = resolve_configuration(RunConfiguration())
+        self.rate_limiter = create_rate_limiter(session_config.get("rate_limit"))
+        self._http: Any = None
+        self._host_semaphores: Dict[str, asyncio.Semaphore] = {}
+        self._users = 0
+
+    async def __aenter__(self) -> "AsyncTransport":
+        self._users += 1
+        return self
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        self._users -= 1
+        if self._users == 0 and self._http is not None:
+            await self._http.aclose()
+            self._http = None
+            self._host_semaphores = {}
+
+    def _client(self) -> Any:
+        if self._http is None:
+            try:
+                import httpx
+            except ModuleNotFoundError:
+                raise MissingDependencyException("rest_api async engine", ["httpx"])
+
+            self._http = httpx.AsyncClient(
+                timeout=self.run_config.request_timeout,
+                limits=httpx.Limits(
+                    max_keepalive_connections=self.max_requests_per_host,
+                ),
+            )
+        return self._http
+
+    def _host_semaphore(self, url: str) -> asyncio.Semaphore:
+        host = urlparse(url).netloc
+        if host not in self._host_semaphores:
+            self._host_semaphores[host] = asyncio.Semaphore(self.max_requests_per_host)
+        return self._host_semaphores[host]
+
+    def _retrying(self) -> AsyncRetrying:
+        return AsyncRetrying(
+            wait=wait_exponential_retry_after(
+                multiplier=self.run_config.request_backoff_factor,
+                max=self.run_config.request_max_retry_delay,
+            ),
+            retry=retry_any(
+                retry_if_status(DEFAULT_RETRY_STATUS),
+                retry_if_exception_type(DEFAULT_RETRY_EXCEPTIONS),
+            ),
+            stop=stop_after_attempt(self.run_config.request_max_attempts),
+            reraise=True,
+            retry_error_callback=lambda state: state.outcome.result(),
+        )
+
+    async def send(self, request: PreparedRequest) -> Response:
+        """Sends `request`, and dispatches its response hooks (e.g.
+        `raise_for_status` and response actions) on every attempt."""
+        async for attempt in self._retrying():
+            with attempt:
+                response = await self._send_once(request)
+                response = dispatch_hook("response", request.hooks, response)
+        return response
+
+    async def _send_once(self, request: PreparedRequest) -> Response:
+        import httpx
+
+        client = self._client()
+        bucket = self.rate_limiter.bucket(request.url) if self.rate_limiter else None
+        if bucket:
+            await bucket.wait_async()
+        try:
+            async with self._host_semaphore(request.url):
+                httpx_response = await client.request(
+                    request.method,
+                    request.url,
+                    headers=dict(request.headers),
+                    content=request.body,
+                )
+        # map httpx errors to the requests errors that the retry logic expects
+        except httpx.TimeoutException as ex:
+            raise Timeout(str(ex), request=request) from ex
+        except httpx.TransportError as ex:
+            raise ConnectionError(str(ex), request=request) from ex
+
+        response = to_requests_response(httpx_response, request)
+        if bucket:
+            bucket.record(response)
+        return response
+
+
+def to_requests_response(httpx_response: Any, request: PreparedRequest) -> Response:
+    """Converts an `httpx.Response` whose body has been read to a
+    `requests.Response`, so that hooks and paginators can use it."""
+    response = Response()
+    response.status_code = httpx_response.status_code
+    response.reason = httpx_response.reason_phrase
+    response.headers = CaseInsensitiveDict(httpx_response.headers)
+    # httpx has already decoded gzip/deflate bodies
+    response._content = httpx_response.content
+    response.encoding = get_encoding_from_headers(response.headers)
+    response.url = str(httpx_response.url)
+    response.elapsed = httpx_response.elapsed
+    response.request = request
+    return response
+
+
+class AsyncRESTClient(RESTClient):
+    """A `RESTClient` that sends its requests through an `AsyncTransport`.
+
+    Requests are built and prepared by `RESTClient` (base URL, headers, auth),
+    and pages are extracted and paginated like in `RESTClient.paginate`.
+    """
+
+    def __init__(self, *args: Any, transport: AsyncTransport, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self.transport = transport
+
+    async def paginate_async(
+        self,
+        path: str = "",
+        method: HTTPMethodBasic = "GET",
+        params: Optional[Dict[str, Any]] = None,
+        json: Optional[Dict[str, Any]] = None,
+        paginator: Optional[BasePaginator] = None,
+        data_selector: Optional[jsonpath.TJsonPath] = None,
+        hooks: Optional[Dict[str, Any]] = None,
+    ) -> AsyncGenerator[Any, None]:
+        """Async version of `RESTClient.paginate`."""
+        paginator = paginator if paginator else deepcopy(self.paginator)
+        data_selector = data_selector or self.data_selector
+        hooks = hooks or {}
+
+        def raise_for_status(response: Response, *args: Any, **kwargs: Any) -> None:
+            response.raise_for_status()
+
+        if "response" not in hooks:
+            hooks["response"] = [raise_for_status]
+
+        request = self._create_request(
+            path=path, method=method, params=params, json=json, hooks=hooks
+        )
+
+        if paginator:
+            paginator.init_request(request)
+
+        while True:
+            try:
+                response = await self._send_request_async(request)
+            except IgnoreResponseException:
+                break
+
+            if not data_selector:
+                data_selector = self.detect_data_selector(response)
+            data = self.extract_response(response, data_selector)
+
+            if paginator is None:
+                paginator = self.detect_paginator(response, data)
+            paginator.update_state(response, data)
+            paginator.update_request(request)
+
+            yield data
+
+            if not paginator.has_next_page:
+                break
+
+    async def _send_request_async(self, request: Request) -> Response:
+        logger.info(
+            f"Making {request.method.upper()} request to {request.url}"
+            f" with params={request.params}, json={request.json}"
+        )
+        # the session merges its own headers (e.g. Accept-Encoding) and auth
+        prepared_request = self.session.prepare_request(request)
+        return await self.transport.send(prepared_request)
+
+
+def async_rest_api_resources(config: RESTAPIConfig) -> List[DltResource]:
+    """Like `rest_api_resources`, but the resources are evaluated on one event
+    loop by dlt.
+
+    Independent resources are async generators. Dependent resources are async
+    transformers, that fetch the children of all the items of a parent page at
+    the same time (bounded by `max_concurrency`, if set), and return them in
+    the order of their parents. Streaming is not supported.
+
+    The number of requests in flight to the same host is bounded by
+    `max_requests_per_host` in the `session` section of the client config.
+
+    Requires `httpx`.
+    """
+    _validate_config(config)
+
+    client_config = config["client"]
+    resource_defaults = config.get("resource_defaults", {})
+    resource_list = config["resources"]
+
+    (
+        dependency_graph,
+        endpoint_resource_map,
+        resolved_param_map,
+    ) = build_resource_dependency_graph(
+        resource_defaults,
+        resource_list,
+    )
+
+    resources = create_async_resources(
+        client_config,
+        dependency_graph,
+        endpoint_resource_map,
+        resolved_param_map,
+    )
+
+    return list(resources.values())
+
+
+def create_async_resources(
+    client_config: ClientConfig,
+    dependency_graph: graphlib.TopologicalSorter,
+    endpoint_resource_map: Dict[str, EndpointResource],
+    resolved_param_map: Dict[str, Optional[ResolvedParam]],
+) -> Dict[str, DltResource]:
+    resources = {}
+    if client_config.get("response_cache"):
+        raise ValueError("The async engine does not support response_cache")
+    session_config = client_config.get("session")
+    if session_config and session_config.get("transport"):
+        raise ValueError("The async engine does not support transport")
+    # the session only prepares requests, the transport sends them
+    session = create_session(session_config)
+    transport = AsyncTransport(session_config)
+
+    for resource_name in dependency_graph.static_order():
+        resource_name = cast(str, resource_name)
+        endpoint_resource = endpoint_resource_map[resource_name]
+        resolved_param: ResolvedParam = resolved_param_map[resource_name]
+        (
+            endpoint_config,
+            request_params,
+            paginator,
+            include_from_parent,
+            incremental_object,
+            incremental_param,
+            incremental_cursor_transform,
+            lagged_cursor,
+            hooks,
+            resource_kwargs,
+        ) = _setup_endpoint_resource(resource_name, endpoint_resource, resolved_param)
+        request_json = endpoint_config.get("json", None)
+        max_concurrency: Optional[int] = endpoint_resource.get("max_concurrency")
+        for key in UNSUPPORTED_ENDPOINT_KEYS:
+            if endpoint_config.get(key):  # type: ignore[misc]
+                raise ValueError(
+                    f"Resource {resource_name} sets {key}, that is not supported "
+                    "by the async engine"
+                )
+
+        client = AsyncRESTClient(
+            base_url=client_config["base_url"],
+            headers=client_config.get("headers"),
+            auth=create_auth(client_config.get("auth")),
+            paginator=create_paginator(client_config.get("paginator")),
+            session=session,
+            transport=transport,
+        )
+
+        if resolved_param is None:
+
+            async def paginate_resource(
+                method: HTTPMethodBasic,
+                path: str,
+                params: Dict[str, Any],
+                json: Optional[Dict[str, Any]],
+                paginator: Optional[BasePaginator],
+                data_selector: Optional[jsonpath.TJsonPath],
+                hooks: Optional[Dict[str, Any]],
+                client: AsyncRESTClient = client,
+                incremental_object: Optional[Incremental[Any]] = incremental_object,
+                incremental_param: Optional[IncrementalParam] = incremental_param,
+                incremental_cursor_transform: Optional[
+                    Callable[..., Any]
+                ] = incremental_cursor_transform,
+                lagged_cursor: Optional[LaggedCursor] = lagged_cursor,
+            ) -> AsyncGenerator[Any, None]:
+                if incremental_object or lagged_cursor:
+                    params = _set_incremental_params(
+                        params,
+                        incremental_object or lagged_cursor,
+                        incremental_param,
+                        incremental_cursor_transform,
+                    )
+
+                async with client.transport:
+                    async for page in client.paginate_async(
+                        method=method,
+                        path=path,
+                        params=params,
+                        json=json,
+                        paginator=paginator,
+                        data_selector=data_selector,
+                        hooks=hooks,
+                    ):
+                        if lagged_cursor:
+                            lagged_cursor.update(page)
+                        yield page
+
+            resources[resource_name] = dlt.resource(
+                paginate_resource,
+                **resource_kwargs,  # TODO: implement typing.Unpack
+            )(
+                method=endpoint_config.get("method", "get"),
+                path=endpoint_config.get("path"),
+                params=request_params,
+                json=request_json,
+                paginator=paginator,
+                data_selector=endpoint_config.get("data_selector"),
+                hooks=hooks,
+            )
+
+        else:
+            predecessor = resources[resolved_param.resolve_config["resource"]]
+
+            base_params = exclude_keys(request_params, {resolved_param.param_name})
+
+            async def paginate_dependent_resource(
+                items: List[Dict[str, Any]],
+                method: HTTPMethodBasic,
+                path: str,
+                params: Dict[str, Any],
+                paginator: Optional[BasePaginator],
+                data_selector: Optional[jsonpath.TJsonPath],
+                hooks: Optional[Dict[str, Any]],
+                client: AsyncRESTClient = client,
+                resolved_param: ResolvedParam = resolved_param,
+                include_from_parent: List[str] = include_from_parent,
+                max_concurrency: Optional[int] = max_concurrency,
+                incremental_object: Optional[Incremental[Any]] = incremental_object,
+                incremental_param: Optional[IncrementalParam] = incremental_param,
+                incremental_cursor_transform: Optional[
+                    Callable[..., Any]
+                ] = incremental_cursor_transform,
+            ) -> List[Any]:
+                if incremental_object:
+                    params = _set_incremental_params(
+                        params,
+                        incremental_object,
+                        incremental_param,
+                        incremental_cursor_transform,
+                    )
+
+                # `max_requests_per_host` already bounds the requests in flight,
+                # `max_concurrency` bounds the children of this resource
+                semaphore = asyncio.Semaphore(max_concurrency or len(items) or 1)
+
+                async def fetch_child(item: Dict[str, Any]) -> List[Any]:
+                    formatted_path, parent_record = process_parent_data_item(
+                        path, item, resolved_param, include_from_parent
+                    )
+                    child_records: List[Any] = []
+                    async with semaphore:
+                        # paginators and request params are mutated while
+                        # paginating, so each child gets its own copies
+                        async for child_page in client.paginate_async(
+                            method=method,
+                            path=formatted_path,
+                            params=dict(params),
+                            paginator=deepcopy(paginator),
+                            data_selector=data_selector,
+                            hooks=hooks,
+                        ):
+                            if parent_record:
+                                for child_record in child_page:
+                                    child_record.update(parent_record)
+                            child_records.extend(child_page)
+                    return child_records
+
+                async with client.transport:
+                    children = await asyncio.gather(*map(fetch_child, items))
+                return [record for child in children for record in child]
+
+            resources[resource_name] = dlt.resource(  # type: ignore[call-overload]
+                paginate_dependent_resource,
+                data_from=predecessor,
+                **resource_kwargs,  # TODO: implement typing.Unpack
+            )(
+                method=endpoint_config.get("method", "get"),
+                path=endpoint_config.get("path"),
+                params=base_params,
+                paginator=paginator,
+                data_selector=endpoint_config.get("data_selector"),
+                hooks=hooks,
+            )
+
+    return resources
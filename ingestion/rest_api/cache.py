@@ -0,0 +1,204 @@
+"""Conditional requests for resources that rarely change.
+
+A cached resource remembers the `ETag` and the `Last-Modified` validators of
+the first page of its last download. The next run sends them back as
+`If-None-Match` and `If-Modified-Since`: if the server replies `304 Not
+Modified`, the resource is skipped entirely, and its table keeps the rows that
+were loaded before. Otherwise, the resource is downloaded again, and the new
+validators replace the old ones.
+
+The validators of the first page stand for the whole resource, so a cache is
+a good fit for APIs that version a dataset as a whole (e.g. Socrata), and for
+resources that fit in a few pages.
+
+The validators are kept in the dlt resource state, and saved once the last
+page has been extracted, so they are committed together with the pages, in
+the load package of the run. If the extract fails, dlt discards both, and the
+next run downloads the resource again. If the load fails, the next
+`pipeline.run` loads the pending package before it extracts anything, so
+skipping the resource does not lose rows.
+
+The state is saved with every load package, so the validators of a resource
+take at most `max_bytes` (serialized as JSON): the least recently used ones
+are evicted beyond that (e.g. the validators of requests with old params).
+"""
+
+import copy
+import json
+import threading
+from typing import Any, Dict, Generator, Optional
+
+import dlt
+from dlt.common import jsonpath, logger
+from dlt.common.utils import digest128
+from dlt.sources.helpers.requests import Response
+from dlt.sources.helpers.rest_client import RESTClient
+from dlt.sources.helpers.rest_client.client import PageData
+from dlt.sources.helpers.rest_client.exceptions import IgnoreResponseException
+from dlt.sources.helpers.rest_client.paginators import BasePaginator
+from dlt.sources.helpers.rest_client.typing import HTTPMethodBasic
+
+DEFAULT_MAX_BYTES = 16_384
+RESPONSE_CACHE_STATE_KEY = "response_cache"
+
+
+class ResponseCache:
+    """Validators of the responses of many resources, each kept in the state
+    of its resource. Safe to share between the threads of parallelized
+    resources.
+
+    `stats` counts, for each resource, the runs that were skipped because the
+    server replied `304 Not Modified` (`hits`), and the runs that downloaded
+    the resource (`misses`).
+    """
+
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES) -> None:
+        if max_bytes <= 0:
+            raise ValueError(f"max_bytes must be positive. Found: {max_bytes}")
+        self.max_bytes = max_bytes
+        self.stats: Dict[str, Dict[str, int]] = {}
+        self._lock = threading.Lock()
+
+    def __repr__(self) -> str:
+        return f"ResponseCache(max_bytes={self.max_bytes})"
+
+    def key(self, url: str, params: Optional[Dict[str, Any]] = None) -> str:
+        request = json.dumps(
+            {"url": url, "params": params}, sort_keys=True, default=str
+        )
+        return digest128(request)
+
+    def _entries(self, resource_name: str) -> Dict[str, Dict[str, str]]:
+        # parallelized resources run in a thread, so the name must be explicit.
+        # The entries are ordered from the least to the most recently used.
+        state = dlt.current.resource_state(resource_name)
+        entries: Dict[str, Dict[str, str]] = state.setdefault(
+            RESPONSE_CACHE_STATE_KEY, {}
+        )
+        return entries
+
+    def get(self, resource_name: str, key: str) -> Optional[Dict[str, str]]:
+        """Returns the validators saved for `key`, and marks them as the most
+        recently used."""
+        entries = self._entries(resource_name)
+        if key not in entries:
+            return None
+        entries[key] = entries.pop(key)
+        return entries[key]
+
+    def put(self, resource_name: str, key: str, response: Response) -> None:
+        """Saves the validators of `response`, if it has any."""
+        entry = {
+            header: response.headers[header]
+            for header in ("ETag", "Last-Modified")
+            if header in response.headers
+        }
+        if not entry:
+            logger.info(f"{response.url} has no ETag nor Last-Modified: not cached")
+            return
+        entries = self._entries(resource_name)
+        entries.pop(key, None)
+        entries[key] = {**entry, "url": response.url}
+        self.evict(resource_name)
+
+    def evict(self, resource_name: str) -> None:
+        """Deletes the least recently used entries of `resource_name` beyond
+        `max_bytes`. The most recently used entry is always kept."""
+        entries = self._entries(resource_name)
+        while len(entries) > 1 and len(json.dumps(entries)) > self.max_bytes:
+            key = next(iter(entries))
+            logger.info(f"evict {entries[key]['url']} from {self}")
+            del entries[key]
+
+    def count(self, resource_name: str, hit: bool) -> None:
+        with self._lock:
+            stats = self.stats.setdefault(resource_name, {"hits": 0, "misses": 0})
+            stats["hits" if hit else "misses"] += 1
+            logger.info(f"response cache of {resource_name}: {stats}")
+
+
+def conditional_headers(validators: Dict[str, str]) -> Dict[str, str]:
+    headers = {}
+    if "ETag" in validators:
+        headers["If-None-Match"] = validators["ETag"]
+    if "Last-Modified" in validators:
+        headers["If-Modified-Since"] = validators["Last-Modified"]
+    return headers
+
+
+def paginate_cached(
+    client: RESTClient,
+    cache: ResponseCache,
+    resource_name: str,
+    method: HTTPMethodBasic,
+    path: str,
+    params: Optional[Dict[str, Any]] = None,
+    json: Optional[Dict[str, Any]] = None,
+    paginator: Optional[BasePaginator] = None,
+    data_selector: Optional[jsonpath.TJsonPath] = None,
+    hooks: Optional[Dict[str, Any]] = None,
+) -> Generator[Any, None, None]:
+    """Like `RESTClient.paginate`, but sends the first request with the
+    validators saved in `cache`, and yields nothing if the server replies
+    `304 Not Modified`."""
+    paginator = paginator if paginator else copy.deepcopy(client.paginator)
+    hooks = hooks or {}
+
+    def raise_for_status(response: Response, *args: Any, **kwargs: Any) -> None:
+        response.raise_for_status()
+
+    if "response" not in hooks:
+        hooks["response"] = [raise_for_status]
+
+    # RESTClient has no public method to send a request with extra headers
+    request = client._create_request(
+        path=path, method=method, params=params, json=json, hooks=hooks
+    )
+    key = cache.key(request.url, params)
+    if paginator:
+        paginator.init_request(request)
+
+    client_headers = request.headers
+    validators = cache.get(resource_name, key)
+    if validators:
+        request.headers = {**(client_headers or {}), **conditional_headers(validators)}
+
+    first_response: Optional[Response] = None
+    while True:
+        try:
+            response = client._send_request(request)
+        except IgnoreResponseException:
+            break
+
+        if first_response is None:
+            if response.status_code == 304:
+                logger.info(f"skip {resource_name}: not modified since {validators}")
+                cache.count(resource_name, hit=True)
+                return
+            cache.count(resource_name, hit=False)
+            first_response = response
+            # the validators are those of the first page
+            request.headers = client_headers
+
+        if not data_selector:
+            data_selector = client.detect_data_selector(response)
+        data = client.extract_response(response, data_selector)
+
+        if paginator is None:
+            paginator = client.detect_paginator(response, data)
+        paginator.update_state(response, data)
+        paginator.update_request(request)
+
+        yield PageData(
+            data,
+            request=request,
+            response=response,
+            paginator=paginator,
+            auth=request.auth,
+        )
+
+        if not paginator.has_next_page:
+            break
+
+    if first_response is not None:
+        cache.put(resource_name, key, first_response)
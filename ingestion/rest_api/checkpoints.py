@@ -0,0 +1,144 @@
+"""Resumable pagination.
+
+A checkpointed resource saves, in its dlt resource state, the state of its
+paginator after every page. The checkpoint is written before the page is
+yielded, so it's committed together with the page, in the load package of the
+run: if the resource is cut short (e.g. by `add_limit`), or if the load of the
+package fails, the next run resumes from the page that follows the last page
+that was extracted.
+
+dlt discards the state of a run whose extract fails, together with its pages,
+so the next run resumes from the checkpoint of the last run that was
+extracted. To lose less than a whole window when the extract fails, a
+resource can load at most `max_pages_per_run` pages per run, and leave the
+following pages to the next run (see `pending_checkpoints`).
+
+The checkpoint of a resource is keyed by the path and the params of its
+request (e.g. the `$where` of a partition), so a resource that sends a
+different request starts from the first page. Once the last page has been
+loaded, the checkpoint is marked as completed by the `backfill_id` of the run.
+The following runs of the same backfill (e.g. the runs that load the pages
+left by `max_pages_per_run`) skip the resource. Any other run loads it again
+from the first page, so that the rows published since then are not missed.
+
+Paginators must implement `checkpoint() -> Dict[str, Any]`, that returns the
+state needed to request the next page, and `resume(checkpoint)`, called
+before `init_request`.
+"""
+
+import json
+from copy import deepcopy
+from typing import Any, Dict, Generator, List, Optional
+
+import dlt
+from dlt.common import logger
+from dlt.common.utils import digest128
+from dlt.sources.helpers.rest_client import RESTClient
+from dlt.sources.helpers.rest_client.paginators import BasePaginator
+
+CHECKPOINTS_STATE_KEY = "checkpoints"
+
+
+def is_checkpointable(paginator: Optional[BasePaginator]) -> bool:
+    return callable(getattr(paginator, "checkpoint", None)) and callable(
+        getattr(paginator, "resume", None)
+    )
+
+
+def checkpoint_key(path: str, params: Dict[str, Any]) -> str:
+    request = json.dumps({"path": path, "params": params}, sort_keys=True, default=str)
+    return digest128(request)
+
+
+def paginate_checkpointed(
+    client: RESTClient,
+    resource_name: str,
+    path: str,
+    params: Dict[str, Any],
+    paginator: Optional[BasePaginator],
+    max_pages: Optional[int] = None,
+    backfill_id: Optional[str] = None,
+    **paginate_kwargs: Any,
+) -> Generator[Any, None, None]:
+    """Like `RESTClient.paginate`, but resumes from the checkpoint of
+    `resource_name`, and saves a checkpoint after every page.
+
+    With `max_pages`, stops after that many pages, and leaves the checkpoint
+    pending, so that the next run loads the following pages. A checkpoint
+    completed with the same `backfill_id` is skipped.
+    """
+    paginator = paginator if paginator else deepcopy(client.paginator)
+    if not is_checkpointable(paginator):
+        raise ValueError(
+            f"Resource {resource_name} is checkpointed, but its paginator {paginator} "
+            "does not implement checkpoint() and resume()"
+        )
+
+    key = checkpoint_key(path, params)
+    # parallelized resources run in a thread, so the name must be explicit
+    state = dlt.current.resource_state(resource_name)
+    checkpoints: Dict[str, Any] = state.setdefault(CHECKPOINTS_STATE_KEY, {})
+    # the checkpoints of the previous requests of the resource are obsolete
+    for obsolete_key in [k for k in checkpoints if k != key]:
+        del checkpoints[obsolete_key]
+
+    checkpoint = checkpoints.get(key)
+    if checkpoint and checkpoint["completed"]:
+        if backfill_id is not None and checkpoint.get("backfill_id") == backfill_id:
+            logger.info(f"skip {resource_name}: all its pages have been loaded")
+            return
+        logger.info(f"load {resource_name} again from the first page")
+        checkpoint = None
+    if checkpoint:
+        logger.info(f"resume {resource_name} from {checkpoint['paginator']}")
+        paginator.resume(checkpoint["paginator"])
+
+    pages = client.paginate(
+        path=path, params=params, paginator=paginator, **paginate_kwargs
+    )
+    for page_number, page in enumerate(pages, start=1):
+        # `paginate` has already moved the paginator to the next page
+        checkpoints[key] = {
+            "paginator": paginator.checkpoint(),
+            "completed": not paginator.has_next_page,
+            "backfill_id": backfill_id,
+        }
+        yield page
+        if max_pages and page_number >= max_pages and paginator.has_next_page:
+            logger.info(f"pause {resource_name} after {page_number} pages")
+            return
+
+    # e.g. a response action ignored the last response
+    checkpoints[key] = {
+        "paginator": paginator.checkpoint(),
+        "completed": True,
+        "backfill_id": backfill_id,
+    }
+
+
+def pending_checkpoints(pipeline: dlt.Pipeline) -> List[str]:
+    """Returns the names of the resources that have a checkpoint that is not
+    completed, i.e. resources that have more pages to load."""
+    pending = []
+    for source_state in pipeline.state.get("sources", {}).values():
+        for resource_name, resource_state in source_state.get("resources", {}).items():
+            checkpoints = resource_state.get(CHECKPOINTS_STATE_KEY, {})
+            if any(not c["completed"] for c in checkpoints.values()):
+                pending.append(resource_name)
+    return pending
+
+
+def completed_checkpoints(pipeline: dlt.Pipeline, backfill_id: str) -> List[str]:
+    """Returns the names of the resources whose checkpoints have all been
+    completed by a run of `backfill_id`, i.e. the resources that the following
+    runs of the backfill skip."""
+    completed = []
+    for source_state in pipeline.state.get("sources", {}).values():
+        for resource_name, resource_state in source_state.get("resources", {}).items():
+            checkpoints = resource_state.get(CHECKPOINTS_STATE_KEY, {})
+            if checkpoints and all(
+                c["completed"] and c.get("backfill_id") == backfill_id
+                for c in checkpoints.values()
+            ):
+                completed.append(resource_name)
+    return completed
@@ -4,11 +4,14 @@ from typing import (
     Type,
     Any,
     Dict,
+    Generator,
+    Iterable,
     Tuple,
     List,
     Optional,
     Union,
     Callable,
+    Sequence,
     cast,
     NamedTuple,
 )
@@ -25,7 +28,7 @@ from dlt.common import jsonpath
 from dlt.extract.incremental import Incremental
 from dlt.extract.utils import ensure_table_schema_columns
 
-from dlt.sources.helpers.requests import Response
+from dlt.sources.helpers.requests import Client, Response, Session
 from dlt.sources.helpers.rest_client.paginators import (
     BasePaginator,
     SinglePagePaginator,
@@ -62,7 +65,13 @@ from .typing import (
     ResponseActionDict,
     Endpoint,
     EndpointResource,
+    RateLimitConfig,
+    ResponseCacheConfig,
+    SessionConfig,
 )
+from .cache import DEFAULT_MAX_BYTES, ResponseCache
+from .rate_limit import RateLimitAdapter, RateLimiter
+from .transport import RecordReplayAdapter
 from .utils import exclude_keys
 
 
@@ -84,9 +93,114 @@ AUTH_MAP: Dict[AuthType, Type[AuthConfigBase]] = {
 }
 
 
+DEFAULT_POOL_MAXSIZE = 32
+DEFAULT_ACCEPT_ENCODING = "gzip, deflate"
+LAGGED_CURSORS_STATE_KEY = "lagged_cursors"
+
+
 class IncrementalParam(NamedTuple):
     start: str
     end: Optional[str]
+    # seconds (datetime cursors) or units (numeric cursors) to go back from
+    # the last value, to fetch again the items that arrived late
+    lag: Optional[float] = None
+
+
+class LaggedCursor:
+    """The cursor of an incremental with a `lag`.
+
+    dlt filters out the items before the last value of a bound incremental,
+    so it would drop the items fetched again in the lag. A lagged cursor is not
+    bound by dlt: its last value is kept in the resource state, and its items
+    are not filtered, so the resource should have a primary key to merge them.
+    """
+
+    def __init__(self, resource_name: str, incremental: Incremental[Any]) -> None:
+        self.resource_name = resource_name
+        self.cursor_path = incremental.cursor_path
+        self.initial_value = incremental.initial_value
+        self.end_value = incremental.end_value
+        self.last_value_func = incremental.last_value_func
+
+    @property
+    def _state(self) -> Dict[str, Any]:
+        return _lagged_cursor_state(
+            self.resource_name, self.cursor_path, self.initial_value
+        )
+
+    @property
+    def last_value(self) -> Any:
+        return self._state["last_value"]
+
+    def track(self, pages: Iterable[Any]) -> Generator[Any, None, None]:
+        """Yields `pages`, and moves the last value to the cursor of their items.
+        The last value is saved before a page is yielded, so it's committed
+        together with the page."""
+        for page in pages:
+            self.update(page)
+            yield page
+
+    def update(self, items: List[Any]) -> None:
+        values = [
+            value
+            for item in items
+            for value in jsonpath.find_values(self.cursor_path, item)
+            if value is not None
+        ]
+        if self.last_value is not None:
+            values.append(self.last_value)
+        if values:
+            self._state["last_value"] = self.last_value_func(values)
+
+
+def _lagged_cursor_state(
+    resource_name: str, cursor_path: str, initial_value: Any
+) -> Dict[str, Any]:
+    # parallelized resources run in a thread, so the name must be explicit
+    cursors = dlt.current.resource_state(resource_name).setdefault(
+        LAGGED_CURSORS_STATE_KEY, {}
+    )
+    return cursors.setdefault(cursor_path, {"last_value": initial_value})
+
+
+def advance_lagged_cursor(
+    resource_name: str,
+    cursor_path: str,
+    value: Any,
+    last_value_func: Callable[[Sequence[Any]], Any] = max,
+) -> Any:
+    """Moves the lagged cursor `cursor_path` of `resource_name` to `value`,
+    unless it's already past it, and returns the last value it had.
+
+    Lets another resource of the same source (e.g. a backfill) hand over the
+    items it has loaded: the next run of `resource_name` starts from `value`,
+    minus its lag. The cursor is saved in the state of `resource_name`, so it's
+    committed together with the items of the resource that moves it.
+    """
+    state = _lagged_cursor_state(resource_name, cursor_path, None)
+    last_value = state["last_value"]
+    if last_value is None:
+        state["last_value"] = value
+    else:
+        state["last_value"] = last_value_func([last_value, value])
+    return last_value
+
+
+class EndpointResourceSetup(NamedTuple):
+    """The parts of an endpoint resource that are set up in the same way by
+    the sync and the async engine"""
+
+    endpoint_config: Endpoint
+    request_params: Dict[str, Any]
+    paginator: Optional[BasePaginator]
+    include_from_parent: List[str]
+    incremental_object: Optional[Incremental[Any]]
+    incremental_param: Optional[IncrementalParam]
+    incremental_cursor_transform: Optional[Callable[..., Any]]
+    # replaces `incremental_object` when the incremental has a `lag`
+    lagged_cursor: Optional[LaggedCursor]
+    hooks: Optional[Dict[str, Any]]
+    resource_kwargs: Dict[str, Any]
 
 
 def register_paginator(
@@ -173,6 +287,74 @@ def create_auth(auth_config: Optional[AuthConfig]) -> Optional[AuthConfigBase]:
     return None
 
 
+def create_session(session_config: Optional[SessionConfig] = None) -> Session:
+    """Creates an HTTP session to share between all resources of a client.
+
+    All requests sent through the session reuse the same pool of keep-alive
+    connections, so the TLS handshake with a host happens once per connection
+    in the pool, and not once per resource. The session retries failed
+    requests like the default session of `RESTClient`.
+
+    With a `transport`, the responses are recorded to, or replayed from, a
+    directory of cassettes. With a `rate_limit`, the requests to each host are
+    paced, and paused when the host throttles them. Replayed requests never
+    reach a host, so they are not paced.
+    """
+    session_config = session_config or {}
+    client = Client(
+        raise_for_status=False,
+        max_connections=session_config.get("pool_maxsize") or DEFAULT_POOL_MAXSIZE,
+    )
+    # `Client.session` is thread local, but the session is safe to share between
+    # threads, e.g. parallelized resources.
+    session = client.session
+    session.headers["Accept-Encoding"] = (
+        session_config.get("accept_encoding") or DEFAULT_ACCEPT_ENCODING
+    )
+    transport_config = session_config.get("transport")
+    if transport_config:
+        adapter = RecordReplayAdapter(
+            transport_config["cassette_dir"],
+            mode=transport_config.get("mode") or "replay",
+            pool_maxsize=session_config.get("pool_maxsize") or DEFAULT_POOL_MAXSIZE,
+        )
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+    limiter = create_rate_limiter(session_config.get("rate_limit"))
+    replay = transport_config and (transport_config.get("mode") or "replay") == "replay"
+    if limiter and not replay:
+        for prefix in ("http://", "https://"):
+            session.mount(
+                prefix, RateLimitAdapter(limiter, session.get_adapter(prefix))
+            )
+    return session
+
+
+def create_rate_limiter(
+    rate_limit_config: Optional[RateLimitConfig] = None,
+) -> Optional[RateLimiter]:
+    """Creates the rate limiter shared by all resources of a client, if the
+    session has a `rate_limit`."""
+    if not rate_limit_config:
+        return None
+    return RateLimiter(
+        rate_limit_config["requests_per_second"],
+        burst=rate_limit_config.get("burst"),
+    )
+
+
+def create_response_cache(
+    response_cache_config: Optional[ResponseCacheConfig] = None,
+) -> Optional[ResponseCache]:
+    """Creates the cache shared by all cached resources of a client, if the
+    client has a `response_cache`."""
+    if response_cache_config is None:
+        return None
+    return ResponseCache(
+        max_bytes=response_cache_config.get("max_bytes") or DEFAULT_MAX_BYTES
+    )
+
+
 def setup_incremental_object(
     request_params: Dict[str, Any],
     incremental_config: Optional[IncrementalConfig] = None,
@@ -206,23 +388,27 @@ def setup_incremental_object(
                 )
             convert = parse_convert_or_deprecated_transform(param_config)
 
-            config = exclude_keys(param_config, {"type", "convert", "transform"})
+            config = exclude_keys(param_config, {"type", "convert", "transform", "lag"})
             # TODO: implement param type to bind incremental to
             return (
                 dlt.sources.incremental(**config),
-                IncrementalParam(start=param_name, end=None),
+                IncrementalParam(
+                    start=param_name, end=None, lag=param_config.get("lag")
+                ),
                 convert,
             )
     if incremental_config:
         convert = parse_convert_or_deprecated_transform(incremental_config)
         config = exclude_keys(
-            incremental_config, {"start_param", "end_param", "convert", "transform"}
+            incremental_config,
+            {"start_param", "end_param", "convert", "transform", "lag"},
         )
         return (
             dlt.sources.incremental(**config),
             IncrementalParam(
                 start=incremental_config["start_param"],
                 end=incremental_config.get("end_param"),
+                lag=incremental_config.get("lag"),
             ),
             convert,
         )
@@ -0,0 +1,219 @@
+"""Timing and throughput of the resources of a run.
+
+Every resource of `rest_api_resources` records, in `run_metrics`:
+
+- `requests`: the responses it received, retried attempts included;
+- `retries`: the responses that were retried (status 429 or 5xx);
+- `latencies`: the time from sending each request to parsing the headers of
+  its response (`response.elapsed`);
+- `pages`, `rows` and `bytes`: the pages it yielded, their items, and their
+  decoded bodies (streamed pages are not counted in `bytes`);
+- `seconds`: the time spent producing its pages, i.e. HTTP, download, JSON
+  decoding and pagination. `seconds` minus the sum of `latencies` is roughly
+  the time spent downloading and decoding bodies.
+
+`RunMetrics.record_trace` adds the wall time of the extract, normalize and
+load steps of a run, taken from the trace of the pipeline. The metrics can be
+exported as JSON, or in the OpenMetrics text format.
+"""
+
+import threading
+import time
+from typing import Any, Dict, Generator, Iterable, List, Optional
+
+from dlt.common.json import json
+from dlt.sources.helpers.requests import Response
+
+# https://github.com/dlt-hub/dlt/blob/devel/dlt/sources/helpers/requests/retry.py
+RETRY_STATUS_CODES = {429} | set(range(500, 600))
+QUANTILES = [0.5, 0.9, 0.99]
+
+
+def quantile(values: List[float], q: float) -> Optional[float]:
+    """The nearest-rank `q` quantile of `values`."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class ResourceMetrics:
+    def __init__(self) -> None:
+        self.requests = 0
+        self.retries = 0
+        self.latencies: List[float] = []
+        self.pages = 0
+        self.rows = 0
+        self.bytes = 0
+        self.seconds = 0.0
+
+    def asdict(self) -> Dict[str, Any]:
+        return {
+            "requests": self.requests,
+            "retries": self.retries,
+            "latency_seconds": {str(q): quantile(self.latencies, q) for q in QUANTILES},
+            "latency_seconds_sum": sum(self.latencies),
+            "pages": self.pages,
+            "rows": self.rows,
+            "bytes": self.bytes,
+            "seconds": self.seconds,
+            "rows_per_second": self.rows / self.seconds if self.seconds else None,
+            "bytes_per_second": self.bytes / self.seconds if self.seconds else None,
+        }
+
+
+class RunMetrics:
+    """Metrics of the resources and steps of one run. Safe to update from the
+    threads of parallelized resources."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self.resources: Dict[str, ResourceMetrics] = {}
+            self.steps: Dict[str, float] = {}
+
+    def resource(self, resource_name: str) -> ResourceMetrics:
+        with self._lock:
+            return self.resources.setdefault(resource_name, ResourceMetrics())
+
+    def record_response(self, resource_name: str, response: Response) -> None:
+        metrics = self.resource(resource_name)
+        with self._lock:
+            metrics.requests += 1
+            if response.status_code in RETRY_STATUS_CODES:
+                metrics.retries += 1
+            metrics.latencies.append(response.elapsed.total_seconds())
+
+    def record_page(self, resource_name: str, page: Any, seconds: float) -> None:
+        metrics = self.resource(resource_name)
+        response: Optional[Response] = getattr(page, "response", None)
+        with self._lock:
+            metrics.pages += 1
+            metrics.rows += len(page)
+            metrics.seconds += seconds
+            # the body of a page from `RESTClient.paginate` has been read already
+            if response is not None and response._content_consumed:
+                metrics.bytes += len(response.content)
+
+    def record_trace(self, trace: Any) -> None:
+        """Adds the wall time of the steps of the last run of a pipeline
+        (`pipeline.last_trace`)."""
+        with self._lock:
+            for step in trace.steps:
+                if step.step in ("extract", "normalize", "load") and step.finished_at:
+                    seconds = (step.finished_at - step.started_at).total_seconds()
+                    self.steps[step.step] = self.steps.get(step.step, 0.0) + seconds
+
+    def asdict(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "steps": dict(self.steps),
+                "resources": {
+                    name: metrics.asdict()
+                    for name, metrics in sorted(self.resources.items())
+                },
+            }
+
+    def to_json(self) -> str:
+        return json.dumps(self.asdict(), pretty=True)
+
+    def to_openmetrics(self) -> str:
+        """The metrics in the OpenMetrics text format.
+
+        https://github.com/OpenObservability/OpenMetrics/blob/main/specification/OpenMetrics.md
+        """
+        d = self.asdict()
+        lines = [
+            "# TYPE pipeline_step_seconds gauge",
+            "# UNIT pipeline_step_seconds seconds",
+            "# HELP pipeline_step_seconds Wall time of a step of the pipeline.",
+        ]
+        for step, seconds in d["steps"].items():
+            lines.append(f'pipeline_step_seconds{{step="{step}"}} {seconds}')
+
+        counters = {
+            "requests": "Responses received, retries included.",
+            "retries": "Responses with a status code that is retried.",
+            "pages": "Pages yielded.",
+            "rows": "Items yielded.",
+            "bytes": "Decoded bytes of the bodies of the pages yielded.",
+        }
+        for counter, help in counters.items():
+            name = f"rest_api_{counter}"
+            lines.append(f"# TYPE {name} counter")
+            lines.append(f"# HELP {name} {help}")
+            for resource, metrics in d["resources"].items():
+                lines.append(
+                    f'{name}_total{{resource="{resource}"}} {metrics[counter]}'
+                )
+
+        name = "rest_api_request_latency_seconds"
+        lines.append(f"# TYPE {name} summary")
+        lines.append(f"# UNIT {name} seconds")
+        lines.append(f"# HELP {name} Time to receive the headers of a response.")
+        for resource, metrics in d["resources"].items():
+            for q, value in metrics["latency_seconds"].items():
+                if value is not None:
+                    lines.append(
+                        f'{name}{{resource="{resource}",quantile="{q}"}} {value}'
+                    )
+            lines.append(
+                f'{name}_sum{{resource="{resource}"}} {metrics["latency_seconds_sum"]}'
+            )
+            lines.append(f'{name}_count{{resource="{resource}"}} {metrics["requests"]}')
+
+        name = "rest_api_page_seconds"
+        lines.append(f"# TYPE {name} counter")
+        lines.append(f"# UNIT {name} seconds")
+        lines.append(f"# HELP {name} Time spent producing pages.")
+        for resource, metrics in d["resources"].items():
+            lines.append(f'{name}_total{{resource="{resource}"}} {metrics["seconds"]}')
+
+        lines.append("# EOF")
+        return "\n".join(lines) + "\n"
+
+
+run_metrics = RunMetrics()
+
+
+def instrument_hooks(
+    resource_name: str, hooks: Optional[Dict[str, Any]]
+) -> Dict[str, Any]:
+    """Returns a copy of `hooks` that also records every response of
+    `resource_name`, retried attempts included."""
+
+    def record_response(response: Response, *args: Any, **kwargs: Any) -> None:
+        run_metrics.record_response(resource_name, response)
+
+    def raise_for_status(response: Response, *args: Any, **kwargs: Any) -> None:
+        response.raise_for_status()
+
+    hooks = dict(hooks or {})
+    # without response hooks, `RESTClient` raises on error status codes
+    response_hooks = list(hooks.get("response") or [raise_for_status])
+    hooks["response"] = [record_response] + response_hooks
+    return hooks
+
+
+def instrument_pages(
+    resource_name: str, pages: Iterable[Any]
+) -> Generator[Any, None, None]:
+    """Yields `pages`, and records the time spent producing each one."""
+    iterator = iter(pages)
+    try:
+        while True:
+            t0 = time.perf_counter()
+            try:
+                page = next(iterator)
+            except StopIteration:
+                return
+            run_metrics.record_page(resource_name, page, time.perf_counter() - t0)
+            yield page
+    finally:
+        # e.g. `add_limit` stopped the resource: let `pages` clean up now
+        close = getattr(iterator, "close", None)
+        if close:
+            close()
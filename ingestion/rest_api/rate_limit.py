@@ -0,0 +1,211 @@
+"""Pace the requests sent to a host, and back off when it throttles.
+
+A `TokenBucket` holds `burst` tokens, refilled at `requests_per_second`. Every
+request takes a token, and waits for one when the bucket is empty, so a host
+never receives a burst of more than `burst` requests, nor more than
+`requests_per_second` on average, whatever the number of resources (or
+threads) that send them. The bucket is implemented as a schedule of send
+times (the generic cell rate algorithm), so that each request knows when to
+send as soon as it takes its token, and the requests are sent in order.
+
+When the host replies `429 Too Many Requests`, the bucket:
+
+- pauses all requests until the time in the `Retry-After` header of the
+  response (or for an exponential backoff, if there is none), plus a random
+  jitter, so that the requests that were waiting don't all wake up at once;
+- halves its rate, and then grows it back by a small step after every
+  request that is not throttled, up to `requests_per_second` (additive
+  increase, multiplicative decrease), so that the rate settles just below the
+  limit of the host, instead of hitting it again and again.
+
+The bucket of a host is shared by all the resources of a client (see
+`rate_limit` in the session config): `RateLimitAdapter` paces the requests of
+the `requests` session, and `AsyncTransport` those of the async engine. The
+429 response itself is still retried by the retry logic of the session.
+"""
+
+import asyncio
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Any, Dict, Optional
+from urllib.parse import urlparse
+
+from dlt.common import logger
+from requests import PreparedRequest, Response
+from requests.adapters import BaseAdapter, HTTPAdapter
+
+THROTTLED_STATUS_CODE = 429
+# the backoff after a 429 without `Retry-After`: 1s, 2s, 4s... up to 60s
+MIN_BACKOFF_SECONDS = 1.0
+MAX_BACKOFF_SECONDS = 60.0
+# the pause after a 429 is stretched by a random factor between 1 and 1 + JITTER
+JITTER = 0.25
+# after a 429, the rate never drops below this fraction of `requests_per_second`
+MIN_RATE_FRACTION = 1 / 16
+# every request that is not throttled grows the rate by this fraction of
+# `requests_per_second`, i.e. the rate recovers from a halving in ~25 requests
+RATE_INCREASE_FRACTION = 1 / 50
+
+
+def retry_after_seconds(response: Any) -> Optional[float]:
+    """The delay in the `Retry-After` header of `response`, either in seconds
+    or as an HTTP date, if any."""
+    value = response.headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class TokenBucket:
+    """The rate limit of a host. Safe to share between threads, and between
+    the tasks of an event loop: `reserve` never blocks, it returns how long
+    the caller has to wait."""
+
+    def __init__(
+        self, name: str, requests_per_second: float, burst: Optional[int] = None
+    ) -> None:
+        if requests_per_second <= 0:
+            raise ValueError(
+                f"requests_per_second must be positive. Found: {requests_per_second}"
+            )
+        self.name = name
+        self.max_rate = requests_per_second
+        self.rate = requests_per_second
+        self.burst = max(1, burst or 1)
+        self.throttled = 0
+        self.pauses = 0
+        self.waited = 0.0
+        self._consecutive_throttled = 0
+        # the time when the bucket is full again: each request moves it one
+        # interval (1 / rate) into the future
+        self._full_at = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def __repr__(self) -> str:
+        return f"TokenBucket({self.name!r}, rate={self.rate:.2f}/s, burst={self.burst})"
+
+    def reserve(self) -> float:
+        """Takes a token, and returns the seconds to wait before sending the
+        request. Tokens are taken in order, so the waits of many callers are
+        spread at the pace of the rate."""
+        with self._lock:
+            now = time.monotonic()
+            interval = 1 / self.rate
+            full_at = max(self._full_at, now)
+            # a full bucket has `burst` tokens, i.e. it lets `burst` requests
+            # through before the next one has to wait for `full_at`
+            send_at = max(now, full_at - (self.burst - 1) * interval)
+            send_at = max(send_at, self._paused_until)
+            self._full_at = max(full_at, send_at) + interval
+            wait = send_at - now
+            self.waited += wait
+            return wait
+
+    def wait(self) -> None:
+        """Blocks until the request can be sent."""
+        while True:
+            pauses = self.pauses
+            delay = self.reserve()
+            if delay > 0:
+                time.sleep(delay)
+            # the tokens taken before a pause are void: take a new one, so the
+            # waiting requests are spread after the pause, and not sent at once
+            if self.pauses == pauses:
+                return
+
+    async def wait_async(self) -> None:
+        """Like `wait`, without blocking the event loop."""
+        while True:
+            pauses = self.pauses
+            delay = self.reserve()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            if self.pauses == pauses:
+                return
+
+    def record(self, response: Any) -> None:
+        """Adapts the rate to the status code of `response`."""
+        with self._lock:
+            if response.status_code != THROTTLED_STATUS_CODE:
+                self._consecutive_throttled = 0
+                self.rate = min(
+                    self.max_rate, self.rate + self.max_rate * RATE_INCREASE_FRACTION
+                )
+                return
+
+            self.throttled += 1
+            now = time.monotonic()
+            if self._paused_until > now:
+                # a request that was sent before the bucket paused: the rate
+                # has already been lowered for the same burst of requests
+                return
+            self._consecutive_throttled += 1
+            pause = retry_after_seconds(response)
+            if pause is None:
+                pause = min(
+                    MAX_BACKOFF_SECONDS,
+                    MIN_BACKOFF_SECONDS * 2 ** (self._consecutive_throttled - 1),
+                )
+            pause *= 1 + random.uniform(0, JITTER)
+            self.rate = max(self.max_rate * MIN_RATE_FRACTION, self.rate / 2)
+            self._paused_until = now + pause
+            # the requests after the pause start from an empty bucket, and the
+            # send times taken before it are void (see `wait`)
+            self._full_at = self._paused_until + self.burst / self.rate
+            self.pauses += 1
+            logger.warning(
+                f"{self.name} throttled the request to {response.url}: pause for "
+                f"{pause:.1f}s, then send at most {self.rate:.2f} requests/s"
+            )
+
+
+class RateLimiter:
+    """The token buckets of the hosts of a client, created on first use."""
+
+    def __init__(self, requests_per_second: float, burst: Optional[int] = None):
+        self.requests_per_second = requests_per_second
+        self.burst = burst
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._lock = threading.Lock()
+
+    def bucket(self, url: str) -> TokenBucket:
+        host = urlparse(url).netloc
+        with self._lock:
+            if host not in self._buckets:
+                self._buckets[host] = TokenBucket(
+                    host, self.requests_per_second, self.burst
+                )
+            return self._buckets[host]
+
+
+class RateLimitAdapter(BaseAdapter):
+    """Sends the requests of a session through `adapter`, at the pace of the
+    bucket of their host."""
+
+    def __init__(self, limiter: RateLimiter, adapter: HTTPAdapter) -> None:
+        super().__init__()
+        self.limiter = limiter
+        self.adapter = adapter
+
+    def __repr__(self) -> str:
+        return f"RateLimitAdapter({self.adapter!r})"
+
+    def send(self, request: PreparedRequest, **kwargs: Any) -> Response:  # type: ignore[override]
+        bucket = self.limiter.bucket(request.url)
+        bucket.wait()
+        response = self.adapter.send(request, **kwargs)
+        bucket.record(response)
+        return response
+
+    def close(self) -> None:
+        self.adapter.close()
@@ -0,0 +1,139 @@
+import copy
+from typing import Any, Dict, Generator, Iterator, List, Optional, Sequence
+
+from dlt.common import jsonpath
+from dlt.common.exceptions import MissingDependencyException
+from dlt.sources.helpers.requests import Response
+from dlt.sources.helpers.rest_client import RESTClient
+from dlt.sources.helpers.rest_client.exceptions import IgnoreResponseException
+from dlt.sources.helpers.rest_client.paginators import BasePaginator
+from dlt.sources.helpers.rest_client.typing import HTTPMethodBasic
+
+DEFAULT_STREAM_BATCH_SIZE = 1000
+
+
+class StreamedPage(Sequence[Any]):
+    """Stands in for a decoded page when a paginator updates its state after
+    the page has been streamed.
+
+    The records of a streamed page are yielded as soon as they are parsed, so
+    they are not kept in memory. The paginator can still ask for the number of
+    records in the page, and for the last record (e.g. to seek past it).
+    """
+
+    def __init__(self, count: int, last_item: Optional[Any]) -> None:
+        self.count = count
+        self.last_item = last_item
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __getitem__(self, index: Any) -> Any:
+        if self.count and index in (-1, self.count - 1):
+            return self.last_item
+        raise IndexError(f"Only the last item of a streamed page is kept, not {index}")
+
+    def __repr__(self) -> str:
+        return f"StreamedPage(count={self.count})"
+
+
+def ijson_prefix(data_selector: Optional[jsonpath.TJsonPath]) -> str:
+    """Converts a simple JSONPath data selector (e.g. `$`, `data`,
+    `$.results.items`) to the prefix of the array items in ijson."""
+    if not data_selector or data_selector == "$":
+        return "item"
+    if not isinstance(data_selector, str):
+        raise ValueError(
+            f"Streaming supports only string data selectors. Found: {data_selector}"
+        )
+    path = data_selector[2:] if data_selector.startswith("$.") else data_selector
+    if any(c in path for c in "[]*?@$"):
+        raise ValueError(
+            f"Streaming supports only dotted data selectors. Found: {data_selector}"
+        )
+    return f"{path}.item"
+
+
+def iter_items(response: Response, prefix: str) -> Iterator[Any]:
+    """Parses the items of the array at `prefix` while the body of `response`
+    is being downloaded."""
+    try:
+        import ijson
+    except ModuleNotFoundError:
+        raise MissingDependencyException("rest_api streaming", ["ijson"])
+
+    # let urllib3 decompress gzip/deflate bodies
+    response.raw.decode_content = True
+    # use_float=True, otherwise ijson returns numbers as Decimal
+    yield from ijson.items(response.raw, prefix, use_float=True)
+
+
+def paginate_streaming(
+    client: RESTClient,
+    method: HTTPMethodBasic,
+    path: str,
+    params: Optional[Dict[str, Any]] = None,
+    json: Optional[Dict[str, Any]] = None,
+    paginator: Optional[BasePaginator] = None,
+    data_selector: Optional[jsonpath.TJsonPath] = None,
+    hooks: Optional[Dict[str, Any]] = None,
+    batch_size: int = DEFAULT_STREAM_BATCH_SIZE,
+) -> Generator[List[Any], None, None]:
+    """Like `RESTClient.paginate`, but yields batches of at most `batch_size`
+    records while the body of each page is being downloaded.
+
+    A page is never fully held in memory, neither as bytes nor as Python
+    objects, so peak memory does not depend on the page size (e.g. `$limit`),
+    and dlt can start processing the records of a page before it has been
+    fully downloaded.
+
+    The paginator can't be detected from a streamed response, so it has to be
+    set on the endpoint or on the client. Response hooks receive a response
+    whose body has not been read yet: a response action that matches on
+    `content` reads the whole body, and disables streaming for that page.
+    """
+    paginator = paginator if paginator else copy.deepcopy(client.paginator)
+    if paginator is None:
+        raise ValueError(
+            f"Streaming {path} requires a paginator on the endpoint or on the client"
+        )
+    hooks = hooks or {}
+
+    def raise_for_status(response: Response, *args: Any, **kwargs: Any) -> None:
+        response.raise_for_status()
+
+    if "response" not in hooks:
+        hooks["response"] = [raise_for_status]
+
+    prefix = ijson_prefix(data_selector)
+    # RESTClient has no public method to send a single streamed request
+    request = client._create_request(
+        path=path, method=method, params=params, json=json, hooks=hooks
+    )
+    paginator.init_request(request)
+
+    while True:
+        try:
+            response = client._send_request(request, stream=True)
+        except IgnoreResponseException:
+            break
+
+        count = 0
+        last_item = None
+        batch: List[Any] = []
+        with response:
+            for item in iter_items(response, prefix):
+                batch.append(item)
+                count += 1
+                last_item = item
+                if len(batch) >= batch_size:
+                    yield batch
+                    batch = []
+        if batch:
+            yield batch
+
+        paginator.update_state(response, StreamedPage(count, last_item))
+        paginator.update_request(request)
+
+        if not paginator.has_next_page:
+            break
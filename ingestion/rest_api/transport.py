@@ -0,0 +1,120 @@
+"""Record and replay HTTP responses.
+
+`RecordReplayAdapter` is a transport adapter for the session of a client (see
+`transport` in the session config). In `record` mode, it sends every request
+to the server, and saves the response in a cassette, i.e. a JSON file in
+`cassette_dir` named after the method, URL and body of the request. In
+`replay` mode, it never touches the network: it returns the recorded response
+of each request, and raises `RecordingNotFound` for a request that was never
+recorded.
+
+A replay is exact only if the run sends the same requests that were recorded,
+so anything that makes requests depend on time must be fixed, e.g. the window
+of an incremental load, or a page size that adapts to latency.
+"""
+
+import base64
+import json
+import os
+import threading
+from io import BytesIO
+from typing import Any, Dict, Literal
+
+from dlt.common import logger
+from dlt.common.utils import digest128
+from requests import PreparedRequest, Response
+from requests.adapters import HTTPAdapter
+from urllib3 import HTTPResponse
+
+CassetteMode = Literal["record", "replay"]
+CASSETTE_MODES = ["record", "replay"]
+
+# the recorded body is already decoded, and its length may differ
+SKIPPED_HEADERS = {"content-encoding", "content-length", "transfer-encoding"}
+
+
+class RecordingNotFound(LookupError):
+    pass
+
+
+def cassette_name(request: PreparedRequest) -> str:
+    body = (
+        request.body.decode("utf-8")
+        if isinstance(request.body, bytes)
+        else request.body
+    )
+    key = json.dumps([request.method, request.url, body])
+    # digest128 returns base64, which may contain a slash
+    return digest128(key).replace("/", "_") + ".json"
+
+
+class RecordReplayAdapter(HTTPAdapter):
+    """Records responses to `cassette_dir`, or replays them from it."""
+
+    def __init__(
+        self, cassette_dir: str, mode: CassetteMode = "replay", **kwargs: Any
+    ) -> None:
+        if mode not in CASSETTE_MODES:
+            raise ValueError(f"mode must be one of {CASSETTE_MODES}. Found: {mode}")
+        super().__init__(**kwargs)
+        self.cassette_dir = cassette_dir
+        self.mode = mode
+        self.recorded = 0
+        self.replayed = 0
+        self._lock = threading.Lock()
+        if mode == "record":
+            os.makedirs(cassette_dir, exist_ok=True)
+
+    def __repr__(self) -> str:
+        return f"RecordReplayAdapter(cassette_dir={self.cassette_dir!r}, mode={self.mode!r})"
+
+    def send(self, request: PreparedRequest, **kwargs: Any) -> Response:  # type: ignore[override]
+        path = os.path.join(self.cassette_dir, cassette_name(request))
+        if self.mode == "replay":
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    cassette: Dict[str, Any] = json.load(f)
+            except FileNotFoundError:
+                raise RecordingNotFound(
+                    f"No recording of {request.method} {request.url} in {self.cassette_dir}"
+                )
+            with self._lock:
+                self.replayed += 1
+            return self._build_recorded_response(request, cassette)
+
+        # read the whole body, then serve it from memory, streamed or not
+        kwargs["stream"] = False
+        response = super().send(request, **kwargs)
+        cassette = {
+            "url": request.url,
+            "status": response.status_code,
+            "reason": response.reason,
+            "headers": {
+                name: value
+                for name, value in response.headers.items()
+                if name.lower() not in SKIPPED_HEADERS
+            },
+            "body": base64.b64encode(response.content).decode("ascii"),
+        }
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(cassette, f)
+        os.replace(tmp_path, path)
+        with self._lock:
+            self.recorded += 1
+        logger.info(f"recorded {request.method} {request.url} in {path}")
+        return self._build_recorded_response(request, cassette)
+
+    def _build_recorded_response(
+        self, request: PreparedRequest, cassette: Dict[str, Any]
+    ) -> Response:
+        body = base64.b64decode(cassette["body"])
+        raw = HTTPResponse(
+            body=BytesIO(body),
+            headers={**cassette["headers"], "Content-Length": str(len(body))},
+            status=cassette["status"],
+            reason=cassette["reason"],
+            preload_content=False,
+            decode_content=False,
+        )
+        return self.build_response(request, raw)
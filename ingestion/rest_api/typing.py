@@ -170,11 +170,50 @@ AuthConfig = Union[
 ]
 
 
+class TransportConfig(TypedDict, total=False):
+    """Records the responses of the session in `cassette_dir`, or replays them
+    from it without network (see `transport.py`)"""
+
+    cassette_dir: str
+    mode: Optional[Literal["record", "replay"]]
+
+
+class RateLimitConfig(TypedDict, total=False):
+    """Paces the requests of the session to each host, and backs off when a
+    host replies 429 Too Many Requests (see `rate_limit.py`)"""
+
+    requests_per_second: float
+    # requests that can be sent at once, after the host has been idle
+    burst: Optional[int]
+
+
+class SessionConfig(TypedDict, total=False):
+    """Configures the HTTP session shared by all resources of a client"""
+
+    # maximum number of connections kept alive per host. It should be at least
+    # the number of requests sent at the same time (e.g. parallelized resources)
+    pool_maxsize: Optional[int]
+    accept_encoding: Optional[str]
+    # maximum number of requests in flight to the same host (async engine only)
+    max_requests_per_host: Optional[int]
+    transport: Optional[TransportConfig]
+    rate_limit: Optional[RateLimitConfig]
+
+
+class ResponseCacheConfig(TypedDict, total=False):
+    """Configures the cache of the validators of the responses of the
+    resources that set `cache` on their endpoint (see `cache.py`)"""
+
+    max_bytes: Optional[int]
+
+
 class ClientConfig(TypedDict, total=False):
     base_url: str
     headers: Optional[Dict[str, str]]
     auth: Optional[AuthConfig]
     paginator: Optional[PaginatorConfig]
+    session: Optional[SessionConfig]
+    response_cache: Optional[ResponseCacheConfig]
 
 
 class IncrementalArgs(TypedDict, total=False):
@@ -185,6 +224,9 @@ class IncrementalArgs(TypedDict, total=False):
     end_value: Optional[str]
     row_order: Optional[TSortOrder]
     convert: Optional[Callable[..., Any]]
+    # go back from the last value by this many seconds (datetime cursors) or
+    # units (numeric cursors), and fetch again the items that arrived late
+    lag: Optional[Union[int, float]]
 
 
 class IncrementalConfig(IncrementalArgs, total=False):
@@ -238,6 +280,24 @@ class Endpoint(TypedDict, total=False):
     data_selector: Optional[jsonpath.TJsonPath]
     response_actions: Optional[List[ResponseAction]]
     incremental: Optional[IncrementalConfig]
+    # parse pages incrementally and yield batches of records while they are
+    # downloaded (requires `ijson`, not supported by dependent resources)
+    stream: Optional[bool]
+    stream_batch_size: Optional[int]
+    # save the state of the paginator in the resource state after every page,
+    # and resume from it on the next run (see `checkpoints.py`)
+    checkpoint: Optional[bool]
+    # stop a checkpointed resource after this many pages. The next run resumes
+    # from its checkpoint
+    max_pages_per_run: Optional[int]
+    # the runs with the same backfill_id skip the checkpoints they completed
+    backfill_id: Optional[str]
+    # send conditional requests, and skip the resource if it was not modified
+    # since the last run (requires `response_cache` on the client)
+    cache: Optional[bool]
+    # converts each page (or streamed batch) before it's yielded, e.g. to an
+    # Arrow table
+    page_transform: Optional[Callable[[List[Any]], Any]]
 
 
 class ResourceBase(TypedDict, total=False):
@@ -259,6 +319,11 @@ class ResourceBase(TypedDict, total=False):
 class EndpointResourceBase(ResourceBase, total=False):
     endpoint: Optional[Union[str, Endpoint]]
     include_from_parent: Optional[List[str]]
+    # number of children of a dependent resource that are fetched at the same
+    # time (1 fetches them one after another)
+    max_concurrency: Optional[int]
+    # yield the children in the order of their parents (True by default)
+    preserve_order: Optional[bool]
 
 
 class EndpointResource(EndpointResourceBase, total=False):
@@ -0,0 +1,79 @@
+import os
+import sys
+
+import dlt
+from dlt.common.configuration.exceptions import ConfigFieldMissingException
+from dlt.common.pipeline import LoadInfo
+from dlt.pipeline.exceptions import PipelineStepFailed
+from run_pipelines import ingestion_pipeline, run_steps
+from socrata.bulk import nyc_open_data_backfill_source
+
+# Add the parent directory to the system path so that I can import Python code from sibling directories.
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from common import (
+    APP_NAME,
+    BULK_ROOT,
+    get_ingestion_config,
+    get_telegram_config,
+    get_telegram_credentials,
+)
+from telegram import (
+    config_field_missing_exception_text,
+    load_info_text,
+    pipeline_step_failed_text,
+    safe_send_telegram_text,
+)
+
+# The backfill loads the whole history of the 311 Service Requests dataset from
+# its CSV export, in the same pipeline as `run_pipelines.py` (the one of the
+# same `landing_zone`): the rows land in the same table, and the incremental
+# resource of `nyc_open_data_source` picks up where the backfill stopped (see
+# `ingestion/socrata/bulk.py`).
+
+
+def run() -> None:
+    telegram_config = get_telegram_config()
+    telegram_credentials = get_telegram_credentials()
+    parse_mode = telegram_config["parse_mode"]
+    bot_token = telegram_credentials["bot_token"]
+    chat_id = telegram_credentials["chat_id"]
+
+    ingestion_config = get_ingestion_config()
+    pipeline = ingestion_pipeline(ingestion_config["landing_zone"])
+
+    try:
+        source = nyc_open_data_backfill_source(
+            csv_dir=os.path.join(BULK_ROOT, "service_requests_311"),
+            # the same application token as `nyc_open_data_source`
+            socrata_application_token=dlt.secrets[
+                "sources.socrata.socrata_application_token"
+            ],
+        )
+        load_info: LoadInfo = run_steps(pipeline, source, ingestion_config)
+    except PipelineStepFailed as ex:
+        safe_send_telegram_text(
+            bot_token=bot_token,
+            chat_id=chat_id,
+            parse_mode=parse_mode,
+            text=pipeline_step_failed_text(exception=ex, app_name=APP_NAME),
+        )
+        raise
+    except ConfigFieldMissingException as ex:
+        safe_send_telegram_text(
+            bot_token=bot_token,
+            chat_id=chat_id,
+            parse_mode=parse_mode,
+            text=config_field_missing_exception_text(exception=ex, app_name=APP_NAME),
+        )
+        raise
+
+    safe_send_telegram_text(
+        bot_token=bot_token,
+        chat_id=chat_id,
+        parse_mode=parse_mode,
+        text=load_info_text(load_info=load_info, app_name=APP_NAME),
+    )
+
+
+if __name__ == "__main__":
+    run()
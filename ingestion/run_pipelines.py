@@ -1,11 +1,18 @@
 import os
 import sys
+from typing import Any, Dict, List
 
 import dlt
 from dlt.common.configuration.exceptions import ConfigFieldMissingException
 from dlt.common.configuration.inject import with_config
 from dlt.common.pipeline import LoadInfo
+from dlt.common.utils import uniq_id
 from dlt.pipeline.exceptions import PipelineStepFailed
+from duckdb_merge import duckdb_merge
+from lake import filesystem_lake
+from loguru import logger
+from rest_api.checkpoints import pending_checkpoints
+from rest_api.instrumentation import run_metrics
 from socrata import nyc_open_data_source
 
 # Add the parent directory to the system path so that I can import Python code from sibling directories.
@@ -13,13 +20,17 @@ sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 from common import (
     APP_NAME,
     DB_FILE_PATH,
+    LAKE_ROOT,
+    METRICS_ROOT,
     SCHEMAS_ROOT,
+    get_ingestion_config,
     get_telegram_config,
     get_telegram_credentials,
 )
 from telegram import (
     config_field_missing_exception_text,
-    load_info_text,
+    ingestion_metrics_text,
+    load_infos_text,
     pipeline_step_failed_text,
     runtime_configuration_text,
     safe_send_telegram_text,
@@ -53,6 +64,48 @@ duckdb_schema = "landing_zone"
 pipeline_name = "nyc_open_data_ingestion"
 
 
+def ingestion_pipeline(landing_zone: str) -> dlt.Pipeline:
+    """The pipeline that lands `nyc_open_data_source` in the `landing_zone` of
+    `get_ingestion_config`: the DuckDB file, or the Parquet lake.
+
+    The lake has a pipeline of its own, with its own state (e.g. the cursor of
+    the incremental load), since its tables are not the ones in DuckDB.
+    """
+    if landing_zone == "lake":
+        destination = filesystem_lake(LAKE_ROOT)
+        name = f"{pipeline_name}_lake"
+    else:
+        destination = duckdb_merge(DB_FILE_PATH)
+        name = pipeline_name
+    return dlt.pipeline(
+        dataset_name=duckdb_schema,
+        destination=destination,
+        # dev_mode=True,
+        export_schema_path=os.path.join(SCHEMAS_ROOT, "export"),
+        pipeline_name=name,
+        progress="log",
+    )
+
+
+def run_steps(pipeline: dlt.Pipeline, data: Any, config: Dict[str, int]) -> LoadInfo:
+    """Like `pipeline.run(data)`, but each step runs with the number of
+    workers set in `config` (see `get_ingestion_config`).
+
+    https://dlthub.com/docs/reference/performance#parallelism
+    """
+    # `pipeline.run` restores the state from the destination, e.g. when the
+    # working directory of the pipeline has been deleted
+    pipeline.sync_destination()
+    # load the packages left behind by a failed run, like `pipeline.run` does
+    if pipeline.list_extracted_load_packages():
+        pipeline.normalize(workers=config["normalize_workers"])
+    if pipeline.list_normalized_load_packages():
+        pipeline.load(workers=config["load_workers"])
+    pipeline.extract(data, workers=config["extract_workers"])
+    pipeline.normalize(workers=config["normalize_workers"])
+    return pipeline.load(workers=config["load_workers"])
+
+
 def run() -> None:
     # Data will be stored at:
     # <dlt-pipeline_name>.<dlt-dataset_name>.<dlt-resource>
@@ -64,15 +117,9 @@ def run() -> None:
     parse_mode = telegram_config["parse_mode"]
     bot_token = telegram_credentials["bot_token"]
     chat_id = telegram_credentials["chat_id"]
+    ingestion_config = get_ingestion_config()
 
-    pipeline = dlt.pipeline(
-        dataset_name=duckdb_schema,
-        destination=dlt.destinations.duckdb(DB_FILE_PATH),
-        # dev_mode=True,
-        export_schema_path=os.path.join(SCHEMAS_ROOT, "export"),
-        pipeline_name=pipeline_name,
-        progress="log",
-    )
+    pipeline = ingestion_pipeline(ingestion_config["landing_zone"])
 
     # I don't think dlt allows us to retrieve the dlt runtime configuration of a
     # pipeline that ran in the past. It might be a good idea to extract it now
@@ -85,40 +132,67 @@ def run() -> None:
         text=runtime_configuration_text(pipeline=pipeline, app_name=APP_NAME),
     )
 
-    # https://dlthub.com/docs/walkthroughs/run-a-pipeline#failed-api-or-database-connections-and-other-exceptions
-    try:
-        load_info: LoadInfo = pipeline.run(nyc_open_data_source())
-    except PipelineStepFailed as ex:
-        safe_send_telegram_text(
-            bot_token=bot_token,
-            chat_id=chat_id,
-            parse_mode=parse_mode,
-            text=pipeline_step_failed_text(exception=ex, app_name=APP_NAME),
-        )
-        # we handled the exception by sending a notification to Telegram, so we
-        # now let the exception bubble up
-        raise
-    except ConfigFieldMissingException as ex:
-        safe_send_telegram_text(
-            bot_token=bot_token,
-            chat_id=chat_id,
-            parse_mode=parse_mode,
-            text=config_field_missing_exception_text(exception=ex, app_name=APP_NAME),
-        )
-        raise
+    # The requests, latencies, rows and bytes of each resource, and the wall
+    # time of each step, summed over all the runs below.
+    run_metrics.reset()
+
+    # Checkpointed resources may stop after `pages_per_run` pages, so we run
+    # the pipeline until all of them are loaded. Each run commits its pages and
+    # the checkpoints of its resources, so a failed run resumes where the last
+    # successful one stopped. The runs share a backfill_id, so that they skip
+    # the partitions that one of them has loaded.
+    backfill_id = uniq_id()
+    load_infos: List[LoadInfo] = []
+    while True:
+        # https://dlthub.com/docs/walkthroughs/run-a-pipeline#failed-api-or-database-connections-and-other-exceptions
+        try:
+            load_info: LoadInfo = run_steps(
+                pipeline,
+                nyc_open_data_source(backfill_id=backfill_id),
+                ingestion_config,
+            )
+        except PipelineStepFailed as ex:
+            safe_send_telegram_text(
+                bot_token=bot_token,
+                chat_id=chat_id,
+                parse_mode=parse_mode,
+                text=pipeline_step_failed_text(exception=ex, app_name=APP_NAME),
+            )
+            # we handled the exception by sending a notification to Telegram, so we
+            # now let the exception bubble up
+            raise
+        except ConfigFieldMissingException as ex:
+            safe_send_telegram_text(
+                bot_token=bot_token,
+                chat_id=chat_id,
+                parse_mode=parse_mode,
+                text=config_field_missing_exception_text(
+                    exception=ex, app_name=APP_NAME
+                ),
+            )
+            raise
+
+        load_infos.append(load_info)
+        run_metrics.record_trace(pipeline.last_trace)
+
+        pending = pending_checkpoints(pipeline)
+        if not pending:
+            break
+        logger.info(f"resources with more pages to load: {', '.join(pending)}")
 
+    # One summary for all the runs, not a message for each chunk of pages
     safe_send_telegram_text(
         bot_token=bot_token,
         chat_id=chat_id,
         parse_mode=parse_mode,
-        text=load_info_text(load_info=load_info, app_name=APP_NAME),
+        text=load_infos_text(load_infos=load_infos, app_name=APP_NAME),
     )
 
     # Send alerts about schema updates to Telegram.
     # https://dlthub.com/docs/running-in-production/alerting#slack
     # https://dlthub.com/docs/examples/chess_production/
     # https://dlthub.com/docs/walkthroughs/add_credentials#adding-credentials-to-your-deployment
-    for package in load_info.load_packages:
+    for package in [p for info in load_infos for p in info.load_packages]:
         # schema: Schema = package.schema
         # https://github.com/dlt-hub/dlt/blob/e00baa0c8f03d1d8be2fffe8cf2e1b56b8d5449e/dlt/common/schema/schema.py#L72
         for table_name, table in package.schema_update.items():
@@ -131,6 +205,21 @@ def run() -> None:
                 ),
             )
 
+    os.makedirs(METRICS_ROOT, exist_ok=True)
+    metrics_path = os.path.join(METRICS_ROOT, pipeline.pipeline_name)
+    with open(f"{metrics_path}.json", "w") as f:
+        f.write(run_metrics.to_json())
+    # e.g. for the textfile collector of the Prometheus node exporter
+    with open(f"{metrics_path}.prom", "w") as f:
+        f.write(run_metrics.to_openmetrics())
+
+    safe_send_telegram_text(
+        bot_token=bot_token,
+        chat_id=chat_id,
+        parse_mode=parse_mode,
+        text=ingestion_metrics_text(metrics=run_metrics.asdict(), app_name=APP_NAME),
+    )
+
     # dlt does NOT raise exceptions on failed jobs, unless we call the method
     # load_info.raise_on_failed_jobs(), which raises a DestinationHasFailedJobs
     # exception.
@@ -1,33 +1,84 @@
-from typing import Any, Optional
+from typing import Any, Dict, List, Optional, TypedDict
 
 import dlt
-from dlt.sources.helpers.rest_client.paginators import OffsetPaginator
+from dlt.common.configuration.container import Container
+from dlt.common.pipeline import PipelineContext
+from dlt.common.schema.typing import TTableSchemaColumns
+from dlt.sources.helpers.requests import Session
+from dlt.sources.helpers.rest_client.paginators import BasePaginator
 
 # from dlt.common import logger
 from loguru import logger
-from requests import Request, Response
 from rest_api import RESTAPIConfig, rest_api_resources
+from rest_api.checkpoints import completed_checkpoints
+from rest_api.config_setup import create_session, register_paginator
+from rest_api.typing import EndpointResource, SessionConfig
 
-from .utils import date_interval
+from .paginators import (
+    ROW_ID_FIELD,
+    AdaptiveLimit,
+    SocrataKeysetPaginator,
+    SocrataPaginator,
+    drop_row_id,
+    selects_row_id,
+)
+from .probe import RowProgress, count_rows, count_rows_concurrently, offset_ranges
+from .utils import date_interval, date_partitions
 
+register_paginator("socrata_offset", SocrataPaginator)
+register_paginator("socrata_keyset", SocrataKeysetPaginator)
 
-class SocrataPaginator(OffsetPaginator):
-    def update_state(self, response: Response) -> None:
-        super().update_state(response)
+PAGINATION_TYPES = ["keyset", "offset"]
 
-        # In `response.request.url`, spaces are represented as `+`.
-        # We need to convert them to `%20`.
-        request_url = response.request.url.replace("+", "%20")
+BASE_URL = "https://data.cityofnewyork.us/resource/"
 
-        items = response.json()
+# https://dev.socrata.com/docs/system-fields
+UPDATED_AT_FIELD = ":updated_at"
 
-        if len(items) < self.limit:
-            self._has_next_page = False
-            logger.info(
-                f"stop paginating: {request_url} returned less items than limit ({len(items)} < {self.limit})"
-            )
+# Reference datasets that rarely change. They are fetched with conditional
+# requests, and skipped when Socrata replies `304 Not Modified`.
+CACHED_TABLES = ["film_permits", "staten_island_ferry_ridership_counts"]
+
+# Requests sent to Socrata at once, after a pause, when `requests_per_second`
+# is set (see `rest_api/rate_limit.py`).
+RATE_LIMIT_BURST = 4
 
+# With `partition_by="rows"`, the 311 Service Requests window is split into
+# `$offset` ranges of this many rows, planned from a `count(*)` probe.
+ROWS_PER_OFFSET_RANGE = 100_000
 
+# Columns that each table needs downstream (see the dbt staging models). Every
+# resource that lands in one of these tables fetches only these columns (they
+# are sent as `$select`), and declares them as dlt column hints. Tables not
+# listed here are fetched with all their columns.
+TABLE_COLUMNS: Dict[str, TTableSchemaColumns] = {
+    "service_requests_311": {
+        "unique_key": {"data_type": "text", "nullable": False},
+        "created_date": {"data_type": "timestamp"},
+        "closed_date": {"data_type": "timestamp"},
+        "agency": {"data_type": "text"},
+        "complaint_type": {"data_type": "text"},
+        "descriptor": {"data_type": "text"},
+        "borough": {"data_type": "text"},
+        "status": {"data_type": "text"},
+    },
+    "film_permits": {
+        "eventid": {"data_type": "text", "nullable": False},
+        "eventtype": {"data_type": "text"},
+        "startdatetime": {"data_type": "timestamp"},
+        "enddatetime": {"data_type": "timestamp"},
+        "enteredon": {"data_type": "timestamp"},
+        "eventagency": {"data_type": "text"},
+        "borough": {"data_type": "text"},
+        "category": {"data_type": "text"},
+        "country": {"data_type": "text"},
+        "zipcode_s": {"data_type": "text"},
+    },
+}
+
+
+# These counts are used only when `probe_row_counts` is disabled. Otherwise, the
+# rows of each resource are counted before extraction.
 num_rows_in_nyc_311_service_requests_dataset = 37_189_770  # checked on 2024/08/09
 num_rows_in_nyc_film_permits_dataset = 7144  # checked on 2024/08/09
 num_rows_in_nyc_staten_island_ferry_ridership_count = 2077  # checked on 2024/08/09
@@ -39,31 +90,515 @@ paginator_maximum_offset = max(
 )
 
 
+class LimitBounds(TypedDict):
+    """The smallest and the largest `$limit` of an `AdaptiveLimit`."""
+
+    min_limit: int
+    max_limit: int
+
+
+def page_size_controller(
+    adaptive_limit: Optional[LimitBounds],
+) -> Optional[AdaptiveLimit]:
+    # each paginator needs its own instance, since the controller is stateful
+    return AdaptiveLimit(**adaptive_limit) if adaptive_limit else None
+
+
+def endpoint_paginator(
+    pagination: str,
+    order_by: str,
+    limit: int,
+    adaptive_limit: Optional[LimitBounds] = None,
+) -> Optional[BasePaginator]:
+    """Returns the paginator of an endpoint sorted by `order_by`.
+
+    With `offset` pagination, the endpoint uses the paginator of the client.
+    With `adaptive_limit`, `limit` is the `$limit` of the first page only, and
+    the following pages stay within its bounds.
+    """
+    if pagination not in PAGINATION_TYPES:
+        raise ValueError(
+            f"Invalid pagination: {pagination}. Available options: {PAGINATION_TYPES}"
+        )
+    if pagination == "keyset":
+        return SocrataKeysetPaginator(
+            order_by=order_by,
+            limit=limit,
+            adaptive_limit=page_size_controller(adaptive_limit),
+        )
+    return None
+
+
+def offset_paginator(
+    limit: int, offset: int = 0, adaptive_limit: Optional[LimitBounds] = None
+) -> SocrataPaginator:
+    """Returns an offset paginator that starts at `offset`.
+
+    Unfortunately, JSON responses from the Socrata Open Data API do not include
+    a total count, so this paginator stops after a short page, unless it's
+    given a row budget (see `plan_row_budgets`).
+    """
+    return SocrataPaginator(
+        limit=limit,
+        limit_param="$limit",
+        offset=offset,
+        offset_param="$offset",
+        total_path=None,
+        adaptive_limit=page_size_controller(adaptive_limit),
+    )
+
+
+def select_columns(
+    resource: EndpointResource, columns: TTableSchemaColumns
+) -> EndpointResource:
+    """Projects `resource` on `columns`.
+
+    The column names are sent as `$select`, so that Socrata returns only those
+    columns, and the column schemas are set as dlt column hints. This keeps
+    `$select` and the dlt schema in sync. System fields (e.g. `:updated_at`)
+    already in `$select`, and column hints already set on `resource`, are kept.
+
+    https://dev.socrata.com/docs/queries/select
+    """
+    endpoint = resource["endpoint"]
+    params = endpoint.get("params", {})
+    system_fields = [
+        field.strip()
+        for field in params.get("$select", "").split(",")
+        if field.strip().startswith(":")
+    ]
+    endpoint["params"] = {
+        **params,
+        "$select": ", ".join([*system_fields, *columns.keys()]),
+    }
+    resource["columns"] = {**columns, **resource.get("columns", {})}
+    return resource
+
+
+def adds_row_id(resource: EndpointResource) -> bool:
+    """Returns whether the keyset paginator of `resource` adds the `:id` system
+    field to its `$select`, to seek past the last row of each page."""
+    endpoint = resource["endpoint"]
+    return isinstance(
+        endpoint.get("paginator"), SocrataKeysetPaginator
+    ) and not selects_row_id(endpoint.get("params", {}).get("$select"))
+
+
+def service_requests_311_where(created_date_start: str, created_date_stop: str) -> str:
+    # https://dev.socrata.com/docs/functions/between
+    return f"created_date between '{created_date_start}' and '{created_date_stop}'"
+
+
+def created_date_since(created_date: str) -> str:
+    """Converts the last value of the `created_date` cursor to a `$where`."""
+    return f"created_date >= '{created_date}'"
+
+
+def updated_at_since(updated_at: str) -> str:
+    """Converts the last value of the `:updated_at` cursor to a `$where`."""
+    return f"{UPDATED_AT_FIELD} >= '{updated_at}'"
+
+
+def service_requests_311_resources(
+    created_date_start: str,
+    created_date_stop: Optional[str],
+    partition_by: Optional[str] = None,
+    pagination: str = "keyset",
+    paginator_limit: int = 10_000,
+    adaptive_limit: Optional[LimitBounds] = None,
+    row_count: Optional[int] = None,
+    lookback_days: int = 3,
+    cdc: bool = False,
+) -> List[EndpointResource]:
+    """Resources for the dataset "311 Service Requests from 2010 to Present".
+
+    When `created_date_stop` and `partition_by` are `None`, a single resource
+    fetches the rows created since the last run, using an incremental cursor
+    on `created_date` that starts at `created_date_start` on the first run.
+    Each run goes back `lookback_days` from the last `created_date` seen, to
+    fetch again the rows that were published late.
+
+    With `cdc`, the cursor is on the `:updated_at` system field instead, so
+    each run fetches the rows created or updated since the last run (e.g. a
+    request that has been closed), and merges them on `unique_key`.
+
+    When `partition_by` is `None`, a single resource fetches the whole
+    `created_date` window. Otherwise, the window is split in day or hour
+    partitions, and each partition becomes a parallelized resource with its own
+    paginator. All partitions land in the same `service_requests_311` table,
+    and rows are merged on `unique_key`.
+
+    When `partition_by` is `rows`, the window is split in `$offset` ranges of
+    `ROWS_PER_OFFSET_RANGE` rows instead, planned from `row_count` (the number
+    of rows in the window). Each range is paged through with `$offset`,
+    whatever the `pagination`.
+    """
+    if partition_by == "rows":
+        if row_count is None:
+            raise ValueError("partition_by=rows requires the row count of the window")
+        ranges = offset_ranges(row_count, ROWS_PER_OFFSET_RANGE)
+        resources = []
+        for offset_range in ranges:
+            paginator = offset_paginator(
+                paginator_limit, offset_range["start"], adaptive_limit
+            )
+            paginator.set_row_budget(offset_range["stop"] - offset_range["start"])
+            resources.append(
+                {
+                    "name": f"service_requests_311__rows{offset_range['start']}",
+                    "table_name": "service_requests_311",
+                    "primary_key": "unique_key",
+                    "parallelized": True,
+                    "endpoint": {
+                        "path": "erm2-nwe9.json",
+                        "paginator": paginator,
+                        "params": {
+                            # ranges must be cut from the same, total order of rows
+                            "$order": "created_date, :id",
+                            "$where": service_requests_311_where(
+                                created_date_start, created_date_stop
+                            ),
+                        },
+                    },
+                }
+            )
+        return resources
+
+    if cdc:
+        if partition_by is not None or created_date_stop is not None:
+            raise ValueError(
+                "cdc loads the rows updated since the last run, so it can't be "
+                "used with created_date_stop or partition_by"
+            )
+        return [
+            {
+                "name": "service_requests_311",
+                "primary_key": "unique_key",
+                "columns": {
+                    # dlt normalizes `:updated_at` to `_updated_at`
+                    "_updated_at": {"data_type": "timestamp"},
+                },
+                "endpoint": {
+                    "path": "erm2-nwe9.json",
+                    "paginator": endpoint_paginator(
+                        pagination, UPDATED_AT_FIELD, paginator_limit, adaptive_limit
+                    ),
+                    "params": {
+                        "$select": f"{UPDATED_AT_FIELD}, *",
+                        "$order": f"{UPDATED_AT_FIELD}, :id",
+                    },
+                    "incremental": {
+                        "start_param": "$where",
+                        # `:updated_at` is not a valid JSONPath identifier
+                        "cursor_path": f"$.'{UPDATED_AT_FIELD}'",
+                        "initial_value": created_date_start,
+                        "convert": updated_at_since,
+                    },
+                },
+            }
+        ]
+
+    if partition_by is None and created_date_stop is None:
+        return [
+            {
+                "name": "service_requests_311",
+                "primary_key": "unique_key",
+                "endpoint": {
+                    "path": "erm2-nwe9.json",
+                    "paginator": endpoint_paginator(
+                        pagination, "created_date", paginator_limit, adaptive_limit
+                    ),
+                    "params": {
+                        "$order": "created_date",
+                    },
+                    # the cursor state is kept in the state of the resource
+                    # https://dlthub.com/docs/dlt-ecosystem/verified-sources/rest_api#incremental-loading
+                    "incremental": {
+                        "start_param": "$where",
+                        "cursor_path": "created_date",
+                        "initial_value": created_date_start,
+                        "convert": created_date_since,
+                        "lag": lookback_days * 24 * 60 * 60,
+                    },
+                },
+            }
+        ]
+
+    if partition_by is None:
+        return [
+            {
+                "name": "service_requests_311",
+                "primary_key": "unique_key",
+                "endpoint": {
+                    "path": "erm2-nwe9.json",
+                    "paginator": endpoint_paginator(
+                        pagination, "created_date", paginator_limit, adaptive_limit
+                    ),
+                    "params": {
+                        "$order": "created_date",
+                        "$where": service_requests_311_where(
+                            created_date_start, created_date_stop
+                        ),
+                    },
+                },
+            }
+        ]
+
+    partitions = date_partitions(
+        start=created_date_start, stop=created_date_stop, granularity=partition_by
+    )
+    resources: List[EndpointResource] = []
+    for i, partition in enumerate(partitions):
+        # The last partition includes its upper bound, like `between` does.
+        stop_operator = "<=" if i == len(partitions) - 1 else "<"
+        suffix = partition["start"].replace("-", "").replace(":", "")
+        resources.append(
+            {
+                "name": f"service_requests_311__{suffix}",
+                "table_name": "service_requests_311",
+                "primary_key": "unique_key",
+                # dlt evaluates parallelized resources in a thread pool. Its
+                # size is set by `extract_workers` in the `[ingestion.config]`
+                # section of config.toml.
+                # https://dlthub.com/docs/reference/performance#extract
+                "parallelized": True,
+                "endpoint": {
+                    "path": "erm2-nwe9.json",
+                    # each partition needs its own instance, since paginators are stateful
+                    "paginator": endpoint_paginator(
+                        pagination, "created_date", paginator_limit, adaptive_limit
+                    ),
+                    "params": {
+                        # `:id` breaks ties between rows with the same `created_date`,
+                        # so pages of a partition never overlap or skip rows.
+                        "$order": "created_date, :id",
+                        "$where": f"created_date >= '{partition['start']}' and created_date {stop_operator} '{partition['stop']}'",
+                    },
+                },
+            }
+        )
+    return resources
+
+
+def completed_resources(backfill_id: Optional[str]) -> List[str]:
+    """Returns the names of the resources that the runs of `backfill_id` have
+    loaded, according to the state of the active pipeline."""
+    pipeline_context = Container()[PipelineContext]
+    if backfill_id is None or not pipeline_context.is_active():
+        return []
+    return completed_checkpoints(pipeline_context.pipeline(), backfill_id)
+
+
+def plan_row_budgets(
+    resources: List[EndpointResource],
+    headers: Dict[str, str],
+    paginator_limit: int,
+    adaptive_limit: Optional[LimitBounds] = None,
+    base_url: str = BASE_URL,
+    session: Optional[Session] = None,
+) -> None:
+    """Counts the rows of each resource with the `$where` of its endpoint, and
+    gives each paginator the exact number of rows it has to fetch.
+
+    With `offset` pagination, each resource gets its own offset paginator
+    instead of the paginator of the client. The rows fetched for each table
+    are reported, with an ETA, on the progress output of the pipeline.
+    """
+    queries = {}
+    for resource in resources:
+        endpoint = resource["endpoint"]
+        paginator = endpoint.get("paginator")
+        if paginator is not None and paginator.total_rows is not None:
+            # e.g. the offset ranges of a window, that have already been planned
+            continue
+        if endpoint.get("incremental"):
+            # the `$where` is known only once the cursor state is loaded
+            continue
+        where = endpoint.get("params", {}).get("$where")
+        queries[resource["name"]] = (f"{base_url}{endpoint['path']}", where)
+    counts = count_rows_concurrently(queries, headers=headers, session=session)
+
+    # incremental resources are not counted, and paginate until a short page
+    resources = [r for r in resources if not r["endpoint"].get("incremental")]
+    budgets: Dict[str, int] = {}
+    for resource in resources:
+        endpoint = resource["endpoint"]
+        if resource["name"] in counts:
+            if endpoint.get("paginator") is None:
+                endpoint["paginator"] = offset_paginator(
+                    paginator_limit, adaptive_limit=adaptive_limit
+                )
+            budgets[resource["name"]] = counts[resource["name"]]
+        else:
+            budgets[resource["name"]] = endpoint["paginator"].total_rows
+
+    table_rows: Dict[str, int] = {}
+    for resource in resources:
+        table_name = resource.get("table_name", resource["name"])
+        table_rows[table_name] = (
+            table_rows.get(table_name, 0) + budgets[resource["name"]]
+        )
+    progress = {
+        table_name: RowProgress(table_name, total_rows)
+        for table_name, total_rows in table_rows.items()
+    }
+    logger.info({"row_counts": table_rows})
+
+    for resource in resources:
+        table_name = resource.get("table_name", resource["name"])
+        resource["endpoint"]["paginator"].set_row_budget(
+            budgets[resource["name"]], progress[table_name]
+        )
+
+
 @dlt.source
 def nyc_open_data_source(
     created_date_start: Optional[str] = None,
     created_date_stop: Optional[str] = None,
+    partition_by: Optional[str] = None,
+    pagination: str = "keyset",
+    project_columns: bool = True,
+    stream: bool = False,
+    arrow: bool = False,
+    adaptive_limit: bool = True,
+    min_limit: int = 1_000,
+    max_limit: int = 50_000,
+    probe_row_counts: bool = True,
+    lookback_days: int = 3,
+    cdc: bool = False,
+    checkpoint: bool = True,
+    pages_per_run: int = 50,
+    backfill_id: Optional[str] = None,
+    response_cache: bool = True,
+    base_url: str = BASE_URL,
+    cassette_dir: Optional[str] = None,
+    cassette_mode: str = "replay",
+    requests_per_second: Optional[float] = 5,
     paginator_limit: Optional[int] = 10_000,
     paginator_offset: Optional[int] = 0,
     socrata_application_token: str = dlt.secrets.value,
 ) -> Any:
     """Fetch NYC data from the Socrata Open Data API.
 
+    When `created_date_stop` is not set (and the window is not partitioned),
+    the 311 Service Requests dataset is loaded incrementally: each run fetches
+    only the rows created since the last run, going back `lookback_days` to
+    catch the rows published late. On the first run, the cursor starts at
+    `created_date_start`, or 30 days ago. Set both `created_date_start` and
+    `created_date_stop` to load a fixed window instead (e.g. a backfill).
+
+    With `cdc`, the 311 Service Requests dataset is loaded incrementally on the
+    `:updated_at` system field instead of `created_date`: each run also fetches
+    the old requests that have been updated (e.g. their `status` and
+    `closed_date`) since the last run. On the first run, the cursor starts at
+    `created_date_start`, or 30 days ago.
+
+    With `checkpoint`, the resources that load a fixed window of the 311
+    Service Requests dataset save the state of their paginator in the dlt
+    state after every page, and load at most `pages_per_run` pages per run:
+    the next run resumes where they stopped (see `ingestion/run_pipelines.py`).
+    dlt discards the pages and the state of a run whose extract fails, so a
+    failure loses at most the pages of that run (all of them with
+    `pages_per_run` set to 0). The runs with the same `backfill_id` skip the
+    partitions that one of them has loaded. The other runs load them again, to
+    fetch the rows published since then.
+
+    With `response_cache`, the reference datasets in `CACHED_TABLES` are
+    fetched with the `ETag` and `Last-Modified` of their last download, and
+    skipped when they have not been modified since (see `rest_api/cache.py`).
+    The validators are kept in the state of each resource, and committed with
+    its rows. Streamed resources are never cached.
+
+    `base_url` points the source to another server (e.g. the stand-in Socrata
+    server of `benchmarks/socrata_server.py`). With `cassette_dir`, every
+    response is recorded to that directory (`cassette_mode="record"`), or
+    replayed from it without network (`cassette_mode="replay"`, see
+    `rest_api/transport.py`).
+
+    With `requests_per_second`, the requests to Socrata are paced to that rate
+    (bursts of up to `RATE_LIMIT_BURST` requests), whatever the number of
+    resources fetched at the same time. When Socrata replies 429, all requests
+    pause for its `Retry-After` (with jitter), and the rate is halved, then
+    recovers gradually (see `rest_api/rate_limit.py`). Set it to `None` to send
+    requests as fast as the workers can.
+
+    Set `partition_by` to `day` or `hour` to split the `created_date` window of
+    the 311 Service Requests dataset into partitions that are fetched at the
+    same time.
+
+    With `keyset` pagination (the default), each page is selected with a
+    `$where` on the sort column of the endpoint, so the latency of a page stays
+    flat during a full-history backfill (the `:id` system field that breaks
+    the ties of the sort column is not loaded). Set `pagination` to `offset`
+    to page through `$offset` instead.
+
+    With `project_columns`, the resources listed in `TABLE_COLUMNS` fetch only
+    the columns needed downstream.
+
+    With `stream`, each page is parsed while it is downloaded, and its rows are
+    yielded in small batches, so a page is never fully held in memory.
+
+    With `arrow`, each page of the resources listed in `TABLE_COLUMNS` is
+    converted to an Arrow table with the types of those columns (requires
+    `pyarrow` and `project_columns`). dlt writes the tables as Parquet files
+    while extracting, so the normalize step does not have to infer the type of
+    every value (see `socrata/arrow.py`). With `cdc`, or with `lookback_days`
+    set to 0, the pages of the 311 Service Requests dataset are not converted.
+
+    With `adaptive_limit`, `paginator_limit` is the size of the first page, and
+    the size of the following pages grows or shrinks with the latency, body
+    size and errors of the previous page (see `AdaptiveLimit`), between
+    `min_limit` and `max_limit` rows.
+
+    With `probe_row_counts`, the rows of each resource are counted with a
+    `count(*)` query before extraction. Each paginator then stops exactly after
+    the rows it has to fetch, and the progress output of the pipeline shows the
+    rows fetched for each table out of the total, with an ETA. Set
+    `partition_by` to `rows` to split the 311 Service Requests window in
+    `$offset` ranges that are fetched at the same time (this requires the
+    count, so it's probed even when `probe_row_counts` is disabled). The
+    resources that the previous runs of `backfill_id` have loaded are not
+    counted again.
+
     https://dev.socrata.com/
     """
 
     created_date_delta = {"weeks": 0, "days": 30}
-    d_interval = date_interval(
-        start=created_date_start, stop=created_date_stop, delta=created_date_delta
-    )
-    created_date_start = d_interval["start"]
-    created_date_stop = d_interval["stop"]
+    if created_date_stop is None and partition_by is None:
+        # incremental: `created_date_start` is only used on the first run
+        d_interval = date_interval(start=None, stop=None, delta=created_date_delta)
+        created_date_start = created_date_start or d_interval["start"]
+    else:
+        d_interval = date_interval(
+            start=created_date_start, stop=created_date_stop, delta=created_date_delta
+        )
+        created_date_start = d_interval["start"]
+        created_date_stop = d_interval["stop"]
 
     logger.info(
         {
             "created_date_start": created_date_start,
             "created_date_stop": created_date_stop,
             "created_date_delta": created_date_delta,
+            "lookback_days": lookback_days,
+            "cdc": cdc,
+            "checkpoint": checkpoint,
+            "pages_per_run": pages_per_run,
+            "backfill_id": backfill_id,
+            "response_cache": response_cache,
+            "base_url": base_url,
+            "cassette_dir": cassette_dir,
+            "cassette_mode": cassette_mode,
+            "requests_per_second": requests_per_second,
+            "partition_by": partition_by,
+            "pagination": pagination,
+            "project_columns": project_columns,
+            "stream": stream,
+            "arrow": arrow,
+            "adaptive_limit": adaptive_limit,
+            "min_limit": min_limit,
+            "max_limit": max_limit,
+            "probe_row_counts": probe_row_counts,
             "paginator_limit": paginator_limit,
             "paginator_offset": paginator_offset,
             "paginator_maximum_offset": paginator_maximum_offset,
@@ -72,6 +607,40 @@ def nyc_open_data_source(
         }
     )
 
+    headers = {
+        # https://dev.socrata.com/docs/app-tokens
+        "X-App-Token": socrata_application_token
+    }
+
+    session_config: SessionConfig = {}
+    probe_session = None
+    if cassette_dir:
+        session_config["transport"] = {
+            "cassette_dir": cassette_dir,
+            "mode": cassette_mode,
+        }
+    if requests_per_second:
+        session_config["rate_limit"] = {
+            "requests_per_second": requests_per_second,
+            "burst": RATE_LIMIT_BURST,
+        }
+    if session_config:
+        # the probes are recorded, replayed and paced like the pages
+        probe_session = create_session(session_config)
+
+    row_count = None
+    if partition_by == "rows":
+        row_count = count_rows(
+            f"{base_url}erm2-nwe9.json",
+            where=service_requests_311_where(created_date_start, created_date_stop),
+            headers=headers,
+            session=probe_session,
+        )
+
+    limit_bounds: Optional[LimitBounds] = None
+    if adaptive_limit:
+        limit_bounds = {"min_limit": min_limit, "max_limit": max_limit}
+
     paginator = SocrataPaginator(
         limit=paginator_limit,
         limit_param="$limit",
@@ -86,66 +655,145 @@ def nyc_open_data_source(
         # the stop date. If we want to allow that, we need to set `maximum_offset`
         # to the total number of records in the NYC 311 Service Requests dataset.
         maximum_offset=paginator_maximum_offset,
+        adaptive_limit=page_size_controller(limit_bounds),
     )
 
+    resources: List[EndpointResource] = [
+        # https://dev.socrata.com/foundry/data.cityofnewyork.us/erm2-nwe9
+        # https://data.cityofnewyork.us/Social-Services/311-Service-Requests-from-2010-to-Present/erm2-nwe9/about_data
+        *service_requests_311_resources(
+            created_date_start=created_date_start,
+            created_date_stop=created_date_stop,
+            partition_by=partition_by,
+            pagination=pagination,
+            paginator_limit=paginator_limit,
+            adaptive_limit=limit_bounds,
+            row_count=row_count,
+            lookback_days=lookback_days,
+            cdc=cdc,
+        ),
+        # https://dev.socrata.com/foundry/data.cityofnewyork.us/tg4x-b46p
+        # https://data.cityofnewyork.us/City-Government/Film-Permits/tg4x-b46p/about_data
+        {
+            "name": "film_permits",
+            "primary_key": "eventid",
+            "endpoint": {
+                "path": "tg4x-b46p.json",
+                "paginator": endpoint_paginator(
+                    pagination, "eventid", paginator_limit, limit_bounds
+                ),
+                "params": {
+                    "$order": "eventid",
+                },
+            },
+        },
+        # https://dev.socrata.com/foundry/data.cityofnewyork.us/6eng-46dm
+        # https://data.cityofnewyork.us/Transportation/Staten-Island-Ferry-Ridership-Counts/6eng-46dm/about_data
+        {
+            "name": "staten_island_ferry_ridership_counts",
+            "merge_key": "date",
+            "endpoint": {
+                "path": "6eng-46dm.json",
+                "paginator": endpoint_paginator(
+                    pagination, "date", paginator_limit, limit_bounds
+                ),
+                "params": {
+                    "$order": "date",
+                },
+            },
+        },
+    ]
+
+    if checkpoint:
+        for resource in resources:
+            table_name = resource.get("table_name", resource["name"])
+            endpoint = resource["endpoint"]
+            # only a fixed window can be resumed: the `$where` of an incremental
+            # resource moves with its cursor, that already resumes on its own
+            if table_name == "service_requests_311" and not endpoint.get("incremental"):
+                endpoint["checkpoint"] = True
+                endpoint["max_pages_per_run"] = pages_per_run
+                endpoint["backfill_id"] = backfill_id
+
+    if project_columns:
+        for resource in resources:
+            table_name = resource.get("table_name", resource["name"])
+            if table_name in TABLE_COLUMNS:
+                select_columns(resource, TABLE_COLUMNS[table_name])
+
+    if arrow:
+        if not project_columns:
+            raise ValueError(
+                "arrow pages have the types of TABLE_COLUMNS, so they require project_columns"
+            )
+        from .arrow import page_to_arrow
+
+        for resource in resources:
+            table_name = resource.get("table_name", resource["name"])
+            if table_name not in TABLE_COLUMNS:
+                continue
+            # dlt can't bind an incremental without a lag to Arrow tables: the
+            # initial value of the config is a string, and `:updated_at` is not
+            # one of TABLE_COLUMNS
+            incremental = resource["endpoint"].get("incremental")
+            if incremental and not incremental.get("lag"):
+                logger.warning(
+                    f"{resource['name']} is incremental without a lookback, so "
+                    "its pages are not converted to Arrow tables"
+                )
+                continue
+            resource["endpoint"]["page_transform"] = page_to_arrow(
+                TABLE_COLUMNS[table_name],
+                drop_keys=[ROW_ID_FIELD] if adds_row_id(resource) else [],
+            )
+
+    for resource in resources:
+        # `:id` is selected only to paginate, so it's not loaded
+        if adds_row_id(resource) and "page_transform" not in resource["endpoint"]:
+            resource["endpoint"]["page_transform"] = drop_row_id
+
+    if probe_row_counts:
+        # the checkpoint loop calls this source once per run: the resources
+        # that the previous runs of the backfill have loaded are skipped, so
+        # they are not counted again
+        skipped = completed_resources(backfill_id)
+        plan_row_budgets(
+            [r for r in resources if r["name"] not in skipped],
+            headers,
+            paginator_limit,
+            limit_bounds,
+            base_url=base_url,
+            session=probe_session,
+        )
+
     config: RESTAPIConfig = {
         "client": {
-            "base_url": "https://data.cityofnewyork.us/resource/",
-            "headers": {
-                # https://dev.socrata.com/docs/app-tokens
-                "X-App-Token": socrata_application_token
-            },
+            "base_url": base_url,
+            "headers": headers,
             "paginator": paginator,
+            "session": session_config,
         },
         "resource_defaults": {
             "write_disposition": "merge",
+            # The resources are independent, so they are extracted at the same
+            # time, e.g. film_permits while service_requests_311 is paginated.
+            "parallelized": True,
             "endpoint": {
                 "params": {
                     "$limit": 100,
                     "$offset": 0,
                 },
+                "stream": stream,
             },
         },
-        "resources": [
-            # https://dev.socrata.com/foundry/data.cityofnewyork.us/erm2-nwe9
-            # https://data.cityofnewyork.us/Social-Services/311-Service-Requests-from-2010-to-Present/erm2-nwe9/about_data
-            {
-                "name": "service_requests_311",
-                "primary_key": "unique_key",
-                "endpoint": {
-                    "path": "erm2-nwe9.json",
-                    "params": {
-                        "$order": "created_date",
-                        # https://dev.socrata.com/docs/functions/between
-                        "$where": f"created_date between '{created_date_start}' and '{created_date_stop}'",
-                    },
-                },
-            },
-            # https://dev.socrata.com/foundry/data.cityofnewyork.us/tg4x-b46p
-            # https://data.cityofnewyork.us/City-Government/Film-Permits/tg4x-b46p/about_data
-            {
-                "name": "film_permits",
-                "primary_key": "eventid",
-                "endpoint": {
-                    "path": "tg4x-b46p.json",
-                    "params": {
-                        "$order": "eventid",
-                    },
-                },
-            },
-            # https://dev.socrata.com/foundry/data.cityofnewyork.us/6eng-46dm
-            # https://data.cityofnewyork.us/Transportation/Staten-Island-Ferry-Ridership-Counts/6eng-46dm/about_data
-            {
-                "name": "staten_island_ferry_ridership_counts",
-                "merge_key": "date",
-                "endpoint": {
-                    "path": "6eng-46dm.json",
-                    "params": {
-                        "$order": "date",
-                    },
-                },
-            },
-        ],
+        "resources": resources,
     }
 
+    if response_cache and not stream:
+        config["client"]["response_cache"] = {}
+        for resource in resources:
+            table_name = resource.get("table_name", resource["name"])
+            if table_name in CACHED_TABLES:
+                resource["endpoint"]["cache"] = True
+
     yield from rest_api_resources(config)
@@ -0,0 +1,78 @@
+"""Converts the pages of a Socrata dataset to typed Arrow tables.
+
+Socrata returns every value as a JSON string. When a resource yields dicts,
+the dlt normalizer infers the type of each value, row by row. When it yields
+Arrow tables instead, dlt writes them as Parquet files during extraction, and
+the normalizer only has to move those files to the load package, so the rows
+are never handled one by one in Python.
+
+The columns listed in `TABLE_COLUMNS` are cast to the Arrow type of their dlt
+data type. Any other key of a row (e.g. the `:updated_at` system field) is kept
+as a string column, unless it is one of `drop_keys`.
+"""
+
+from typing import Any, Callable, Dict, List, Sequence
+
+from dlt.common.exceptions import MissingDependencyException
+from dlt.common.schema.typing import TTableSchemaColumns
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+except ModuleNotFoundError:
+    raise MissingDependencyException("socrata arrow pages", ["pyarrow"])
+
+# Socrata floating timestamps (e.g. 2024-08-01T00:00:00.000) have no time zone,
+# and dlt loads the timestamps of dict rows as UTC
+ARROW_TYPES = {
+    "text": pa.string(),
+    "timestamp": pa.timestamp("us", tz="UTC"),
+    "date": pa.date32(),
+    "double": pa.float64(),
+    "bigint": pa.int64(),
+    "bool": pa.bool_(),
+}
+
+
+def arrow_schema(columns: TTableSchemaColumns, keys: List[str]) -> "pa.Schema":
+    """The Arrow schema of the rows with `keys`: the type of a column in
+    `columns` comes from its dlt data type, and any other key is a string."""
+    return pa.schema(
+        [
+            pa.field(
+                key,
+                (
+                    ARROW_TYPES[columns[key].get("data_type", "text")]
+                    if key in columns
+                    else pa.string()
+                ),
+                nullable=columns.get(key, {}).get("nullable", True),
+            )
+            for key in keys
+        ]
+    )
+
+
+def page_to_arrow(
+    columns: TTableSchemaColumns, drop_keys: Sequence[str] = ()
+) -> Callable[[List[Any]], Any]:
+    """Returns a function that converts a page of Socrata rows to an Arrow
+    table with the types of `columns`, without the keys in `drop_keys`."""
+
+    def to_arrow(page: List[Dict[str, Any]]) -> "pa.Table":
+        # Socrata leaves out the null values of a row
+        extra_keys = {k for row in page for k in row} - set(columns) - set(drop_keys)
+        keys = list(columns) + sorted(extra_keys)
+        strings = pa.schema([pa.field(key, pa.string()) for key in keys])
+        table = pa.Table.from_pylist(page, schema=strings)
+        schema = arrow_schema(columns, keys)
+        for i, field in enumerate(schema):
+            column = table.column(i)
+            if pa.types.is_timestamp(field.type):
+                # Arrow can't cast a string without an offset to a zoned type
+                naive = pc.cast(column, pa.timestamp(field.type.unit))
+                column = pc.assume_timezone(naive, field.type.tz)
+            table = table.set_column(i, field, column.cast(field.type))
+        return table
+
+    return to_arrow
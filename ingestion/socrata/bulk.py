@@ -0,0 +1,325 @@
+"""Bulk CSV export of the 311 Service Requests dataset, for backfills.
+
+Paging through JSON, 10_000 rows at a time, is the slowest way to fetch the
+whole history of the dataset (more than 37M rows). For a backfill, the
+`created_date` window is split in calendar months, and each month is fetched
+from the CSV export of the SODA API (`/resource/erm2-nwe9.csv`), with a
+`$limit` of up to `rows_per_file` rows per request. Each response is streamed
+to its own file in `csv_dir`, a few at a time. A file is named after its
+month and its request, and it's downloaded only if it's not there yet, so a
+backfill that fails downloads only the files it's missing when it runs again.
+
+DuckDB's `read_csv` then parses the files, casts their columns to the types
+of `TABLE_COLUMNS`, and hands them to dlt as Arrow record batches. dlt writes
+them as Parquet files, and merges them into `service_requests_311` on
+`unique_key`, like the rows of `nyc_open_data_source`.
+
+The backfill source has the same name as `nyc_open_data_source`, so the two
+share a dlt schema and a dlt state. In the same load package as the rows, the
+backfill moves the `created_date` cursor of the incremental
+`service_requests_311` resource to the last `created_date` it loaded: the next
+incremental run starts there (minus `lookback_days`), and not from
+`created_date_start`. With a lookback, the resource keeps its cursor in its
+lagged cursors (see `rest_api.config_setup.LaggedCursor`); without one, dlt
+binds its incremental, and keeps the cursor in the state of the incremental.
+The backfill moves both, since it doesn't know the `lookback_days` of the
+incremental runs. A cursor that is already past the backfill is left where it
+is.
+
+https://dev.socrata.com/docs/formats/csv
+"""
+
+import datetime
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterator, List, Optional
+
+import dlt
+from dlt.common.configuration.paths import get_dlt_data_dir
+from dlt.common.exceptions import MissingDependencyException
+from dlt.common.schema.typing import TTableSchemaColumns
+from dlt.common.time import ensure_pendulum_datetime
+from dlt.common.utils import digest128
+from dlt.sources.helpers import requests
+from dlt.sources.helpers.requests import Session
+
+# from dlt.common import logger
+from loguru import logger
+from rest_api.config_setup import advance_lagged_cursor
+
+from . import BASE_URL, TABLE_COLUMNS
+from .probe import count_rows_concurrently, offset_ranges
+from .utils import month_partitions
+
+try:
+    import duckdb
+    import pyarrow as pa
+    import pyarrow.compute as pc
+except ModuleNotFoundError:
+    raise MissingDependencyException("socrata bulk export", ["duckdb", "pyarrow"])
+
+SERVICE_REQUESTS_311_DATASET = "erm2-nwe9"
+
+# Each request of the CSV export returns at most this many rows, i.e. a month
+# of the 311 Service Requests dataset (about 300_000 rows) fits in one file.
+ROWS_PER_CSV_FILE = 1_000_000
+MAX_CONCURRENT_DOWNLOADS = 4
+DOWNLOAD_CHUNK_BYTES = 1024 * 1024
+ROWS_PER_RECORD_BATCH = 100_000
+
+DUCKDB_TYPES = {
+    "text": "VARCHAR",
+    "timestamp": "TIMESTAMP",
+    "date": "DATE",
+    "double": "DOUBLE",
+    "bigint": "BIGINT",
+    "bool": "BOOLEAN",
+}
+
+# The REST API resource whose cursor the backfill moves forward, and the
+# format of the Socrata floating timestamps the cursor holds.
+INCREMENTAL_RESOURCE = "service_requests_311"
+CURSOR_PATH = "created_date"
+FLOATING_TIMESTAMP_FORMAT = "%Y-%m-%dT%H:%M:%S.%f"
+
+
+def plan_csv_files(
+    created_date_start: str,
+    created_date_stop: str,
+    headers: Dict[str, str],
+    rows_per_file: int = ROWS_PER_CSV_FILE,
+    base_url: str = BASE_URL,
+    session: Optional[Session] = None,
+) -> List[Dict[str, Any]]:
+    """Plans the CSV files of a backfill between `created_date_start` and
+    `created_date_stop`.
+
+    The rows of each month are counted with a `count(*)` probe, and split in
+    `$offset` ranges of `rows_per_file` rows. Each file is a dict with a
+    `name` and the `params` of its request. The name has a digest of the
+    params, so a file is downloaded again if its request changes, e.g. when
+    more rows have been published in its month.
+    """
+    columns = TABLE_COLUMNS["service_requests_311"]
+    partitions = month_partitions(start=created_date_start, stop=created_date_stop)
+    url = f"{base_url}{SERVICE_REQUESTS_311_DATASET}.json"
+    queries = {}
+    for i, partition in enumerate(partitions):
+        # The last partition includes its upper bound, like `between` does.
+        stop_operator = "<=" if i == len(partitions) - 1 else "<"
+        where = f"created_date >= '{partition['start']}' and created_date {stop_operator} '{partition['stop']}'"
+        queries[partition["start"][:7]] = (url, where)
+    counts = count_rows_concurrently(queries, headers=headers, session=session)
+
+    files = []
+    for month, (_, where) in queries.items():
+        for offset_range in offset_ranges(counts[month], rows_per_file):
+            limit = offset_range["stop"] - offset_range["start"]
+            if limit == 0:
+                continue
+            params = {
+                "$select": ", ".join(columns.keys()),
+                "$where": where,
+                # ranges must be cut from the same, total order of rows
+                "$order": "created_date, :id",
+                "$limit": limit,
+                "$offset": offset_range["start"],
+            }
+            # digest128 returns base64, which may contain a slash
+            digest = digest128(repr(sorted(params.items())), 8).replace("/", "_")
+            files.append(
+                {
+                    "name": f"{month}-{offset_range['start']:09d}-{digest}.csv",
+                    "params": params,
+                }
+            )
+    logger.info(
+        {
+            "csv_files": len(files),
+            "rows": sum(counts.values()),
+            "months": len(partitions),
+        }
+    )
+    return files
+
+
+def download_csv(
+    url: str,
+    params: Dict[str, Any],
+    path: str,
+    headers: Optional[Dict[str, str]] = None,
+    session: Optional[Session] = None,
+) -> int:
+    """Streams the CSV response of a request to `path`, and returns the bytes
+    written. A file that already exists is not downloaded again.
+
+    The body is written to a temporary file first, so `path` exists only once
+    the whole response has been received.
+    """
+    if os.path.exists(path):
+        logger.info(f"skip {path}: already downloaded")
+        return 0
+    size = 0
+    tmp_path = f"{path}.part"
+    with (session or requests).get(
+        url, params=params, headers=headers, stream=True
+    ) as response:
+        response.raise_for_status()
+        with open(tmp_path, "wb") as f:
+            for chunk in response.iter_content(chunk_size=DOWNLOAD_CHUNK_BYTES):
+                f.write(chunk)
+                size += len(chunk)
+    os.replace(tmp_path, path)
+    logger.info(f"downloaded {path} ({size / 1e6:.1f} MB)")
+    return size
+
+
+def download_csv_files(
+    files: List[Dict[str, Any]],
+    csv_dir: str,
+    headers: Dict[str, str],
+    base_url: str = BASE_URL,
+    session: Optional[Session] = None,
+) -> List[str]:
+    """Downloads the planned `files` to `csv_dir`, at most
+    `MAX_CONCURRENT_DOWNLOADS` at a time, and returns their paths."""
+    os.makedirs(csv_dir, exist_ok=True)
+    url = f"{base_url}{SERVICE_REQUESTS_311_DATASET}.csv"
+    paths = [os.path.join(csv_dir, file["name"]) for file in files]
+    with ThreadPoolExecutor(max_workers=MAX_CONCURRENT_DOWNLOADS) as executor:
+        futures = [
+            executor.submit(download_csv, url, file["params"], path, headers, session)
+            for file, path in zip(files, paths)
+        ]
+        sizes = [future.result() for future in futures]
+    logger.info(f"downloaded {sum(sizes) / 1e6:.1f} MB to {csv_dir}")
+    return paths
+
+
+def read_csv_batches(
+    paths: List[str],
+    columns: TTableSchemaColumns,
+    rows_per_batch: int = ROWS_PER_RECORD_BATCH,
+) -> Iterator["pa.RecordBatch"]:
+    """Reads the CSV files at `paths` with DuckDB, and yields their rows as
+    Arrow record batches, with the types of `columns`.
+
+    Socrata floating timestamps have no time zone. Like the rows of
+    `nyc_open_data_source`, they are loaded as UTC.
+    """
+    connection = duckdb.connect()
+    connection.execute("SET TimeZone = 'UTC'")
+    types = {
+        name: DUCKDB_TYPES[column.get("data_type", "text")]
+        for name, column in columns.items()
+    }
+    select = ", ".join(
+        f'"{name}"::TIMESTAMPTZ AS "{name}"' if type_ == "TIMESTAMP" else f'"{name}"'
+        for name, type_ in types.items()
+    )
+    relation = connection.execute(
+        f"SELECT {select} FROM read_csv(?, header = true, columns = ?)",
+        [paths, types],
+    )
+    reader = relation.fetch_record_batch(rows_per_batch)
+    for batch in reader:
+        yield batch
+
+
+def advance_cursor(last_created_date: datetime.datetime) -> None:
+    """Moves the `created_date` cursor of the incremental resource of
+    `nyc_open_data_source` to `last_created_date`, unless it's already past
+    it. Must be called in the context of the backfill source."""
+    # the same floating timestamp that Socrata returns, e.g. 2024-08-01T00:00:00.000
+    value = last_created_date.strftime(FLOATING_TIMESTAMP_FORMAT)[:-3]
+
+    # the cursor of the resource with a lookback
+    last_value = advance_lagged_cursor(INCREMENTAL_RESOURCE, CURSOR_PATH, value)
+    if last_value and ensure_pendulum_datetime(last_value) >= last_created_date:
+        logger.info(f"keep the lagged {CURSOR_PATH} cursor at {last_value}")
+    else:
+        logger.info(
+            f"move the lagged {CURSOR_PATH} cursor from {last_value} to {value}"
+        )
+
+    # the cursor of the resource without a lookback, bound by dlt
+    state = dlt.current.resource_state(INCREMENTAL_RESOURCE)
+    cursor = state.setdefault("incremental", {}).setdefault(CURSOR_PATH, {})
+    last_value = cursor.get("last_value")
+    if last_value and ensure_pendulum_datetime(last_value) >= last_created_date:
+        logger.info(f"keep the {CURSOR_PATH} cursor at {last_value}")
+        return
+    cursor.setdefault("initial_value", value)
+    cursor["last_value"] = value
+    cursor["unique_hashes"] = []
+    logger.info(f"move the {CURSOR_PATH} cursor from {last_value} to {value}")
+
+
+# Same name as `nyc_open_data_source`, to share its dlt schema and state.
+@dlt.source(name="nyc_open_data_source", section="socrata_backfill")
+def nyc_open_data_backfill_source(
+    created_date_start: str = "2010-01-01",
+    created_date_stop: Optional[str] = None,
+    csv_dir: Optional[str] = None,
+    rows_per_file: int = ROWS_PER_CSV_FILE,
+    base_url: str = BASE_URL,
+    socrata_application_token: str = dlt.secrets.value,
+) -> Any:
+    """Backfill the 311 Service Requests dataset from its CSV export.
+
+    The rows created between `created_date_start` and `created_date_stop`
+    (today, if not set) are downloaded to `csv_dir` (by default in the dlt
+    data directory, e.g. ~/.dlt/bulk/socrata), and merged into
+    `service_requests_311`. See the docstring of this module.
+    """
+    created_date_stop = created_date_stop or datetime.date.today().isoformat()
+    csv_dir = csv_dir or os.path.join(get_dlt_data_dir(), "bulk", "socrata")
+    logger.info(
+        {
+            "created_date_start": created_date_start,
+            "created_date_stop": created_date_stop,
+            "csv_dir": csv_dir,
+            "rows_per_file": rows_per_file,
+            "base_url": base_url,
+        }
+    )
+
+    headers = {
+        # https://dev.socrata.com/docs/app-tokens
+        "X-App-Token": socrata_application_token
+    }
+    columns = TABLE_COLUMNS["service_requests_311"]
+
+    def service_requests_311_csv() -> Iterator["pa.RecordBatch"]:
+        files = plan_csv_files(
+            created_date_start,
+            created_date_stop,
+            headers,
+            rows_per_file=rows_per_file,
+            base_url=base_url,
+        )
+        paths = download_csv_files(files, csv_dir, headers, base_url=base_url)
+        if not paths:
+            return
+
+        last_created_date = None
+        for batch in read_csv_batches(paths, columns):
+            batch_max = pc.max(batch.column(CURSOR_PATH)).as_py()
+            if batch_max and (
+                last_created_date is None or batch_max > last_created_date
+            ):
+                last_created_date = batch_max
+            yield batch
+
+        if last_created_date is not None:
+            # committed in the same load package as the rows
+            advance_cursor(last_created_date)
+
+    return dlt.resource(
+        service_requests_311_csv,
+        name="service_requests_311_csv",
+        table_name="service_requests_311",
+        write_disposition="merge",
+        primary_key="unique_key",
+        columns=columns,
+    )
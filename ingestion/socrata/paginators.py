@@ -0,0 +1,373 @@
+from typing import Any, Dict, List, Optional
+
+from dlt.sources.helpers.rest_client.paginators import BasePaginator, OffsetPaginator
+
+# from dlt.common import logger
+from loguru import logger
+from requests import Request, Response
+
+from .probe import RowProgress
+
+# https://dev.socrata.com/docs/system-fields
+ROW_ID_FIELD = ":id"
+
+
+def page_items(response: Response, data: Optional[List[Any]]) -> List[Any]:
+    """Returns the items of a page, without decoding the response body twice.
+
+    `RESTClient.paginate` has already decoded the body to extract `data`, and
+    passes it to the paginator. A Socrata page of 10_000 rows is several MB of
+    JSON, so decoding it again would double the CPU time spent on each page.
+    """
+    if data is not None:
+        return data
+    # the paginator is used outside of `RESTClient.paginate`
+    return response.json()
+
+
+def selects_row_id(select: Optional[str]) -> bool:
+    """Returns whether `select` (a `$select`) already returns the `:id` system
+    field."""
+    if not select:
+        return False
+    return bool({ROW_ID_FIELD, ":*"} & {s.strip() for s in select.split(",")})
+
+
+def drop_row_id(page: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Returns the rows of `page` without the `:id` system field.
+
+    The rows are copied: a streamed page is yielded in batches before the
+    paginator reads the `:id` of its last row.
+    """
+    return [{k: v for k, v in row.items() if k != ROW_ID_FIELD} for row in page]
+
+
+def body_size(response: Response) -> int:
+    """Returns the number of bytes of the body of `response` read so far."""
+    # requests sets `_content` to the body once it has been read. A streamed
+    # body is never stored, but urllib3 counts the bytes it has read.
+    if isinstance(response._content, bytes):
+        return len(response._content)
+    try:
+        return response.raw.tell()
+    except (AttributeError, OSError):
+        return int(response.headers.get("Content-Length", 0))
+
+
+class AdaptiveLimit:
+    """Chooses the `$limit` of the next page from how the last page went.
+
+    The limit is scaled by how far the last page was from `target_seconds` and
+    `max_page_bytes`: a page that took half the target time doubles the limit,
+    a page that took twice the target time halves it. A page is never more
+    than `growth_factor` times bigger, or `shrink_factor` times smaller, than
+    the previous one, and the limit stays within `min_limit` and `max_limit`.
+
+    Every response that was an error (e.g. a Socrata query timeout, or a 429
+    when the server is busy) and had to be retried shrinks the next page by
+    `shrink_factor`, whatever the latency of the response that succeeded.
+
+    Latency is measured as the time until the response headers arrive, which
+    for Socrata is dominated by the time it takes to run the query.
+    """
+
+    def __init__(
+        self,
+        min_limit: int = 1_000,
+        max_limit: int = 50_000,
+        target_seconds: float = 10.0,
+        max_page_bytes: int = 50_000_000,
+        growth_factor: float = 2.0,
+        shrink_factor: float = 0.5,
+    ) -> None:
+        if not 0 < min_limit <= max_limit:
+            raise ValueError(
+                f"Invalid limit bounds: min_limit={min_limit} max_limit={max_limit}"
+            )
+        if not 0 < shrink_factor < 1 < growth_factor:
+            raise ValueError(
+                f"Invalid factors: shrink_factor={shrink_factor} growth_factor={growth_factor}"
+            )
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.target_seconds = target_seconds
+        self.max_page_bytes = max_page_bytes
+        self.growth_factor = growth_factor
+        self.shrink_factor = shrink_factor
+        self._errors = 0
+
+    def clamp(self, limit: int) -> int:
+        return max(self.min_limit, min(self.max_limit, limit))
+
+    def count_errors(self, response: Response, *args: Any, **kwargs: Any) -> None:
+        """Response hook that sees every attempt of a request, retries included."""
+        if response.status_code >= 400:
+            self._errors += 1
+
+    def next_limit(self, limit: int, response: Response) -> int:
+        seconds = response.elapsed.total_seconds()
+        size = body_size(response)
+
+        ratio = self.growth_factor
+        if seconds > 0:
+            ratio = min(ratio, self.target_seconds / seconds)
+        if size > 0:
+            ratio = min(ratio, self.max_page_bytes / size)
+        if self._errors:
+            ratio = min(ratio, self.shrink_factor)
+        ratio = max(ratio, self.shrink_factor)
+
+        next_limit = self.clamp(int(limit * ratio))
+        logger.info(
+            f"next $limit: {next_limit} (last page: $limit {limit}, {seconds:.2f}s, {size} bytes, {self._errors} errors)"
+        )
+        self._errors = 0
+        return next_limit
+
+    def __str__(self) -> str:
+        return f"AdaptiveLimit: min_limit: {self.min_limit} max_limit: {self.max_limit} target_seconds: {self.target_seconds}"
+
+
+class RowBudget:
+    """Stops a paginator once it has fetched the number of rows counted before
+    the first request (e.g. by a `count(*)` probe), instead of waiting for a
+    short page. This saves the last request when the number of rows is a
+    multiple of `$limit`, and the `$limit` of the last page is trimmed to the
+    rows that are left.
+
+    Rows inserted after the count are fetched by the next run.
+    """
+
+    total_rows: Optional[int] = None
+    progress: Optional[RowProgress] = None
+    _rows_fetched: int = 0
+
+    def set_row_budget(
+        self, total_rows: int, progress: Optional[RowProgress] = None
+    ) -> None:
+        self.total_rows = total_rows
+        self.progress = progress
+        self._rows_fetched = 0
+        self.limit = self._limit_within_budget(self.limit)
+
+    def _limit_within_budget(self, limit: int) -> int:
+        if self.total_rows is None:
+            return limit
+        # `$limit` must be positive, even when there are no rows left
+        return max(min(limit, self.total_rows - self._rows_fetched), 1)
+
+    def _spend_row_budget(self, rows: int) -> bool:
+        """Counts the rows of a page, and returns whether the budget is spent."""
+        self._rows_fetched += rows
+        if self.progress is not None:
+            self.progress.update(rows)
+        return self.total_rows is not None and self._rows_fetched >= self.total_rows
+
+
+def _register_error_hook(request: Request, adaptive_limit: AdaptiveLimit) -> None:
+    # the hook runs before `raise_for_status`, otherwise it would never see errors
+    hooks = request.hooks.setdefault("response", [])
+    hooks.insert(0, adaptive_limit.count_errors)
+
+
+class SocrataPaginator(RowBudget, OffsetPaginator):
+    """Offset pagination for the Socrata Open Data API.
+
+    Socrata responses don't include a total count, so the paginator stops
+    after a page that has less items than `$limit`, or once it has fetched the
+    rows of its `RowBudget`.
+
+    With `adaptive_limit`, the `$limit` of each page is chosen from the
+    latency, size and errors of the previous one. The offset always advances
+    by the number of rows received, so no row is skipped when `$limit` changes.
+    """
+
+    def __init__(
+        self, *args: Any, adaptive_limit: Optional[AdaptiveLimit] = None, **kwargs: Any
+    ) -> None:
+        super().__init__(*args, **kwargs)
+        self.adaptive_limit = adaptive_limit
+        if adaptive_limit is not None:
+            self.limit = self.value_step = adaptive_limit.clamp(self.limit)
+
+    def init_request(self, request: Request) -> None:
+        super().init_request(request)
+        if self.adaptive_limit is not None:
+            _register_error_hook(request, self.adaptive_limit)
+
+    def update_state(
+        self, response: Response, data: Optional[List[Any]] = None
+    ) -> None:
+        items = page_items(response, data)
+        # the offset advances by `value_step`, i.e. by the rows of this page
+        self.value_step = len(items)
+
+        super().update_state(response, data)
+
+        # In `response.request.url`, spaces are represented as `+`.
+        # We need to convert them to `%20`.
+        request_url = response.request.url.replace("+", "%20")
+
+        if self._spend_row_budget(len(items)):
+            self._has_next_page = False
+            logger.info(
+                f"stop paginating: {request_url} fetched all the {self.total_rows} rows counted"
+            )
+        elif len(items) < self.limit:
+            self._has_next_page = False
+            logger.info(
+                f"stop paginating: {request_url} returned less items than limit ({len(items)} < {self.limit})"
+            )
+        else:
+            if self.adaptive_limit is not None:
+                self.limit = self.adaptive_limit.next_limit(self.limit, response)
+            self.limit = self._limit_within_budget(self.limit)
+
+    def checkpoint(self) -> Dict[str, Any]:
+        return {
+            "offset": self.current_value,
+            "limit": self.limit,
+            "rows_fetched": self._rows_fetched,
+        }
+
+    def resume(self, checkpoint: Dict[str, Any]) -> None:
+        self.current_value = checkpoint["offset"]
+        self.limit = checkpoint["limit"]
+        self._rows_fetched = checkpoint["rows_fetched"]
+
+
+class SocrataKeysetPaginator(RowBudget, BasePaginator):
+    """Keyset (a.k.a. seek) pagination for the Socrata Open Data API.
+
+    Instead of skipping `$offset` rows, every request after the first one asks
+    for the rows that come after the last row of the previous page:
+
+        (order_by > 'last value') OR (order_by = 'last value' AND :id > 'last :id')
+
+    This predicate is AND-ed with the `$where` of the endpoint, and rows are
+    sorted by `order_by` and `:id`. Socrata can answer such a query using its
+    indexes, so the latency of a page does not grow with the number of rows
+    already fetched, and rows inserted or deleted during a run do not shift the
+    following pages.
+
+    `order_by` must be a column that is never null. `order_field` is the key of
+    that column in the JSON response, in case `order_by` is an expression with
+    an alias in `$select`.
+
+    With `adaptive_limit`, the `$limit` of each page is chosen from the
+    latency, size and errors of the previous one. Since each page seeks past
+    the last row of the previous one, changing `$limit` never skips rows.
+
+    Note: the system field `:id` is added to `$select` (unless it is already
+    selected), so it is part of the returned rows. Drop it with `drop_row_id`.
+    """
+
+    def __init__(
+        self,
+        order_by: str,
+        limit: int = 1000,
+        limit_param: str = "$limit",
+        order_field: Optional[str] = None,
+        adaptive_limit: Optional[AdaptiveLimit] = None,
+    ) -> None:
+        super().__init__()
+        self.order_by = order_by
+        self.order_field = order_field or order_by
+        self.adaptive_limit = adaptive_limit
+        if adaptive_limit is not None:
+            limit = adaptive_limit.clamp(limit)
+        self.limit = limit
+        self.limit_param = limit_param
+        self._base_where: Optional[str] = None
+        self._last_value: Optional[Any] = None
+        self._last_id: Optional[str] = None
+
+    def init_request(self, request: Request) -> None:
+        params: Dict[str, Any] = request.params if request.params is not None else {}
+        self._base_where = params.get("$where")
+
+        # keyset pagination replaces offset pagination altogether
+        params.pop("$offset", None)
+        params[self.limit_param] = self.limit
+        params["$order"] = f"{self.order_by}, {ROW_ID_FIELD}"
+
+        select = params.get("$select")
+        if not selects_row_id(select):
+            params["$select"] = f"{ROW_ID_FIELD}, {select or '*'}"
+
+        if self._last_value is not None:
+            # the paginator has been resumed from a checkpoint
+            params["$where"] = self._where()
+
+        request.params = params
+        if self.adaptive_limit is not None:
+            _register_error_hook(request, self.adaptive_limit)
+
+    def update_state(
+        self, response: Response, data: Optional[List[Any]] = None
+    ) -> None:
+        # In `response.request.url`, spaces are represented as `+`.
+        # We need to convert them to `%20`.
+        request_url = response.request.url.replace("+", "%20")
+
+        items = page_items(response, data)
+
+        if self._spend_row_budget(len(items)):
+            self._has_next_page = False
+            logger.info(
+                f"stop paginating: {request_url} fetched all the {self.total_rows} rows counted"
+            )
+            return
+
+        if len(items) < self.limit:
+            self._has_next_page = False
+            logger.info(
+                f"stop paginating: {request_url} returned less items than limit ({len(items)} < {self.limit})"
+            )
+            return
+
+        last_item = items[-1]
+        self._last_value = last_item[self.order_field]
+        self._last_id = last_item[ROW_ID_FIELD]
+
+        if self.adaptive_limit is not None:
+            self.limit = self.adaptive_limit.next_limit(self.limit, response)
+        self.limit = self._limit_within_budget(self.limit)
+
+    def update_request(self, request: Request) -> None:
+        request.params["$where"] = self._where()
+        request.params[self.limit_param] = self.limit
+
+    def checkpoint(self) -> Dict[str, Any]:
+        return {
+            "last_value": self._last_value,
+            "last_id": self._last_id,
+            "limit": self.limit,
+            "rows_fetched": self._rows_fetched,
+        }
+
+    def resume(self, checkpoint: Dict[str, Any]) -> None:
+        self._last_value = checkpoint["last_value"]
+        self._last_id = checkpoint["last_id"]
+        self.limit = checkpoint["limit"]
+        self._rows_fetched = checkpoint["rows_fetched"]
+
+    def _where(self) -> str:
+        value = _soql_literal(self._last_value)
+        row_id = _soql_literal(self._last_id)
+        seek = f"({self.order_by} > {value} OR ({self.order_by} = {value} AND {ROW_ID_FIELD} > {row_id}))"
+        if self._base_where:
+            return f"({self._base_where}) AND {seek}"
+        return seek
+
+    def __str__(self) -> str:
+        return (
+            super().__str__()
+            + f": order_by: {self.order_by} last_value: {self._last_value} last_id: {self._last_id}"
+        )
+
+
+def _soql_literal(value: Any) -> str:
+    """Quotes `value` as a SoQL string literal (single quotes are doubled)."""
+    escaped = str(value).replace("'", "''")
+    return f"'{escaped}'"
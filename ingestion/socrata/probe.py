@@ -0,0 +1,127 @@
+import datetime
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+from dlt.common.configuration.container import Container
+from dlt.common.pipeline import PipelineContext
+from dlt.sources.helpers import requests
+from dlt.sources.helpers.requests import Session
+
+# from dlt.common import logger
+from loguru import logger
+
+MAX_CONCURRENT_PROBES = 8
+
+
+def count_rows(
+    url: str,
+    where: Optional[str] = None,
+    headers: Optional[Dict[str, str]] = None,
+    session: Optional[Session] = None,
+) -> int:
+    """Counts the rows of the Socrata dataset at `url` that match `where`.
+
+    The probe is a single `SELECT count(*)` query, so it returns one row and
+    costs much less than fetching the rows themselves. It's sent with
+    `session`, if any (e.g. a session that replays recorded responses).
+
+    https://dev.socrata.com/docs/functions/count
+    """
+    params = {"$select": "count(*) AS count"}
+    if where:
+        params["$where"] = where
+    response = (session or requests).get(url, params=params, headers=headers)
+    # the session of the source doesn't raise, so that response actions can
+    # handle errors, but an error body has no count
+    response.raise_for_status()
+    rows = response.json()
+    count = int(rows[0]["count"]) if rows else 0
+    logger.info(f"{url} has {count} rows where {where}")
+    return count
+
+
+def count_rows_concurrently(
+    queries: Dict[str, Tuple[str, Optional[str]]],
+    headers: Optional[Dict[str, str]] = None,
+    session: Optional[Session] = None,
+) -> Dict[str, int]:
+    """Counts the rows of many `(url, where)` queries at the same time.
+
+    Returns the counts with the same keys as `queries`.
+    """
+    with ThreadPoolExecutor(max_workers=MAX_CONCURRENT_PROBES) as executor:
+        futures = {
+            key: executor.submit(count_rows, url, where, headers, session)
+            for key, (url, where) in queries.items()
+        }
+        return {key: future.result() for key, future in futures.items()}
+
+
+def offset_ranges(total_rows: int, rows_per_range: int) -> List[Dict[str, int]]:
+    """Splits `total_rows` rows into contiguous `$offset` ranges.
+
+    Each range is a dict with a `start` offset (included) and a `stop` offset
+    (excluded). There is always at least one range.
+    """
+    if rows_per_range <= 0:
+        raise ValueError(f"rows_per_range must be positive. Found: {rows_per_range}")
+    ranges = [
+        {"start": start, "stop": min(start + rows_per_range, total_rows)}
+        for start in range(0, total_rows, rows_per_range)
+    ]
+    return ranges or [{"start": 0, "stop": 0}]
+
+
+class RowProgress:
+    """Reports how many rows of a table have been fetched, out of a total
+    counted before extraction, on the collector of the running pipeline (e.g.
+    `progress="log"`), together with an estimated time of arrival.
+
+    The rows are counted across all the paginators of the table, e.g. the
+    partitions of a dataset fetched at the same time. Copies of a paginator
+    share the same `RowProgress`.
+    """
+
+    def __init__(self, name: str, total_rows: int) -> None:
+        self.name = name
+        self.total_rows = total_rows
+        self.rows = 0
+        self._started_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def __deepcopy__(self, memo: Dict[int, Any]) -> "RowProgress":
+        return self
+
+    def eta(self) -> Optional[datetime.timedelta]:
+        elapsed = time.monotonic() - self._started_at
+        if not self.rows or not elapsed:
+            return None
+        remaining_rows = max(self.total_rows - self.rows, 0)
+        return datetime.timedelta(seconds=round(remaining_rows * elapsed / self.rows))
+
+    def update(self, rows: int) -> None:
+        with self._lock:
+            self.rows += rows
+            eta = self.eta()
+
+        pipeline_context = Container()[PipelineContext]
+        if not pipeline_context.is_active():
+            # e.g. a paginator used outside of a dlt pipeline
+            return
+        pipeline_context.pipeline().collector.update(
+            self.name,
+            inc=rows,
+            total=self.total_rows,
+            message=f"ETA {eta}" if eta is not None else None,
+            label="rows",
+        )
+
+
+if __name__ == "__main__":
+    print("\noffset_ranges (total_rows 250_000, rows_per_range 100_000)")
+    print(offset_ranges(total_rows=250_000, rows_per_range=100_000))
+
+    print("\noffset_ranges (total_rows 0, rows_per_range 100_000)")
+    print(offset_ranges(total_rows=0, rows_per_range=100_000))
@@ -1,5 +1,10 @@
 import datetime
-from typing import Optional
+from typing import Dict, List, Optional
+
+PARTITION_GRANULARITIES = {
+    "day": datetime.timedelta(days=1),
+    "hour": datetime.timedelta(hours=1),
+}
 
 
 def date_interval(
@@ -34,6 +39,83 @@ def date_interval(
         return {"start": start, "stop": (start_date + delta).strftime(fmt)}
 
 
+def date_partitions(
+    start: str,
+    stop: str,
+    granularity: str = "day",
+) -> List[Dict[str, str]]:
+    """Splits the interval between `start` and `stop` (both `YYYY-MM-DD`) into
+    contiguous day or hour partitions.
+
+    Each partition is a dict with a `start` and a `stop` floating timestamp
+    that can be used in a SoQL `$where` clause. Partitions are half-open
+    (`start <= x < stop`), except the last one, which includes `stop` so that
+    the whole interval covers the same rows as `created_date between start and stop`.
+    """
+    try:
+        step = PARTITION_GRANULARITIES[granularity]
+    except KeyError:
+        available_options = ", ".join(PARTITION_GRANULARITIES.keys())
+        raise ValueError(
+            f"Invalid partition granularity: {granularity}. "
+            f"Available options: {available_options}"
+        )
+
+    fmt = "%Y-%m-%d"
+    soql_fmt = "%Y-%m-%dT%H:%M:%S"
+    start_dt = datetime.datetime.strptime(start, fmt)
+    stop_dt = datetime.datetime.strptime(stop, fmt)
+
+    partitions = []
+    current = start_dt
+    while current < stop_dt:
+        next_ = min(current + step, stop_dt)
+        partitions.append(
+            {"start": current.strftime(soql_fmt), "stop": next_.strftime(soql_fmt)}
+        )
+        current = next_
+
+    if not partitions:
+        # `start` and `stop` are the same day: keep a single, degenerate partition
+        partitions.append(
+            {"start": start_dt.strftime(soql_fmt), "stop": stop_dt.strftime(soql_fmt)}
+        )
+    return partitions
+
+
+def month_partitions(start: str, stop: str) -> List[Dict[str, str]]:
+    """Splits the interval between `start` and `stop` (both `YYYY-MM-DD`) into
+    calendar months.
+
+    The partitions have the same shape as the ones of `date_partitions`, and
+    the same bounds: half-open, except the last one. The first and the last
+    partitions may be shorter than a month.
+    """
+    fmt = "%Y-%m-%d"
+    soql_fmt = "%Y-%m-%dT%H:%M:%S"
+    start_dt = datetime.datetime.strptime(start, fmt)
+    stop_dt = datetime.datetime.strptime(stop, fmt)
+
+    partitions = []
+    current = start_dt
+    while current < stop_dt:
+        # the 1st of the following month
+        next_month = (current.replace(day=1) + datetime.timedelta(days=32)).replace(
+            day=1
+        )
+        next_ = min(next_month, stop_dt)
+        partitions.append(
+            {"start": current.strftime(soql_fmt), "stop": next_.strftime(soql_fmt)}
+        )
+        current = next_
+
+    if not partitions:
+        partitions.append(
+            {"start": start_dt.strftime(soql_fmt), "stop": stop_dt.strftime(soql_fmt)}
+        )
+    return partitions
+
+
 if __name__ == "__main__":
     delta = {"weeks": 2, "days": 7}
     print("\ndate_interval (no start, no stop, no delta)")
@@ -50,3 +132,14 @@ if __name__ == "__main__":
 
     print(f"\ndate_interval (start, stop, delta {delta})")
     print(date_interval(start="2024-04-01", stop="2024-05-30"))
+
+    print(f"\ndate_partitions (start, stop, granularity day)")
+    print(date_partitions(start="2024-08-01", stop="2024-08-04"))
+
+    print(f"\ndate_partitions (start, stop, granularity hour)")
+    print(
+        len(date_partitions(start="2024-08-01", stop="2024-08-04", granularity="hour"))
+    )
+
+    print(f"\nmonth_partitions (start, stop)")
+    print(month_partitions(start="2024-06-15", stop="2024-08-04"))
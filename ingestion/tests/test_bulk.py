@@ -0,0 +1,105 @@
+import datetime
+import os
+import sys
+import threading
+from typing import Any, Iterator, List
+from urllib.parse import parse_qs, urlparse
+
+import dlt
+import duckdb
+import pytest
+
+# Add the ingestion and the benchmarks directories to the system path so that I can import the socrata package and the stand-in Socrata server.
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+sys.path.append(os.path.join(ROOT, "ingestion"))
+sys.path.append(os.path.join(ROOT, "benchmarks"))
+from duckdb_merge import duckdb_merge
+from socrata import nyc_open_data_source
+from socrata.bulk import nyc_open_data_backfill_source
+from socrata_server import SocrataRequestHandler, SocrataServer, synthetic_tables
+
+LOOKBACK_DAYS = 3
+
+
+class RecordingRequestHandler(SocrataRequestHandler):
+    def do_GET(self) -> None:
+        self.server.paths.append(self.path)
+        super().do_GET()
+
+
+@pytest.fixture
+def server() -> Iterator[Any]:
+    connection = duckdb.connect()
+    # 311 service requests created between 2024-06-01 and 2024-07-31
+    synthetic_tables(connection, rows=2_000, start="2024-06-01", days=60)
+    server = SocrataServer(0, connection, latency=0, bandwidth=1e9)
+    server.RequestHandlerClass = RecordingRequestHandler
+    server.paths = []
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def data_requests(paths: List[str], dataset: str) -> List[dict]:
+    """The query params of the requests of `dataset` that fetch rows, i.e. not
+    the `count(*)` probes."""
+    requests = []
+    for path in paths:
+        url = urlparse(path)
+        if not url.path.endswith(f"/{dataset}"):
+            continue
+        params = {k: v[0] for k, v in parse_qs(url.query).items()}
+        if "count(*)" not in params.get("$select", ""):
+            requests.append(params)
+    return requests
+
+
+def test_incremental_run_starts_where_the_backfill_stopped(server, tmp_path):
+    base_url = f"http://127.0.0.1:{server.server_address[1]}/resource/"
+    pipeline = dlt.pipeline(
+        pipeline_name="test_bulk",
+        pipelines_dir=str(tmp_path),
+        destination=duckdb_merge(str(tmp_path / "test_bulk.duckdb")),
+        dataset_name="landing_zone",
+    )
+
+    pipeline.run(
+        nyc_open_data_backfill_source(
+            created_date_start="2024-06-01",
+            created_date_stop="2024-07-30",
+            csv_dir=str(tmp_path / "csv"),
+            base_url=base_url,
+            socrata_application_token="token",
+        )
+    )
+    with pipeline.sql_client() as client:
+        rows = client.execute_sql(
+            "SELECT count(*), max(created_date) FROM service_requests_311"
+        )
+    backfilled_rows, last_created_date = rows[0]
+    assert backfilled_rows > 0
+    assert last_created_date.date() == datetime.date(2024, 7, 29)
+
+    server.paths.clear()
+    pipeline.run(
+        nyc_open_data_source(
+            created_date_start="2024-06-01",
+            lookback_days=LOOKBACK_DAYS,
+            response_cache=False,
+            requests_per_second=None,
+            base_url=base_url,
+            socrata_application_token="token",
+        ).with_resources("service_requests_311")
+    )
+
+    requests = data_requests(server.paths, "erm2-nwe9.json")
+    assert requests
+    since = last_created_date.replace(tzinfo=None) - datetime.timedelta(
+        days=LOOKBACK_DAYS
+    )
+    assert (
+        requests[0]["$where"]
+        == f"created_date >= '{since.isoformat(timespec='milliseconds')}'"
+    )
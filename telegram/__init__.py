@@ -7,7 +7,9 @@ from .html_texts import dbt_model_materialized as dbt_model_materialized_text
 from .html_texts import dbt_models_recap as dbt_models_recap_text
 from .html_texts import dbt_tests_recap as dbt_tests_recap_text
 from .html_texts import generic_exception as generic_exception_text
+from .html_texts import ingestion_metrics as ingestion_metrics_text
 from .html_texts import load_info as load_info_text
+from .html_texts import load_infos as load_infos_text
 from .html_texts import pipeline_step_failed as pipeline_step_failed_text
 from .html_texts import runtime_configuration as runtime_configuration_text
 from .html_texts import table_schema_update as table_schema_update_text
@@ -1,5 +1,5 @@
 import datetime
-from typing import Any, Optional, Sequence
+from typing import Any, Dict, Optional, Sequence
 
 import dlt
 from dlt.common.configuration.exceptions import ConfigFieldMissingException
@@ -23,6 +23,7 @@ SUCCESS_EMOJI = "✅"
 TEST_EMOJI = "🧪"
 TIP_EMOJI = "💡"
 WARNING_EMOJI = "⚠️"
+CHART_EMOJI = "📊"
 
 
 def footer(app_name: Optional[str] = DEFAULT_APP_NAME):
@@ -171,6 +172,81 @@ def load_info(load_info: LoadInfo, app_name: Optional[str] = DEFAULT_APP_NAME):
     return "".join(arr)
 
 
+def load_infos(
+    load_infos: Sequence[LoadInfo], app_name: Optional[str] = DEFAULT_APP_NAME
+):
+    """Summarizes the `LoadInfo` of many runs of the same pipeline, e.g. the
+    runs of a backfill that loads its pages in chunks."""
+    last_info = load_infos[-1]
+    pipeline_name = last_info.pipeline.pipeline_name
+    destination_name = last_info.destination_name
+    dataset_name = last_info.dataset_name
+    header = f"{DATABASE_EMOJI} <b>Load info</b>"
+    footer_ = f"\n\n{footer(app_name)}"
+
+    load_ids = [load_id for info in load_infos for load_id in info.loads_ids]
+    arr = [
+        header,
+        "\n\n",
+        f"dlt pipeline <code>{pipeline_name}</code> for destination <code>{destination_name}</code>, dataset <code>{dataset_name}</code>, ran to completion {len(load_infos)} times, with {len(load_ids)} load packages.",
+    ]
+    failed_runs = sum(1 for info in load_infos if info.has_failed_jobs)
+    if failed_runs:
+        arr.append(f"\n\n{WARNING_EMOJI} {failed_runs} runs have failed jobs.")
+
+    arr.append(f"\n\nRun this command for more info on a load package:")
+    arr.append(
+        f"\n<pre><code>dlt pipeline {pipeline_name} load-package LOAD_ID</code></pre>"
+    )
+    arr.append("\n<b>Load packages</b>")
+    for i, load_id in enumerate(load_ids):
+        text = f"\n<code>{load_id}</code>"
+        more = f"\n... and {len(load_ids) - i} more load packages"
+        if len("".join(arr)) + len(text) + len(more) + len(footer_) > MAX_TEXT_LENGHT:
+            arr.append(more)
+            break
+        arr.append(text)
+
+    arr.append(footer_)
+    return "".join(arr)
+
+
+def ingestion_metrics(
+    metrics: Dict[str, Any], app_name: Optional[str] = DEFAULT_APP_NAME
+):
+    """Summarizes the metrics of `RunMetrics.asdict` (see
+    `ingestion/rest_api/instrumentation.py`)."""
+    header = f"{CHART_EMOJI} <b>Ingestion metrics</b>"
+    footer_ = f"\n\n{footer(app_name)}"
+
+    steps = [f"{step} {seconds:.1f} s" for step, seconds in metrics["steps"].items()]
+    arr = [header, "\n\n<b>Steps</b>: ", ", ".join(steps) or "n/a"]
+
+    arr.append("\n\n<b>Resources</b>")
+    resources = sorted(
+        metrics["resources"].items(), key=lambda item: item[1]["seconds"], reverse=True
+    )
+    for i, (resource_name, m) in enumerate(resources):
+        p50 = m["latency_seconds"]["0.5"]
+        p90 = m["latency_seconds"]["0.9"]
+        latency = f"{p50 * 1000:.0f}/{p90 * 1000:.0f} ms" if p50 is not None else "n/a"
+        rows_per_second = m["rows_per_second"] or 0
+        lines = [
+            f"rows {m['rows']} ({rows_per_second:.0f}/s) in {m['seconds']:.1f} s",
+            f"{m['bytes'] / 1e6:.1f} MB, {m['requests']} requests, {m['retries']} retries",
+            f"latency p50/p90 {latency}",
+        ]
+        text = f"\n<code>{resource_name}</code>\n<pre>{chr(10).join(lines)}</pre>"
+        more = f"\n... and {len(resources) - i} more resources"
+        if len("".join(arr)) + len(text) + len(more) + len(footer_) > MAX_TEXT_LENGHT:
+            arr.append(more)
+            break
+        arr.append(text)
+
+    arr.append(footer_)
+    return "".join(arr)
+
+
 def pipeline_step_failed(
     exception: PipelineStepFailed, app_name: Optional[str] = DEFAULT_APP_NAME
 ):
@@ -0,0 +1,54 @@
+{#
+    A table of the landing zone, where the `landing_zone` var says it is.
+
+    - duckdb: the table of the `nyc_open_data` source, in the DuckDB file.
+    - lake: the Parquet files of the table in `lake_root` (see ingestion/lake.py),
+      read with `read_parquet`. The lake only appends, so a row loaded more than
+      once is in more than one file: only the row of the last load of each
+      `unique_key` is kept.
+
+    The tables partitioned by month have the `year` and `month` columns of their
+    partition. The partitions are not pruned on `created_date`: a load can add
+    rows to any month (e.g. a backfill, or the rows published late).
+
+    With `after_load_id` (see the `last_load_id` macro), only the rows of the
+    loads after that one are read. The filters are constants, so DuckDB skips
+    the row groups of the older loads in the DuckDB table (with their min/max
+    `_dlt_load_id`), and the files of the older loads in the lake (their names
+    start with the id of their load), whatever their partition: only their
+    footers are read, to bind their columns with `union_by_name`.
+
+    The source is referenced in both cases, so that it stays in the lineage of
+    the models.
+#}
+{% macro landing_zone_source(table_name, unique_key=none, after_load_id=none) %}
+    {%- set relation = source('nyc_open_data', table_name) -%}
+    {%- set conditions = [] -%}
+    {%- if var('landing_zone', 'duckdb') == 'lake' -%}
+        {%- set files = var('lake_root') ~ '/landing_zone/' ~ table_name ~ '/**/*.parquet' -%}
+        {%- if after_load_id is not none -%}
+            {%- do conditions.append("regexp_extract(parse_filename(filename), '^[0-9]+\\.[0-9]+') > '" ~ after_load_id ~ "'") -%}
+        {%- endif -%}
+        (
+            SELECT *{% if after_load_id is not none %} EXCLUDE (filename){% endif %}
+            FROM read_parquet(
+                '{{ files }}',
+                {%- if after_load_id is not none %}
+                filename = true,
+                {%- endif %}
+                hive_partitioning = true,
+                union_by_name = true
+            )
+            {%- if conditions %}
+            WHERE {{ conditions | join(' AND ') }}
+            {%- endif %}
+            {%- if unique_key is not none %}
+            QUALIFY row_number() OVER (PARTITION BY {{ unique_key }} ORDER BY _dlt_load_id DESC) = 1
+            {%- endif %}
+        )
+    {%- elif after_load_id is not none -%}
+        (SELECT * FROM {{ relation }} WHERE _dlt_load_id > '{{ after_load_id }}')
+    {%- else -%}
+        {{ relation }}
+    {%- endif -%}
+{% endmacro %}
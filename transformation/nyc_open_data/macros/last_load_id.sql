@@ -0,0 +1,20 @@
+{#
+    The `_dlt_load_id` of the last load of the landing zone that the current
+    incremental model has processed, i.e. the highest one in the model.
+
+    It's none when the model is built from scratch (the first run, or with
+    `--full-refresh`), when dbt only parses the project, and when the model
+    was built before it had a `_dlt_load_id` column (`on_schema_change` adds
+    it then).
+#}
+{% macro last_load_id() %}
+    {%- if not execute or not is_incremental() -%}
+        {{ return(none) }}
+    {%- endif -%}
+    {%- set columns = adapter.get_columns_in_relation(this) | map(attribute='name') | list -%}
+    {%- if '_dlt_load_id' not in columns -%}
+        {{ return(none) }}
+    {%- endif -%}
+    {%- set result = run_query('SELECT max(_dlt_load_id) FROM ' ~ this) -%}
+    {{ return(result.columns[0].values()[0]) }}
+{% endmacro %}
@@ -0,0 +1,23 @@
+-- The days of the service requests loaded since the last run. All the counts
+-- of those days are computed again, and replace the ones in the model
+-- (delete+insert on complaint_date). The other days are left as they are.
+WITH affected_days AS (
+    SELECT DISTINCT date_trunc('day', created_date)::DATE AS complaint_date
+    FROM {{ ref('stg_service_requests_311') }}
+    WHERE created_date IS NOT NULL
+    {%- set after_load_id = last_load_id() %}
+    {%- if after_load_id is not none %}
+        AND _dlt_load_id > '{{ after_load_id }}'
+    {%- endif %}
+)
+
+SELECT
+    date_trunc('day', created_date)::DATE AS complaint_date,
+    borough,
+    agency,
+    complaint_type,
+    count(*) AS daily_complaints,
+    max(_dlt_load_id) AS _dlt_load_id
+FROM {{ ref('stg_service_requests_311') }}
+WHERE date_trunc('day', created_date)::DATE IN (SELECT complaint_date FROM affected_days)
+GROUP BY ALL
@@ -1,5 +1,6 @@
 WITH source AS (
-    SELECT * FROM {{ source('nyc_open_data', 'film_permits') }}
+    -- only the rows of the loads that the model has not processed yet
+    SELECT * FROM {{ landing_zone_source('film_permits', unique_key='eventid', after_load_id=last_load_id()) }}
 ),
 
 renamed AS (
@@ -13,7 +14,8 @@ renamed AS (
         eventid AS event_id,
         eventtype AS event_type,
         startdatetime AS start_datetime,
-        zipcode_s AS zipcode
+        zipcode_s AS zipcode,
+        _dlt_load_id
     FROM source
 )
 
@@ -9,10 +9,12 @@ SELECT
     -- incident_zip,
     -- incident_address,
     -- street_name,
-    -- status,
+    status,
     -- bbl,
-    borough
+    borough,
+    _dlt_load_id
 -- latitude,
 -- longitude,
 -- vehicle_type
-FROM {{ source('nyc_open_data', 'service_requests_311') }}
+-- only the rows of the loads that the model has not processed yet
+FROM {{ landing_zone_source('service_requests_311', unique_key='unique_key', after_load_id=last_load_id()) }}
@@ -0,0 +1,228 @@
+"""Caches of the startup of the dbt package, kept between transformation runs.
+
+Before any SQL runs, a transformation run used to:
+
+1. restore the virtual environment of dbt (`dlt.dbt.get_venv`), which runs
+   `pip install` of dbt-core, dbt-duckdb, duckdb and dlt every time, even when
+   they are already installed;
+2. install the packages of `packages.yml` (`dbt deps`, in `run_all`), which
+   clones them from git every time;
+3. parse the project, once for each dbt command (`seed`, `run`, `test`).
+
+`get_venv` installs the requirements of the virtual environment only when they
+changed: their fingerprint is kept in the directory of the environment.
+`run_all` runs `dbt deps` only when `packages.yml`, `package-lock.yml` or the
+virtual environment changed (the fingerprint is kept in `dbt_packages`), and
+`dbt seed` only when the package has seeds.
+
+dbt parses again only the files that changed since the last parse (partial
+parsing), thanks to `target/partial_parse.msgpack` in the directory of the
+package, which is kept between runs. dbt parses the whole project when the
+vars or the profile change, so the vars passed to dbt are the same on every
+run.
+
+`StartupTimings` records the time of each step, and whether its cache was
+`warm` (used) or `cold` (built).
+
+https://docs.getdbt.com/reference/parsing#partial-parsing
+"""
+
+import contextlib
+import hashlib
+import os
+import sys
+import time
+from typing import Any, Dict, Generator, Iterable, List, Optional, Sequence, Tuple
+
+import dlt
+from dlt.common import logger
+from dlt.common.json import json
+from dlt.common.runners import Venv
+from dlt.common.runners.venv import VenvNotFound
+from dlt.common.typing import StrAny
+from dlt.helpers.dbt import DEFAULT_DBT_VERSION, _create_dbt_deps
+from dlt.helpers.dbt.exceptions import (
+    DBTNodeResult,
+    DBTProcessingError,
+    IncrementalSchemaOutOfSyncError,
+)
+from dlt.helpers.dbt.runner import DBTPackageRunner
+
+FINGERPRINT_FILE = ".fingerprint"
+PARTIAL_PARSE_FILE = os.path.join("target", "partial_parse.msgpack")
+
+
+def fingerprint(paths: Iterable[str] = (), values: Iterable[str] = ()) -> str:
+    """A hash of `values`, and of the contents of the files in `paths` (a file
+    that does not exist counts as empty)."""
+    h = hashlib.sha256()
+    for value in values:
+        h.update(value.encode("utf-8") + b"\0")
+    for path in paths:
+        with contextlib.suppress(FileNotFoundError):
+            with open(path, "rb") as f:
+                h.update(f.read())
+        h.update(b"\0")
+    return h.hexdigest()
+
+
+def read_fingerprint(directory: str) -> Optional[str]:
+    with contextlib.suppress(FileNotFoundError):
+        with open(os.path.join(directory, FINGERPRINT_FILE)) as f:
+            return f.read().strip()
+    return None
+
+
+def write_fingerprint(directory: str, value: str) -> None:
+    with open(os.path.join(directory, FINGERPRINT_FILE), "w") as f:
+        f.write(value)
+
+
+class StartupTimings:
+    """The time of the steps of a transformation run, and their caches."""
+
+    def __init__(self) -> None:
+        self.steps: Dict[str, Dict[str, Any]] = {}
+
+    @contextlib.contextmanager
+    def step(self, name: str) -> Generator[Dict[str, Any], None, None]:
+        """Times the block, and records it as `name`. The block can set the
+        `cache` of the step in the dict that it gets."""
+        record: Dict[str, Any] = {"cache": None}
+        t0 = time.perf_counter()
+        try:
+            yield record
+        finally:
+            record["seconds"] = time.perf_counter() - t0
+            self.steps[name] = record
+
+    def asdict(self) -> Dict[str, Any]:
+        return {
+            "steps": self.steps,
+            "seconds": sum(s["seconds"] for s in self.steps.values()),
+        }
+
+    def to_json(self) -> str:
+        return json.dumps(self.asdict(), pretty=True)
+
+    def report(self) -> str:
+        lines = [f"{'step':<8} {'cache':<6} {'seconds':>8}"]
+        for name, s in self.steps.items():
+            lines.append(f"{name:<8} {s['cache'] or '':<6} {s['seconds']:>8.2f}")
+        return "\n".join(lines)
+
+
+def get_venv(
+    pipeline: dlt.Pipeline,
+    venv_path: str = "dbt",
+    dbt_version: str = DEFAULT_DBT_VERSION,
+) -> Tuple[Venv, str]:
+    """Like `dlt.dbt.get_venv`, but the requirements of dbt are installed only
+    when they changed since the last run (e.g. a new version of dlt or duckdb).
+
+    Returns the virtual environment, and whether it was `warm` (restored as it
+    was) or `cold` (created, or updated with pip).
+    """
+    if os.path.isabs(venv_path):
+        venv_dir = venv_path
+    else:
+        # like dlt, keep the virtual environment in the pipeline directory
+        venv_dir = os.path.join(pipeline.working_dir, venv_path)
+    requirements = _create_dbt_deps(
+        [pipeline.destination.spec().destination_type], dbt_version
+    )
+    key = fingerprint(values=[sys.version, *requirements])
+    try:
+        venv = Venv.restore(venv_dir)
+        if read_fingerprint(venv_dir) == key:
+            return venv, "warm"
+        venv.add_dependencies(requirements)
+    except VenvNotFound:
+        venv = Venv.create(venv_dir, requirements)
+    write_fingerprint(venv_dir, key)
+    return venv, "cold"
+
+
+def ensure_deps(dbt: DBTPackageRunner) -> str:
+    """Runs `dbt deps`, unless the packages it installed are still the ones of
+    `packages.yml` and `package-lock.yml`. Returns whether the packages were
+    `warm` or `cold`."""
+    packages_dir = os.path.join(dbt.package_path, "dbt_packages")
+    paths = [
+        os.path.join(dbt.package_path, name)
+        for name in ("packages.yml", "package-lock.yml")
+    ]
+    # the packages of another version of dbt may not work with this one
+    values = [read_fingerprint(dbt.venv.context.env_dir) or ""]
+    if read_fingerprint(packages_dir) == fingerprint(paths, values):
+        return "warm"
+    dbt._run_dbt_command("deps")
+    os.makedirs(packages_dir, exist_ok=True)
+    # `dbt deps` writes the lock file when it is missing or out of date
+    write_fingerprint(packages_dir, fingerprint(paths, values))
+    return "cold"
+
+
+def has_seeds(package_path: str) -> bool:
+    seeds_dir = os.path.join(package_path, "seeds")
+    return any(
+        name.endswith(".csv") for _, _, names in os.walk(seeds_dir) for name in names
+    )
+
+
+def run_all(
+    dbt: DBTPackageRunner,
+    timings: StartupTimings,
+    run_params: Sequence[str] = ("--fail-fast",),
+    additional_vars: Optional[StrAny] = None,
+    destination_dataset_name: Optional[str] = None,
+) -> Sequence[DBTNodeResult]:
+    """Like `DBTPackageRunner.run_all` for a local package, without
+    `dbt deps` and `dbt seed` when they have nothing to do (see the docstring
+    of this module). The time of each step is recorded in `timings`."""
+    try:
+        results = _run_steps(
+            dbt, timings, list(run_params), additional_vars, destination_dataset_name
+        )
+    except DBTProcessingError as runerr:
+        dbt._log_dbt_run_results(runerr.run_results)
+        raise
+    dbt._log_dbt_run_results(results)
+    return results
+
+
+def _run_steps(
+    dbt: DBTPackageRunner,
+    timings: StartupTimings,
+    run_params: List[str],
+    additional_vars: Optional[StrAny],
+    destination_dataset_name: Optional[str],
+) -> Sequence[DBTNodeResult]:
+    with timings.step("deps") as step:
+        step["cache"] = ensure_deps(dbt)
+
+    if has_seeds(dbt.package_path):
+        with timings.step("seed"):
+            dbt._run_dbt_command(
+                "seed",
+                package_vars=dbt._get_package_vars(
+                    additional_vars, destination_dataset_name
+                ),
+            )
+
+    with timings.step("run") as step:
+        partial_parse = os.path.join(dbt.package_path, PARTIAL_PARSE_FILE)
+        step["cache"] = "warm" if os.path.isfile(partial_parse) else "cold"
+        try:
+            return dbt.run(run_params, additional_vars, destination_dataset_name)
+        except IncrementalSchemaOutOfSyncError:
+            if not dbt.config.auto_full_refresh_when_out_of_sync:
+                raise
+            logger.warning(
+                "Attempting full refresh due to incremental model out of sync"
+            )
+            return dbt.run(
+                run_params + ["--full-refresh"],
+                additional_vars,
+                destination_dataset_name,
+            )
@@ -2,6 +2,8 @@ import os
 import sys
 
 import dlt
+from loguru import logger
+from package_cache import StartupTimings, get_venv, run_all
 
 # Add the parent directory to the system path so that I can import Python code from sibling directories.
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
@@ -9,7 +11,10 @@ from common import (
     APP_NAME,
     DB_FILE_PATH,
     DBT_PACKAGE_PATH,
+    LAKE_ROOT,
+    METRICS_ROOT,
     SCHEMAS_ROOT,
+    get_ingestion_config,
     get_telegram_config,
     get_telegram_credentials,
 )
@@ -51,14 +56,29 @@ def run() -> None:
         text=runtime_configuration_text(pipeline=pipeline, app_name=APP_NAME),
     )
 
-    venv = dlt.dbt.get_venv(pipeline)
+    # The time of each step, and whether its cache was used (see package_cache.py).
+    timings = StartupTimings()
+
+    with timings.step("venv") as step:
+        venv, step["cache"] = get_venv(pipeline)
 
     dbt = dlt.dbt.package(pipeline, DBT_PACKAGE_PATH, venv=venv)
 
     destination_dataset_name = "silver_layer"
 
+    # The staging models read the landing zone where the ingestion pipeline
+    # loaded it: the DuckDB file, or the Parquet lake (see the
+    # `landing_zone_source` macro).
+    landing_zone = get_ingestion_config()["landing_zone"]
+    dbt_vars = {"landing_zone": landing_zone, "lake_root": LAKE_ROOT}
+    # The tests of the sources query the tables in DuckDB, which the lake
+    # doesn't fill.
+    test_params = ["--exclude", "source:*"] if landing_zone == "lake" else []
+
     try:
-        results = dbt.run_all(
+        results = run_all(
+            dbt,
+            timings,
             run_params=(
                 "--fail-fast",
                 "--log-format",
@@ -70,8 +90,7 @@ def run() -> None:
                 "--log-level-file",
                 "info",
             ),
-            # additional_vars=None,
-            # source_tests_selector=None,
+            additional_vars=dbt_vars,
             destination_dataset_name=destination_dataset_name,
         )
 
@@ -93,11 +112,12 @@ def run() -> None:
         )
 
     try:
-        results = dbt.test(
-            cmd_params=[],
-            additional_vars=None,
-            destination_dataset_name=destination_dataset_name,
-        )
+        with timings.step("test"):
+            results = dbt.test(
+                cmd_params=test_params,
+                additional_vars=dbt_vars,
+                destination_dataset_name=destination_dataset_name,
+            )
 
         safe_send_telegram_text(
             bot_token=bot_token,
@@ -120,6 +140,11 @@ def run() -> None:
             ),
         )
 
+    logger.info(f"dbt startup timings:\n{timings.report()}")
+    os.makedirs(METRICS_ROOT, exist_ok=True)
+    with open(os.path.join(METRICS_ROOT, f"{pipeline.pipeline_name}.json"), "w") as f:
+        f.write(timings.to_json())
+
 
 if __name__ == "__main__":
     run()
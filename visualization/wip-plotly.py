@@ -1,30 +1,35 @@
+import os
+import sys
+
+import duckdb
 import plotly
 import plotly.express as px
 
+# Add the parent directory to the system path so that I can import Python code from sibling directories.
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from common import DB_FILE_PATH
+
+# The daily counts are pre-aggregated by the dbt model mart_daily_complaints
+# (by borough, agency and complaint type), so this query reads a few hundred
+# rows per day, however many service requests are in the landing zone.
 query = f"""
-    WITH daily_counts AS (
     SELECT
-      date_trunc('day', created_date) AS complaint_date,
+      complaint_date,
       borough,
-      COUNT(*) AS daily_complaints
+      SUM(daily_complaints) AS daily_complaints
     FROM
-      data.main.service_requests
+      silver_layer.mart_daily_complaints
     GROUP BY
-      date_trunc('day', created_date),
-      borough
-    )
-    SELECT
       complaint_date,
-      daily_complaints,
       borough
-    FROM
-      daily_counts
     ORDER BY
       complaint_date,
       daily_complaints DESC;
     """
 
+conn = duckdb.connect(DB_FILE_PATH, read_only=True)
 df = conn.execute(query).fetch_df()
+conn.close()
 
 fig = px.line(
     df,